@@ -1,5 +1,8 @@
+import asyncio
+import httpx
 import requests
 import logging
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
@@ -126,4 +129,89 @@ class ApofizClient:
 
     @classmethod
     def get_token_detail(cls, token, device_id):
-        return cls._make_request("GET", f"/users/get_token_detail/{device_id}/", token=token)
\ No newline at end of file
+        return cls._make_request("GET", f"/users/get_token_detail/{device_id}/", token=token)
+
+
+class AsyncApofizClient:
+    """Неблокирующий ApofizClient для async-представлений: один httpx.AsyncClient на event loop воркера."""
+    BASE_URL = ApofizClient.BASE_URL
+
+    _client = None
+    _client_loop = None
+
+    @classmethod
+    def get_client(cls):
+        loop = asyncio.get_running_loop()
+        if cls._client is None or cls._client_loop is not loop:
+            pool_size = getattr(settings, 'APOFIZ_POOL_SIZE', 100)
+            cls._client = httpx.AsyncClient(
+                base_url=cls.BASE_URL,
+                timeout=httpx.Timeout(15, connect=getattr(settings, 'APOFIZ_CONNECT_TIMEOUT', 3)),
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+            cls._client_loop = loop
+        return cls._client
+
+    @classmethod
+    async def _make_request(cls, method, endpoint, data=None, params=None, token=None):
+        headers = {}
+        if token:
+            headers['Authorization'] = f"Token {token}"
+        try:
+            response = await cls.get_client().request(method, endpoint, json=data, params=params, headers=headers)
+            try:
+                response_data = response.json()
+            except ValueError:
+                response_data = {"detail": response.text}
+            return response.status_code, response_data
+        except httpx.HTTPError as e:
+            logger.error(f"Apofiz API Error [{endpoint}]: {e}")
+            return 503, {"error": "Сервис Apofiz временно недоступен", "details": str(e)}
+
+    @classmethod
+    async def send_otp(cls, phone_number, otp_type="whatsapp"):
+        return await cls._make_request("POST", "/otp/send/", {"phone_number": phone_number, "type": otp_type})
+
+    @classmethod
+    async def resend_code(cls, phone_number, auth_type):
+        return await cls._make_request("POST", "/resend_code/", {"phone_number": phone_number, "type": auth_type})
+
+    @classmethod
+    async def forgot_password(cls, phone_number, method="whatsapp"):
+        return await cls._make_request("POST", "/users/forgot_password/", {"phone_number": phone_number, "method": method})
+
+    @classmethod
+    async def forgot_password_email(cls, token):
+        return await cls._make_request("POST", "/users/forgot_password_email/", token=token)
+
+    @classmethod
+    async def get_email(cls, token):
+        return await cls._make_request("GET", "/users/get_email/", token=token)
+
+    @classmethod
+    async def get_phone_numbers(cls, token, user_id):
+        return await cls._make_request("GET", f"/users/{user_id}/phone_numbers/", token=token)
+
+    @classmethod
+    async def update_phone_numbers(cls, token, phone_numbers):
+        return await cls._make_request("POST", "/users/phone_numbers/", {"phone_numbers": phone_numbers}, token=token)
+
+    @classmethod
+    async def get_social_networks(cls, token, user_id):
+        return await cls._make_request("GET", f"/users/{user_id}/social_networks/", token=token)
+
+    @classmethod
+    async def set_social_networks(cls, token, networks_array):
+        return await cls._make_request("POST", "/users/social_networks/", {"networks": networks_array}, token=token)
+
+    @classmethod
+    async def get_active_devices(cls, token, page=1, limit=50):
+        return await cls._make_request("GET", "/users/get_active_devices/", params={"page": page, "limit": limit}, token=token)
+
+    @classmethod
+    async def get_auth_history(cls, token, page=1, limit=20):
+        return await cls._make_request("GET", "/users/authorisation_history/", params={"page": page, "limit": limit}, token=token)
+
+    @classmethod
+    async def get_token_detail(cls, token, device_id):
+        return await cls._make_request("GET", f"/users/get_token_detail/{device_id}/", token=token)
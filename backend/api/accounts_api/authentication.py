@@ -1,39 +1,76 @@
+import time
 import requests
 import logging
 from rest_framework.authentication import TokenAuthentication
 from rest_framework import exceptions
 from rest_framework.authtoken.models import Token
 from django.contrib.auth.models import User
+from apps.accounts_apps import auth_cache
+from core import metrics
 
 logger = logging.getLogger(__name__)
 
+REJECTED_MESSAGE = 'Недействительный токен авторизации (Отклонено сервером Apofiz).'
+
+
 class ApofizTokenAuthentication(TokenAuthentication):
     keyword = 'Token'
     def authenticate_credentials(self, key):
+        started = time.monotonic()
+        source = 'rejected'
         try:
-            token = Token.objects.select_related('user').get(key=key)
-            return (token.user, token)
-        except Token.DoesNotExist:
-            apofiz_profile_url = "https://apofiz.com/api/v1/users/me/" 
-            headers = {"Authorization": f"Token {key}"}
-            try:
-                response = requests.get(apofiz_profile_url, headers=headers, timeout=5)
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Ошибка связи с Apofiz при проверке токена: {e}")
-                raise exceptions.AuthenticationFailed('Не удалось связаться с сервером авторизации Apofiz.')
-            if response.status_code == 200:
-                user_data = response.json()
-                phone = user_data.get('phone_number') or user_data.get('username')
-                if not phone:
-                    raise exceptions.AuthenticationFailed('Apofiz не вернул номер телефона пользователя (username).')
-                user, created = User.objects.get_or_create(username=phone)
-                if created:
-                    user.first_name = user_data.get('first_name', '')
-                    user.last_name = user_data.get('last_name', '')
-                    user.email = user_data.get('email', '')
-                    user.save()
-                Token.objects.filter(user=user).delete()
-                token = Token.objects.create(user=user, key=key)
-                return (user, token)
-            else:
-                raise exceptions.AuthenticationFailed('Недействительный токен авторизации (Отклонено сервером Apofiz).')
\ No newline at end of file
+            user, token, source = self._authenticate(key)
+            return (user, token)
+        finally:
+            metrics.observe('auth_seconds', time.monotonic() - started, source=source)
+            metrics.inc('auth_total', source=source)
+
+    def _authenticate(self, key):
+        user = auth_cache.get_user(key)
+        if user:
+            return user, Token(key=key, user=user), 'cache'
+        if auth_cache.is_rejected(key):
+            raise exceptions.AuthenticationFailed(REJECTED_MESSAGE)
+
+        with auth_cache.single_flight(key):
+            # пока ждали, токен мог проверить параллельный запрос
+            user = auth_cache.get_user(key)
+            if user:
+                return user, Token(key=key, user=user), 'cache'
+            if auth_cache.is_rejected(key):
+                raise exceptions.AuthenticationFailed(REJECTED_MESSAGE)
+
+            token = Token.objects.select_related('user').filter(key=key).first()
+            if token:
+                auth_cache.remember(key, token.user)
+                return token.user, token, 'db'
+
+            user, token = self._verify_with_apofiz(key)
+            auth_cache.remember(key, user)
+            return user, token, 'apofiz'
+
+    def _verify_with_apofiz(self, key):
+        apofiz_profile_url = "https://apofiz.com/api/v1/users/me/"
+        headers = {"Authorization": f"Token {key}"}
+        try:
+            response = requests.get(apofiz_profile_url, headers=headers, timeout=5)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Ошибка связи с Apofiz при проверке токена: {e}")
+            raise exceptions.AuthenticationFailed('Не удалось связаться с сервером авторизации Apofiz.')
+        if response.status_code != 200:
+            # 5xx — сбой Apofiz, а не ответ по токену: не кэшируем как отказ
+            if response.status_code < 500:
+                auth_cache.reject(key)
+            raise exceptions.AuthenticationFailed(REJECTED_MESSAGE)
+
+        user_data = response.json()
+        phone = user_data.get('phone_number') or user_data.get('username')
+        if not phone:
+            raise exceptions.AuthenticationFailed('Apofiz не вернул номер телефона пользователя (username).')
+        user, created = User.objects.get_or_create(username=phone)
+        if created:
+            user.first_name = user_data.get('first_name', '')
+            user.last_name = user_data.get('last_name', '')
+            user.email = user_data.get('email', '')
+            user.save()
+        return user, auth_cache.upsert_token(user, key)
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from apps.accounts_apps import auth_cache, outbox
+from apps.accounts_apps.models import AdminActionHistory, Profiles
+from apps.cards_apps.models import Cards
+from .apofiz_client import ApofizClient
+
+logger = logging.getLogger(__name__)
+
+REFRESH_GATE_KEY = 'apofiz_refresh:{}'
+
+
+def generate_uid_tail(user_id):
+    return str(user_id).zfill(6)[-6:]
+
+
+def _payload_hash(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _apply_changes(obj, changes):
+    """Проставляет только отличающиеся значения, возвращает список изменённых полей."""
+    changed = [field for field, value in changes.items() if getattr(obj, field) != value]
+    for field in changed:
+        setattr(obj, field, changes[field])
+    return changed
+
+
+def sync_apofiz_token_and_user(phone_number, apofiz_token, apofiz_user_data=None):
+    if not apofiz_user_data:
+        status_code, fetched_data = ApofizClient.get_me(apofiz_token)
+        if status_code == 200:
+            apofiz_user_data = fetched_data
+
+    apofiz_id = apofiz_user_data.get('id') if apofiz_user_data else None
+    user = User.objects.filter(username=phone_number).first()
+    created = False
+
+    if not user:
+        if apofiz_id and isinstance(apofiz_id, int):
+            user = User.objects.create(id=apofiz_id, username=phone_number, is_active=False)
+        else:
+            user = User.objects.create(username=phone_number, is_active=False)
+        created = True
+
+    profile, _ = Profiles.objects.get_or_create(user_id=str(user.id), defaults={'phone': phone_number})
+    now = timezone.now()
+    has_init_profile = False
+
+    if apofiz_user_data:
+        payload_hash = _payload_hash(apofiz_user_data)
+        if created or payload_hash != profile.apofiz_payload_hash:
+            user_changes = {}
+            profile_changes = {'apofiz_data': apofiz_user_data, 'apofiz_payload_hash': payload_hash}
+            if apofiz_user_data.get('email'):
+                user_changes['email'] = apofiz_user_data['email']
+            if apofiz_user_data.get('full_name'):
+                names = apofiz_user_data['full_name'].split(' ', 1)
+                user_changes['first_name'] = profile_changes['first_name'] = names[0]
+                if len(names) > 1:
+                    user_changes['last_name'] = profile_changes['last_name'] = names[1]
+                has_init_profile = True
+            avatar_val = apofiz_user_data.get('avatar') or apofiz_user_data.get('avatar_url')
+            if avatar_val:
+                profile_changes['avatar_url'] = avatar_val.get('file') if isinstance(avatar_val, dict) else avatar_val
+
+            user_changed = _apply_changes(user, user_changes)
+            if user_changed:
+                user.save(update_fields=user_changed)
+            profile_changed = _apply_changes(profile, profile_changes)
+            profile.apofiz_synced_at = now
+            profile.save(update_fields=profile_changed + ['apofiz_synced_at', 'updated_at'])
+        else:
+            # данные Apofiz не изменились: только отметка свежести, без сигналов post_save
+            Profiles.objects.filter(pk=profile.pk).update(apofiz_synced_at=now)
+            profile.apofiz_synced_at = now
+
+    if has_init_profile or created:
+        tail = generate_uid_tail(user.id)
+
+        if not Cards.objects.filter(user_id=str(user.id)).exists():
+            Cards.objects.create(
+                user_id=str(user.id), type='metal', name='Metal Card', status='active',
+                balance=Decimal('50000.00'), last_four_digits=tail[-4:], card_number_encrypted=f"4532112233{tail}",
+            )
+            Cards.objects.create(
+                user_id=str(user.id), type='virtual', name='Virtual Card', status='active',
+                balance=Decimal('50000.00'), last_four_digits=tail[-4:], card_number_encrypted=f"4532112244{tail}",
+            )
+
+    if apofiz_token:
+        auth_cache.upsert_token(user, apofiz_token)
+    else:
+        Token.objects.filter(user=user).delete()
+
+    if created:
+        full_name = f"{profile.first_name or ''} {profile.last_name or ''}".strip()
+        if not full_name:
+            full_name = "Имя еще не заполнено (в процессе)"
+
+        details = {
+            "acting_role": "System Auto-Registration",
+            "changes": {
+                "Новый пользователь": {
+                    "was": "Отсутствовал",
+                    "became": f"{full_name} (Тел: {phone_number}, ID: {user.id})"
+                }
+            }
+        }
+
+        AdminActionHistory.objects.create(
+            admin_id="SYSTEM",
+            action="NEW_USER_REGISTRATION",
+            target_user_id=str(user.id),
+            details=details
+        )
+
+    return user, created
+
+
+def _sync_ttl():
+    return getattr(settings, 'APOFIZ_SYNC_TTL', 300)
+
+
+def sync_is_stale(profile):
+    synced_at = profile.apofiz_synced_at
+    return synced_at is None or timezone.now() - synced_at > timedelta(seconds=_sync_ttl())
+
+
+def schedule_refresh(user, profile):
+    """Фоновое обновление из Apofiz не чаще раза в APOFIZ_SYNC_TTL на пользователя."""
+    if not sync_is_stale(profile):
+        return False
+    if not cache.add(REFRESH_GATE_KEY.format(user.id), 1, _sync_ttl()):
+        return False
+    outbox.enqueue('profile.apofiz_refresh', {"user_id": str(user.id), "phone": user.username})
+    return True
+
+
+@outbox.handler('profile.apofiz_refresh', concurrency=4, max_attempts=3)
+def refresh_profile(payload):
+    profile = Profiles.objects.filter(user_id=payload['user_id']).first()
+    if profile and not sync_is_stale(profile):
+        return
+    # токен берём из authtoken_token, чтобы не хранить его в outbox
+    token = Token.objects.filter(user_id=payload['user_id']).values_list('key', flat=True).first()
+    if not token:
+        return
+    status_code, data = ApofizClient.get_me(token)
+    if status_code == 200 and data:
+        sync_apofiz_token_and_user(payload['phone'], token, data)
+    elif status_code >= 500:
+        raise outbox.RetryLater(f"Apofiz users/me: {status_code}")
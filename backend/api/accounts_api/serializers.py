@@ -95,9 +95,15 @@ class AdminNotificationSettingsSerializer(serializers.ModelSerializer):
         fields = [
             'telegram_username', 'telegram_enabled', 
             'whatsapp_number', 'whatsapp_enabled', 
-            'email_address', 'email_enabled'
+            'email_address', 'email_enabled',
+            'subscribed_actions'
         ]
 
+    def validate_subscribed_actions(self, value):
+        if not isinstance(value, list) or not all(isinstance(a, str) and a for a in value):
+            raise serializers.ValidationError("Ожидается список кодов действий, например [\"ROLE_CHANGED\"].")
+        return sorted(set(value))
+
     def update(self, instance, validated_data):
         new_username = validated_data.get('telegram_username')
         if new_username and new_username != instance.telegram_username:
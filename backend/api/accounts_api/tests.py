@@ -1,3 +1,423 @@
-from django.test import TestCase
+import base64
+import json
+import smtplib
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from apps.accounts_apps import (
+    admin_routing, auth_cache, identity, mailer, notifications, outbox, realtime, telegram_chats, whatsapp,
+)
+from apps.accounts_apps.models import (
+    AdminNotificationSettings, OutboxEvent, Profiles, TelegramChats, UserNotificationSettings, UserRoles,
+)
+from apps.transactions_apps.models import Transactions
+
+
+class OutboxPurgeTests(TestCase):
+
+    def test_purges_only_old_done(self):
+        old = timezone.now() - timedelta(days=30)
+        expired = OutboxEvent.objects.create(event_type='notify.email', status='done', processed_at=old)
+        recent = OutboxEvent.objects.create(event_type='notify.email', status='done', processed_at=timezone.now())
+        dead = OutboxEvent.objects.create(event_type='notify.email', status='dead', processed_at=old)
+        pending = OutboxEvent.objects.create(event_type='notify.email')
+
+        self.assertEqual(outbox.purge_done(retention_days=7, batch_size=1), 1)
+        left = set(OutboxEvent.objects.values_list('id', flat=True))
+        self.assertEqual(left, {recent.id, dead.id, pending.id})
+        self.assertNotIn(expired.id, left)
+
+
+class NotifyTransactionPartiesTests(TestCase):
+
+    def setUp(self):
+        self.txn = Transactions.objects.create(
+            user_id='1', type='card_transfer', status='completed', amount=Decimal('10.00'), currency='AED',
+            sender_id='1', receiver_id='2',
+        )
+        for user_id in ('1', '2'):
+            UserNotificationSettings.objects.create(
+                user_id=user_id, email_enabled=True, email_address=f"{user_id}@example.com",
+            )
+
+    def test_enqueues_both_parties(self):
+        notifications.notify_transaction_parties(self.txn.id)
+        self.assertEqual(OutboxEvent.objects.filter(event_type='notify.email').count(), 2)
+
+    def test_failure_on_receiver_rolls_back_sender(self):
+        real_build = notifications.build_transaction_message
+
+        def build(txn, role, lang):
+            if role == 'receiver':
+                raise RuntimeError("boom")
+            return real_build(txn, role, lang)
+
+        with mock.patch.object(notifications, 'build_transaction_message', side_effect=build):
+            with self.assertRaises(RuntimeError):
+                notifications.notify_transaction_parties(self.txn.id)
+        self.assertFalse(OutboxEvent.objects.filter(event_type__startswith='notify.').exists())
+
+
+class TokenRevocationTests(TestCase):
+    """Удалённый токен (logout) перестаёт работать сразу, а не через AUTH_TOKEN_CACHE_TTL."""
+
+    URL = '/api/v1/transactions/all/'
+
+    def setUp(self):
+        self.user = User.objects.create(username='971500000001')
+        self.key = 'a' * 40
+        self.token = Token.objects.create(user=self.user, key=self.key)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.key}")
+
+    def test_deleted_token_is_rejected(self):
+        self.assertEqual(self.client.get(self.URL).status_code, 200)
+        self.assertIsNotNone(auth_cache.get_user(self.key))
+
+        self.token.delete()
+        self.assertIsNone(auth_cache.get_user(self.key))
+        rejected = mock.Mock(status_code=401)
+        with mock.patch('api.accounts_api.authentication.requests.get', return_value=rejected):
+            self.assertEqual(self.client.get(self.URL).status_code, 401)
+
+
+class FakeSMTPConnection:
+    """SMTP-сессия без сети: ошибки берутся по очереди из общего сценария."""
+
+    def __init__(self, script):
+        self.script = script
+        self.sent = []
+        self.closed = False
+
+    def open(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def send_messages(self, messages):
+        error = self.script.pop(0) if self.script else None
+        if error is not None:
+            raise error
+        self.sent.extend(messages)
+        return len(messages)
+
+
+@override_settings(EMAIL_RATE_PER_SECOND=1000, EMAIL_RATE_BURST=100)
+class PooledMailerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.script = []
+        self.connections = []
+
+        def connect(**kwargs):
+            connection = FakeSMTPConnection(self.script)
+            self.connections.append(connection)
+            return connection
+
+        patcher = mock.patch.object(mailer, 'get_connection', side_effect=connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mailer = mailer.PooledMailer('test', {})
+
+    @staticmethod
+    def message(to):
+        return EmailMessage('subject', 'body', 'noreply@example.com', [to])
+
+    def test_concurrent_senders_share_one_session(self):
+        results = []
+        self.mailer.send_lock.acquire()
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(self.mailer.send(self.message(f"{i}@example.com"))))
+            for i in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while len(self.mailer.pending) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.mailer.send_lock.release()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [True] * 3)
+        self.assertEqual(len(self.connections), 1)
+        self.assertEqual(len(self.connections[0].sent), 3)
+
+    def test_disconnect_reconnects_and_resends(self):
+        self.script.append(smtplib.SMTPServerDisconnected("Connection unexpectedly closed"))
+        self.assertTrue(self.mailer.send(self.message('a@example.com')))
+
+        self.assertEqual(len(self.connections), 2)
+        self.assertTrue(self.connections[0].closed)
+        self.assertEqual(len(self.connections[1].sent), 1)
+
+    def test_rejected_message_keeps_session(self):
+        self.script.append(smtplib.SMTPRecipientsRefused({'bad@example.com': (550, b'No such user')}))
+        self.assertFalse(self.mailer.send(self.message('bad@example.com')))
+        self.assertTrue(self.mailer.send(self.message('good@example.com')))
+
+        self.assertEqual(len(self.connections), 1)
+        self.assertFalse(self.connections[0].closed)
+        self.assertEqual([m.to for m in self.connections[0].sent], [['good@example.com']])
+
+    def test_data_error_is_not_resent(self):
+        self.script.append(smtplib.SMTPDataError(554, b'Message rejected'))
+        self.assertFalse(self.mailer.send(self.message('a@example.com')))
+        self.assertEqual(len(self.connections), 1)
+        self.assertEqual(self.connections[0].sent, [])
+
+
+class LedgerPushTests(TestCase):
+    """Дельты баланса рассылает воркер outbox: сохранение транзакции только ставит событие."""
+
+    def test_saves_in_one_commit_enqueue_one_push(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            txn = Transactions.objects.create(
+                user_id='1', type='card_transfer', status='pending', amount=Decimal('10.00'), currency='AED',
+                sender_id='1', receiver_id='2',
+            )
+            txn.status = 'completed'
+            txn.save(update_fields=['status'])
+        self.assertEqual(OutboxEvent.objects.filter(event_type='ledger.push').count(), 1)
+
+    def test_handler_sends_to_party_groups(self):
+        txn = Transactions.objects.create(
+            user_id='1', type='card_transfer', status='completed', amount=Decimal('10.00'), currency='AED',
+            sender_id='1', receiver_id='2',
+        )
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(realtime.ledger_group('2'), channel)
+
+        notifications.handle_ledger_push({"transaction_id": str(txn.id)})
+
+        message = async_to_sync(layer.receive)(channel)
+        self.assertEqual(message['type'], 'ledger.event')
+        self.assertEqual(message['payload']['transaction_id'], str(txn.id))
+        self.assertEqual(message['payload']['user_id'], '2')
+
+    def test_failed_push_is_retried(self):
+        txn = Transactions.objects.create(
+            user_id='1', type='card_transfer', status='completed', amount=Decimal('10.00'), currency='AED',
+            sender_id='1', receiver_id='2',
+        )
+        with mock.patch.object(realtime, 'ledger_events', side_effect=ConnectionError("redis down")):
+            with self.assertRaises(outbox.RetryLater):
+                notifications.handle_ledger_push({"transaction_id": str(txn.id)})
+
+
+@override_settings(REALTIME_FLUSH_INTERVAL=0.5, REALTIME_SEND_TIMEOUT=5)
+class RealtimeBroadcasterTests(TestCase):
+    """broadcast считается выполненным только после отправки пачки с его событиями."""
+
+    def setUp(self):
+        self.broadcaster = realtime.RealtimeBroadcaster(url='https://realtime.example/webhook')
+        self.addCleanup(self.broadcaster.flush)
+        self.session = mock.Mock()
+        self.broadcaster.session = self.session
+
+    @staticmethod
+    def events(i):
+        return [{"user_id": str(i), "transaction_id": f"t{i}", "event": "transaction_outgoing"}]
+
+    def test_concurrent_publishes_share_one_request(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(self.broadcaster.publish(self.events(i))))
+            for i in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [True] * 5)
+        sent = [e for call in self.session.post.call_args_list for e in call.kwargs['json']['events']]
+        self.assertEqual(sorted(e['user_id'] for e in sent), ['0', '1', '2', '3', '4'])
+        self.assertLess(self.session.post.call_count, 5)
+
+    def test_failed_send_keeps_outbox_event_pending(self):
+        self.session.post.side_effect = requests.ConnectionError("webhook down")
+        txn = Transactions.objects.create(
+            user_id='1', type='card_transfer', status='completed', amount=Decimal('10.00'), currency='AED',
+            sender_id='1', receiver_id='2',
+        )
+        event = OutboxEvent.objects.create(event_type='transaction.broadcast', payload={"transaction_id": str(txn.id)})
+
+        with mock.patch.object(realtime, 'broadcaster', self.broadcaster):
+            self.assertFalse(outbox.process(event))
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'pending')
+        self.assertEqual(event.attempts, 1)
+        self.session.post.assert_called_once()
+
+
+class IdentityCacheTests(TestCase):
+    """Смена профиля видна всем процессам: версия в общем кэше меняется после коммита."""
+
+    def setUp(self):
+        identity.clear()
+        cache.clear()
+        self.addCleanup(identity.clear)
+        self.profile = Profiles.objects.create(user_id='42', first_name='Ivan', last_name='Petrov')
+
+    def test_other_process_invalidation(self):
+        self.assertEqual(identity.get('42').name, 'Ivan Petrov')
+        Profiles.objects.filter(id=self.profile.id).update(first_name='Pyotr')
+        self.assertEqual(identity.get('42').name, 'Ivan Petrov')
+
+        # invalidate в другом процессе меняет только общую версию, локальный словарь этого процесса цел
+        cache.set(identity.VERSION_CACHE_KEY.format('42'), 1, None)
+        self.assertEqual(identity.get('42').name, 'Pyotr Petrov')
+
+    def test_version_bumps_on_commit(self):
+        self.assertEqual(identity.get('42').name, 'Ivan Petrov')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.first_name = 'Pyotr'
+            self.profile.save()
+            self.assertEqual(identity.get('42').name, 'Ivan Petrov')
+        self.assertEqual(identity.get('42').name, 'Pyotr Petrov')
+
+
+class AdminRoutingInvalidationTests(TestCase):
+    """Версия маршрутов меняется только после коммита, иначе читатель закэширует старые строки под новой версией."""
+
+    def setUp(self):
+        cache.clear()
+        admin_routing._table = None
+        UserRoles.objects.create(user_id='1', role='admin')
+
+    def test_version_bumps_on_commit(self):
+        self.assertEqual(admin_routing.get_routes(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            AdminNotificationSettings.objects.create(user_id='1', email_enabled=True, email_address='admin@example.com')
+            self.assertEqual(cache.get(admin_routing.VERSION_CACHE_KEY, 0), 0)
+        self.assertEqual(cache.get(admin_routing.VERSION_CACHE_KEY), 1)
+        self.assertEqual([r.email for r in admin_routing.get_routes()], ['admin@example.com'])
+
+
+class Base64JsonBodyTests(SimpleTestCase):
+    """Content-Length (len) должен совпадать с байтами, которые реально уйдут, и тело — быть валидным JSON."""
+
+    def build(self, content):
+        payload = {
+            "chatId": "971500000001@c.us",
+            "file": {"mimetype": "text/html", "filename": "выписка.html", "data": "__DATA__"},
+            "caption": "Выписка «за месяц»",
+        }
+        return whatsapp.Base64JsonBody(payload, "data:text/html;base64,", content)
+
+    def test_length_matches_encoded_body(self):
+        chunk = whatsapp.Base64JsonBody.CHUNK
+        for size in (0, 1, 2, 3, 4, chunk - 1, chunk, chunk + 1, 2 * chunk + 2):
+            content = bytes(i % 251 for i in range(size))
+            for read_size in (-1, 1000, 7):
+                with self.subTest(size=size, read_size=read_size):
+                    body = self.build(content)
+                    data = b''
+                    while True:
+                        part = body.read(read_size)
+                        if not part:
+                            break
+                        data += part
+                    self.assertEqual(len(body), len(data))
+                    decoded = json.loads(data)
+                    prefix, encoded = decoded['file']['data'].split(',', 1)
+                    self.assertEqual(prefix, "data:text/html;base64")
+                    self.assertEqual(base64.b64decode(encoded), content)
+                    self.assertEqual(decoded['caption'], "Выписка «за месяц»")
+
+
+@override_settings(WAHA_RATE_PER_SECOND=2.0, WAHA_RECIPIENT_INTERVAL=5.0, WAHA_QUEUE_MAX=1)
+class WhatsAppSenderPacingTests(SimpleTestCase):
+    CONFIG = whatsapp.WahaConfig(api_url='http://waha.test', session_name='default', api_key='key')
+
+    def setUp(self):
+        self.sender = whatsapp.WhatsAppSender(config=self.CONFIG)
+        self.session = mock.Mock()
+        self.session.post.return_value = mock.Mock(status_code=201)
+        self.sender.session = self.session
+
+    def test_global_rate_and_recipient_interval(self):
+        with mock.patch('apps.accounts_apps.whatsapp.time.monotonic', return_value=100.0):
+            waits = [self.sender._reserve(chat_id) for chat_id in ('a', 'b', 'c', 'a')]
+        # общий темп — 0.5 с между сообщениями, тому же получателю — не раньше чем через 5 с
+        self.assertEqual(waits, [0.0, 0.5, 1.0, 5.0])
+
+    def test_send_waits_for_its_slot(self):
+        with mock.patch('apps.accounts_apps.whatsapp.time.sleep') as sleep:
+            self.assertEqual(self.sender.send_text('+971 50 000 0001', 'one').status_code, 201)
+            self.assertEqual(self.sender.send_text('+971 50 000 0002', 'two').status_code, 201)
+        self.assertEqual(sleep.call_count, 1)
+        self.assertAlmostEqual(sleep.call_args.args[0], 0.5, places=1)
+        url = self.session.post.call_args.args[0]
+        self.assertEqual(url, 'http://waha.test/api/sendText')
+        self.assertEqual(self.session.post.call_args.kwargs['json']['chatId'], '971500000002@c.us')
+
+    def test_full_queue_postpones_send(self):
+        self.assertTrue(self.sender.slots.acquire(blocking=False))
+        try:
+            with self.assertLogs('apps.accounts_apps.whatsapp', 'WARNING'):
+                self.assertFalse(self.sender.send_text('971500000001', 'text'))
+        finally:
+            self.sender.slots.release()
+        self.session.post.assert_not_called()
+
+
+class TelegramChatsBackfillTests(TestCase):
+    """backfill проставляет chat_id по индексу telegram_chats обеим моделям настроек, без getUpdates."""
+
+    def setUp(self):
+        TelegramChats.objects.create(username='alice', chat_id='101')
+        TelegramChats.objects.create(username='bob', chat_id='202')
+        self.admin = AdminNotificationSettings.objects.create(user_id='1', telegram_username='@Alice')
+        self.user = UserNotificationSettings.objects.create(user_id='2', telegram_username='bob', telegram_chat_id='')
+        self.unknown = UserNotificationSettings.objects.create(user_id='3', telegram_username='@carol')
+        self.filled = UserNotificationSettings.objects.create(user_id='4', telegram_username='alice', telegram_chat_id='999')
+        self.blank = UserNotificationSettings.objects.create(user_id='5', telegram_username='')
+
+    def chat_ids(self):
+        return [
+            obj.__class__.objects.get(pk=obj.pk).telegram_chat_id
+            for obj in (self.admin, self.user, self.unknown, self.filled, self.blank)
+        ]
+
+    def test_backfill(self):
+        self.assertEqual(telegram_chats.backfill(batch_size=1), 2)
+        self.assertEqual(self.chat_ids(), ['101', '202', None, '999', None])
+        # повторный проход ничего не меняет
+        self.assertEqual(telegram_chats.backfill(), 0)
+
+    def test_command_seeds_index_from_updates(self):
+        updates = mock.Mock()
+        updates.json.return_value = {'ok': True, 'result': [
+            {'message': {'chat': {'id': 303, 'username': 'Carol'}}},
+            {'message': {'chat': {'id': 404}}},
+        ]}
+        out = StringIO()
+        with override_settings(TELEGRAM_BOT_TOKEN='bot-token', USER_TELEGRAM_BOT_TOKEN=''), \
+                mock.patch('apps.accounts_apps.management.commands.backfill_telegram_chats.requests.get',
+                           return_value=updates) as get:
+            call_command('backfill_telegram_chats', from_updates=True, stdout=out)
+        get.assert_called_once()
+        self.assertEqual(TelegramChats.objects.get(username='carol').chat_id, '303')
+        self.assertEqual(self.chat_ids(), ['101', '202', '303', '999', None])
+        self.assertIn("chat_id проставлен: 2", out.getvalue())
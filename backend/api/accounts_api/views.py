@@ -1,4 +1,3 @@
-from decimal import Decimal
 import uuid
 from rest_framework.authtoken.models import Token
 import re
@@ -8,8 +7,10 @@ from apps.cards_apps.models import Cards
 from apps.transactions_apps.models import BankDepositAccounts, CryptoWallets, Transactions
 from api.accounts_api.serializers import AdminActionHistorySerializer, AdminNotificationSettingsSerializer, AdminSettingsSerializer, ContactSerializer, UserLimitsSerializer, UserNotificationSettingsSerializer
 from apps.accounts_apps.notifications import dispatch_test_notification
+from apps.accounts_apps import telegram_chats
 from core import settings
 from rest_framework.views import APIView
+from core.async_views import AsyncAPIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework.parsers import MultiPartParser, FormParser
@@ -17,107 +18,16 @@ from django.contrib.auth.models import User
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from apps.accounts_apps.models import AdminNotificationSettings, AdminSettings, Contacts, Profiles, UserNotificationSettings
-from .apofiz_client import ApofizClient
+from .apofiz_client import ApofizClient, AsyncApofizClient
 from django.db.models import Sum, Count
 from apps.accounts_apps.models import UserRoles, AdminActionHistory
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
-from apps.transactions_apps.services import TransactionService
+from apps.transactions_apps.services import SettingsManager, TransactionService
+from .profile_sync import schedule_refresh, sync_apofiz_token_and_user
 
-def generate_uid_tail(user_id):
-    return str(user_id).zfill(6)[-6:]
 
-def sync_apofiz_token_and_user(phone_number, apofiz_token, apofiz_user_data=None):
-    if not apofiz_user_data:
-        status_code, fetched_data = ApofizClient.get_me(apofiz_token)
-        if status_code == 200:
-            apofiz_user_data = fetched_data
-            
-    apofiz_id = apofiz_user_data.get('id') if apofiz_user_data else None
-    user = User.objects.filter(username=phone_number).first()
-    created = False
-    
-    if not user:
-        if apofiz_id and isinstance(apofiz_id, int):
-            user = User.objects.create(id=apofiz_id, username=phone_number, is_active=False)
-        else:
-            user = User.objects.create(username=phone_number, is_active=False)
-        created = True
-        
-    has_init_profile = False
-    if apofiz_user_data:
-        if 'email' in apofiz_user_data and apofiz_user_data['email']:
-            user.email = apofiz_user_data['email']
-        if 'full_name' in apofiz_user_data and apofiz_user_data['full_name']:
-            names = apofiz_user_data['full_name'].split(' ', 1)
-            user.first_name = names[0]
-            if len(names) > 1:
-                user.last_name = names[1]
-            has_init_profile = True
-        user.save()
-        
-    profile, _ = Profiles.objects.get_or_create(user_id=str(user.id), defaults={'phone': phone_number})
-    profile_updated = False
-    
-    if apofiz_user_data:
-        if 'full_name' in apofiz_user_data and apofiz_user_data['full_name']:
-            names = apofiz_user_data['full_name'].split(' ', 1)
-            profile.first_name = names[0]
-            if len(names) > 1:
-                profile.last_name = names[1]
-            profile_updated = True
-        
-        avatar_val = apofiz_user_data.get('avatar') or apofiz_user_data.get('avatar_url')
-        if avatar_val:
-            profile.avatar_url = avatar_val.get('file') if isinstance(avatar_val, dict) else avatar_val
-            profile_updated = True
-            
-    if profile_updated:
-        profile.save()
-        
-    if has_init_profile or created:
-        tail = generate_uid_tail(user.id)
-
-        if not Cards.objects.filter(user_id=str(user.id)).exists():
-            Cards.objects.create(
-                user_id=str(user.id), type='metal', name='Metal Card', status='active',
-                balance=Decimal('50000.00'), last_four_digits=tail[-4:], card_number_encrypted=f"4532112233{tail}",
-            )
-            Cards.objects.create(
-                user_id=str(user.id), type='virtual', name='Virtual Card', status='active',
-                balance=Decimal('50000.00'), last_four_digits=tail[-4:], card_number_encrypted=f"4532112244{tail}",
-            )
-            
-    Token.objects.filter(user=user).delete()
-    if apofiz_token:
-        Token.objects.create(key=apofiz_token, user=user)
-        
-    if created:
-        full_name = f"{profile.first_name or ''} {profile.last_name or ''}".strip()
-        if not full_name:
-            full_name = "Имя еще не заполнено (в процессе)"
-            
-        details = {
-            "acting_role": "System Auto-Registration",
-            "changes": {
-                "Новый пользователь": {
-                    "was": "Отсутствовал",
-                    "became": f"{full_name} (Тел: {phone_number}, ID: {user.id})"
-                }
-            }
-        }
-        
-        AdminActionHistory.objects.create(
-            admin_id="SYSTEM",
-            action="NEW_USER_REGISTRATION",
-            target_user_id=str(user.id),
-            details=details
-        )
-        
-    return user, created
-
-
-class SendOtpView(APIView):
+class SendOtpView(AsyncAPIView):
     permission_classes = [permissions.AllowAny]
 
     @swagger_auto_schema(
@@ -126,8 +36,8 @@ class SendOtpView(APIView):
             properties={'phone_number': openapi.Schema(type=openapi.TYPE_STRING), 'type': openapi.Schema(type=openapi.TYPE_STRING, enum=['sms', 'whatsapp'])}),
         tags=["Аутентификация"]
     )
-    def post(self, request):
-        status_code, data = ApofizClient.send_otp(request.data.get('phone_number'), request.data.get('type', 'whatsapp'))
+    async def post(self, request):
+        status_code, data = await AsyncApofizClient.send_otp(request.data.get('phone_number'), request.data.get('type', 'whatsapp'))
         return Response(data, status=status_code)
 
 
@@ -187,7 +97,7 @@ class VerifyCodeView(APIView):
         return Response(data, status=status_code)
 
 
-class ResendCodeView(APIView):
+class ResendCodeView(AsyncAPIView):
     permission_classes = [permissions.AllowAny]
 
     @swagger_auto_schema(
@@ -196,8 +106,8 @@ class ResendCodeView(APIView):
             properties={'phone_number': openapi.Schema(type=openapi.TYPE_STRING), 'type': openapi.Schema(type=openapi.TYPE_STRING)}),
         tags=["Аутентификация"]
     )
-    def post(self, request):
-        status_code, data = ApofizClient.resend_code(request.data.get('phone_number'), request.data.get('type', 'whatsapp_auth_type'))
+    async def post(self, request):
+        status_code, data = await AsyncApofizClient.resend_code(request.data.get('phone_number'), request.data.get('type', 'whatsapp_auth_type'))
         return Response(data, status=status_code)
 
 
@@ -313,24 +223,24 @@ class ChangePasswordView(APIView):
         return Response(data, status=status_code)
 
 
-class ForgotPasswordView(APIView):
+class ForgotPasswordView(AsyncAPIView):
     permission_classes = [permissions.AllowAny]
 
     @swagger_auto_schema(operation_summary="Забыли пароль (Apofiz)",
         request_body=openapi.Schema(type=openapi.TYPE_OBJECT, required=['phone_number'],
             properties={'phone_number': openapi.Schema(type=openapi.TYPE_STRING), 'method': openapi.Schema(type=openapi.TYPE_STRING, enum=['sms', 'whatsapp', 'email'])}),
         tags=["Управление паролями"])
-    def post(self, request):
-        status_code, data = ApofizClient.forgot_password(request.data.get('phone_number'), request.data.get('method', 'whatsapp'))
+    async def post(self, request):
+        status_code, data = await AsyncApofizClient.forgot_password(request.data.get('phone_number'), request.data.get('method', 'whatsapp'))
         return Response(data, status=status_code)
 
 
-class ForgotPasswordEmailView(APIView):
+class ForgotPasswordEmailView(AsyncAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(operation_summary="Забыли пароль (Email) (Apofiz)", tags=["Управление паролями"])
-    def post(self, request):
-        status_code, data = ApofizClient.forgot_password_email(request.auth.key)
+    async def post(self, request):
+        status_code, data = await AsyncApofizClient.forgot_password_email(request.auth.key)
         return Response(data, status=status_code)
 
 
@@ -343,10 +253,13 @@ class CurrentUserView(APIView):
     )
     def get(self, request):
         uid = str(request.user.id)
-        status_code, apofiz_data = ApofizClient.get_me(request.auth.key)
-        if status_code == 200 and apofiz_data:
-            sync_apofiz_token_and_user(request.user.username, request.auth.key, apofiz_data)
         profile = Profiles.objects.filter(user_id=uid).first()
+        if profile:
+            # stale-while-revalidate: отдаём сохранённое, обновление из Apofiz — в outbox
+            schedule_refresh(request.user, profile)
+        else:
+            sync_apofiz_token_and_user(request.user.username, request.auth.key)
+            profile = Profiles.objects.filter(user_id=uid).first()
         if not profile:
             return Response({"error": "Профиль не найден"}, status=status.HTTP_404_NOT_FOUND)
         user_role_obj = UserRoles.objects.filter(user_id=uid).first()
@@ -429,7 +342,8 @@ class CurrentUserView(APIView):
             "wallets": wallets,
             "transactions": transactions,
             "limits_and_settings": limits_serializer.data,
-            "apofiz_data": apofiz_data if status_code == 200 else None
+            "apofiz_data": profile.apofiz_data,
+            "synced_at": profile.apofiz_synced_at.isoformat() if profile.apofiz_synced_at else None
         }, status=status.HTTP_200_OK)
 
 
@@ -502,12 +416,12 @@ class InitProfileView(APIView):
         return Response(data, status=status_code)
 
 
-class GetEmailView(APIView):
+class GetEmailView(AsyncAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(operation_summary="Получить email (Apofiz)", tags=["Профиль пользователя"])
-    def get(self, request):
-        status_code, data = ApofizClient.get_email(request.auth.key)
+    async def get(self, request):
+        status_code, data = await AsyncApofizClient.get_email(request.auth.key)
         return Response(data, status=status_code)
 
 
@@ -523,23 +437,23 @@ class DeactivateProfileView(APIView):
         return Response(data, status=status_code)
 
 
-class UserPhoneNumbersView(APIView):
+class UserPhoneNumbersView(AsyncAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(operation_summary="Получить номера телефонов (Apofiz)", tags=["Профиль пользователя"])
-    def get(self, request, user_id):
-        status_code, data = ApofizClient.get_phone_numbers(request.auth.key, user_id)
+    async def get(self, request, user_id):
+        status_code, data = await AsyncApofizClient.get_phone_numbers(request.auth.key, user_id)
         return Response(data, status=status_code)
 
 
-class UpdatePhoneNumbersView(APIView):
+class UpdatePhoneNumbersView(AsyncAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(operation_summary="Обновить номера телефонов (Apofiz)", 
         request_body=openapi.Schema(type=openapi.TYPE_OBJECT, required=['phone_numbers'], properties={'phone_numbers': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING))}),
         tags=["Профиль пользователя"])
-    def post(self, request):
-        status_code, data = ApofizClient.update_phone_numbers(request.auth.key, request.data.get('phone_numbers', []))
+    async def post(self, request):
+        status_code, data = await AsyncApofizClient.update_phone_numbers(request.auth.key, request.data.get('phone_numbers', []))
         return Response(data, status=status_code)
 
 
@@ -564,54 +478,54 @@ class UploadAvatarView(APIView):
         return Response(data, status=status_code)
 
 
-class UserSocialNetworksView(APIView):
+class UserSocialNetworksView(AsyncAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(operation_summary="Получить соцсети (Apofiz)", tags=["Файлы и Соцсети"])
-    def get(self, request, user_id):
-        status_code, data = ApofizClient.get_social_networks(request.auth.key, user_id)
+    async def get(self, request, user_id):
+        status_code, data = await AsyncApofizClient.get_social_networks(request.auth.key, user_id)
         return Response(data, status=status_code)
 
 
-class SetSocialNetworksView(APIView):
+class SetSocialNetworksView(AsyncAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(operation_summary="Установить соцсети (Apofiz)", 
         request_body=openapi.Schema(type=openapi.TYPE_OBJECT, required=['networks'], properties={'networks': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING))}),
         tags=["Файлы и Соцсети"])
-    def post(self, request):
-        status_code, data = ApofizClient.set_social_networks(request.auth.key, request.data.get('networks', []))
+    async def post(self, request):
+        status_code, data = await AsyncApofizClient.set_social_networks(request.auth.key, request.data.get('networks', []))
         return Response(data, status=status_code)
 
 
-class ActiveDevicesView(APIView):
+class ActiveDevicesView(AsyncAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(operation_summary="Получить активные устройства (Apofiz)", 
         manual_parameters=[openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER), openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER)],
         tags=["Сессии"])
-    def get(self, request):
-        status_code, data = ApofizClient.get_active_devices(request.auth.key, request.query_params.get('page', 1), request.query_params.get('limit', 50))
+    async def get(self, request):
+        status_code, data = await AsyncApofizClient.get_active_devices(request.auth.key, request.query_params.get('page', 1), request.query_params.get('limit', 50))
         return Response(data, status=status_code)
 
 
-class AuthHistoryView(APIView):
+class AuthHistoryView(AsyncAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(operation_summary="История авторизаций (Apofiz)", 
         manual_parameters=[openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER), openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER)],
         tags=["Сессии"])
-    def get(self, request):
-        status_code, data = ApofizClient.get_auth_history(request.auth.key, request.query_params.get('page', 1), request.query_params.get('limit', 20))
+    async def get(self, request):
+        status_code, data = await AsyncApofizClient.get_auth_history(request.auth.key, request.query_params.get('page', 1), request.query_params.get('limit', 20))
         return Response(data, status=status_code)
 
 
-class TokenDetailView(APIView):
+class TokenDetailView(AsyncAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(operation_summary="Детали устройства/сессии (Apofiz)", tags=["Сессии"])
-    def get(self, request, device_id):
-        status_code, data = ApofizClient.get_token_detail(request.auth.key, device_id)
+    async def get(self, request, device_id):
+        status_code, data = await AsyncApofizClient.get_token_detail(request.auth.key, device_id)
         return Response(data, status=status_code)
     
 
@@ -832,6 +746,7 @@ class AdminSettingsListView(APIView):
             updated_settings.append(setting)
 
         if changes:
+            SettingsManager.invalidate()
             admin_id = str(request.user.id) if request.user and request.user.is_authenticated else "SYSTEM"
             admin_name = f"{request.user.first_name} {request.user.last_name}".strip() if request.user else "Admin"
             formatted_details = {
@@ -1440,9 +1355,9 @@ class OpenUserDetailView(APIView):
         ]
 
         from api.transactions_api.serializers import AdminTransactionSerializerDirect
-        txs_queryset = Transactions.objects.filter(
+        txs_queryset = AdminTransactionSerializerDirect.setup_eager_loading(Transactions.objects.filter(
             Q(user_id=uid) | Q(sender_id=uid) | Q(receiver_id=uid)
-        ).order_by('-created_at')[:5]
+        )).order_by('-created_at')[:5]
         
         txs_data = AdminTransactionSerializerDirect(txs_queryset, many=True, context={'target_user_id': uid}).data
 
@@ -1582,31 +1497,14 @@ class TelegramWebhookSaveChatIdView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def post(self, request):
-        username = request.data.get('username', '').strip().lower().replace('@', '')
-        chat_id = request.data.get('chat_id', '').strip()
+        username = telegram_chats.normalize(request.data.get('username', ''))
+        chat_id = str(request.data.get('chat_id', '')).strip()
 
         if not username or not chat_id:
             return Response({"error": "username and chat_id required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Update admin notification settings
-        updated_admin = AdminNotificationSettings.objects.filter(
-            telegram_username__iexact=username
-        ).update(telegram_chat_id=chat_id)
-
-        updated_admin2 = AdminNotificationSettings.objects.filter(
-            telegram_username__iexact=f"@{username}"
-        ).update(telegram_chat_id=chat_id)
-
-        # Update user notification settings
-        updated_user = UserNotificationSettings.objects.filter(
-            telegram_username__iexact=username
-        ).update(telegram_chat_id=chat_id)
-
-        updated_user2 = UserNotificationSettings.objects.filter(
-            telegram_username__iexact=f"@{username}"
-        ).update(telegram_chat_id=chat_id)
-
-        total = updated_admin + updated_admin2 + updated_user + updated_user2
+        # индекс username -> chat_id + настройки уведомлений (админские и пользовательские) с этим username
+        total = telegram_chats.remember(username, chat_id)
 
         return Response({
             "detail": f"Updated {total} record(s) for @{username}",
@@ -1615,16 +1513,20 @@ class TelegramWebhookSaveChatIdView(APIView):
 
 
 class StatementSendView(APIView):
-    """Send generated statement HTML to user channels (Telegram, WhatsApp, Email)."""
+    """Send statement to user channels (Telegram, WhatsApp, Email): generated on the server or HTML from the client."""
     permission_classes = [permissions.IsAuthenticated]
 
     @swagger_auto_schema(
         operation_summary="Отправить выписку через каналы уведомлений",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
-            required=['html_base64', 'channels'],
+            required=['channels'],
             properties={
-                'html_base64': openapi.Schema(type=openapi.TYPE_STRING, description='Base64-encoded HTML file'),
+                'start_date': openapi.Schema(type=openapi.TYPE_STRING, description='YYYY-MM-DD — выписка формируется на сервере'),
+                'end_date': openapi.Schema(type=openapi.TYPE_STRING, description='YYYY-MM-DD, включительно'),
+                'asset_filter': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING), description='card | iban | crypto'),
+                'format': openapi.Schema(type=openapi.TYPE_STRING, description='html | csv'),
+                'html_base64': openapi.Schema(type=openapi.TYPE_STRING, description='Base64-encoded HTML file (устаревший вариант)'),
                 'file_name': openapi.Schema(type=openapi.TYPE_STRING),
                 'channels': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING)),
                 'period_label': openapi.Schema(type=openapi.TYPE_STRING),
@@ -1636,27 +1538,55 @@ class StatementSendView(APIView):
         tags=["Выписки (Statements)"]
     )
     def post(self, request):
+        from apps.accounts_apps import identity
         from apps.accounts_apps.notifications import send_statement_to_channels
+        from apps.transactions_apps import statements
 
         html_base64 = request.data.get('html_base64', '')
+        start_date = request.data.get('start_date')
+        end_date = request.data.get('end_date')
         file_name = request.data.get('file_name', '')
         channels = request.data.get('channels', [])
         period_label = request.data.get('period_label', '')
         asset_labels = request.data.get('asset_labels', [])
         lang = request.data.get('lang', 'en')
 
-        if not html_base64 or not channels:
-            return Response({"error": "html_base64 and channels are required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not channels or not (html_base64 or (start_date and end_date)):
+            return Response(
+                {"error": "channels and either start_date/end_date or html_base64 are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        results = send_statement_to_channels(
-            user_id=request.user.id,
-            channels=channels,
-            period_label=period_label,
-            asset_labels=asset_labels,
-            lang=lang,
-            html_base64=html_base64,
-            file_name=file_name,
-        )
+        statement = None
+        if not html_base64:
+            try:
+                statement = statements.generate(
+                    user_id=request.user.id,
+                    start_date=start_date,
+                    end_date=end_date,
+                    asset_filter=request.data.get('asset_filter'),
+                    fmt=request.data.get('format', 'html'),
+                    lang=lang,
+                    user_name=identity.get(request.user.id).name,
+                    filename=file_name or None,
+                )
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = send_statement_to_channels(
+                user_id=request.user.id,
+                channels=channels,
+                period_label=period_label or (statement and statement.period_label) or '',
+                asset_labels=asset_labels,
+                lang=lang,
+                html_base64=html_base64,
+                file_name=file_name,
+                statement=statement,
+            )
+        finally:
+            if statement is not None:
+                statement.close()
 
         return Response({"results": results}, status=status.HTTP_200_OK)
 
@@ -0,0 +1,39 @@
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework import exceptions
+
+from .authentication import ApofizTokenAuthentication
+
+# браузер передаёт токен как второй подпротокол: new WebSocket(url, ['token', key]); сервер отвечает 'token'
+TOKEN_SUBPROTOCOL = 'token'
+
+
+@database_sync_to_async
+def get_user(key):
+    try:
+        user, _ = ApofizTokenAuthentication().authenticate_credentials(key)
+    except exceptions.AuthenticationFailed:
+        return AnonymousUser()
+    return user
+
+
+class TokenAuthMiddleware(BaseMiddleware):
+    """
+    Та же схема токенов, что и у REST (ApofizTokenAuthentication).
+    Браузер не может задать заголовки WebSocket, поэтому токен принимается из Sec-WebSocket-Protocol,
+    а не из ?token= — query string попадает в access-логи прокси и gunicorn.
+    """
+
+    async def __call__(self, scope, receive, send):
+        key = None
+        for name, value in scope.get('headers', []):
+            if name == b'authorization':
+                parts = value.decode().split()
+                if len(parts) == 2 and parts[0] == ApofizTokenAuthentication.keyword:
+                    key = parts[1]
+        subprotocols = scope.get('subprotocols') or []
+        if key is None and len(subprotocols) == 2 and subprotocols[0] == TOKEN_SUBPROTOCOL:
+            key = subprotocols[1]
+        scope['user'] = await get_user(key) if key else AnonymousUser()
+        return await super().__call__(scope, receive, send)
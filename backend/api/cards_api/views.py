@@ -1,3 +1,5 @@
+from api.transactions_api.filters import filter_user_transactions
+from api.transactions_api.pagination import TransactionCursorPagination
 from api.transactions_api.serializers import AdminTransactionSerializerDirect
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -145,15 +147,21 @@ class CardTransactionsListView(APIView):
             Q(card_id=card.id) | 
             Q(sender_card=card.card_number_encrypted) | 
             Q(recipient_card=card.card_number_encrypted)
-        ).order_by('-created_at')
+        )
+        transactions_qs = filter_user_transactions(transactions_qs, request.user.id, request.query_params)
+        transactions_qs = AdminTransactionSerializerDirect.setup_eager_loading(transactions_qs)
+        paginator = TransactionCursorPagination()
+        page = paginator.paginate_queryset(transactions_qs, request, view=self)
         
         serializer = AdminTransactionSerializerDirect(
-            transactions_qs, 
+            page, 
             many=True, 
             context={'target_user_id': str(request.user.id)}
         )
+        data = paginator.get_paginated_data(serializer.data)
 
         return Response({
             "card_id": card_id, 
-            "transactions": serializer.data
+            "transactions": data.pop("results"),
+            **data
         }, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -0,0 +1,31 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from api.accounts_api.ws_auth import TOKEN_SUBPROTOCOL
+from apps.accounts_apps.realtime import ledger_group
+
+
+class LedgerConsumer(AsyncJsonWebsocketConsumer):
+    """WebSocket с дельтами по транзакциям и балансам текущего пользователя."""
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.group_name = ledger_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        # браузер закрывает соединение, если сервер не подтвердил предложенный подпротокол
+        subprotocol = TOKEN_SUBPROTOCOL if TOKEN_SUBPROTOCOL in (self.scope.get('subprotocols') or []) else None
+        await self.accept(subprotocol=subprotocol)
+
+    async def disconnect(self, code):
+        group_name = getattr(self, 'group_name', None)
+        if group_name:
+            await self.channel_layer.group_discard(group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if content.get('type') == 'ping':
+            await self.send_json({"type": "pong"})
+
+    async def ledger_event(self, event):
+        await self.send_json({"type": "ledger", **event['payload']})
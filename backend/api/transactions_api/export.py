@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+import time
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from core import metrics
+from core.async_views import stream_content
+from .pagination import TransactionCursorPagination
+
+EXPORT_FIELDS = (
+    'id', 'created_at', 'type', 'status', 'amount', 'currency', 'fee',
+    'exchange_rate', 'original_amount', 'original_currency',
+    'sender_id', 'sender_name', 'sender_card', 'receiver_id', 'receiver_name', 'recipient_card',
+    'merchant_name', 'merchant_category', 'reference_id', 'description', 'card_id',
+)
+# direction — относительно пользователя выгрузки; cursor — позиция строки для продолжения выгрузки
+COLUMNS = EXPORT_FIELDS + ('direction', 'cursor')
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+FLUSH_BYTES = 64 * 1024
+
+
+def direction_for(row, user_id):
+    if row['sender_id'] == user_id and row['receiver_id'] == user_id:
+        return 'internal'
+    if row['receiver_id'] == user_id:
+        return 'inbound'
+    return 'outbound'
+
+
+def export_rows(queryset, user_id, cursor=None, limit=None):
+    """Строки от новых к старым серверным курсором (values, без моделей и сериализатора)."""
+    queryset = queryset.order_by(*TransactionCursorPagination.ordering)
+    if cursor:
+        queryset = TransactionCursorPagination.after_cursor(queryset, cursor)
+    queryset = queryset.values(*EXPORT_FIELDS)
+    if limit:
+        queryset = queryset[:limit]
+    for row in queryset.iterator(chunk_size=getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)):
+        row['direction'] = direction_for(row, user_id)
+        row['cursor'] = TransactionCursorPagination.encode_position(row['created_at'], row['id'])
+        yield row
+
+
+def ndjson_chunks(rows):
+    buffer = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer).encode()
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for row in rows:
+        writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else ('' if value is None else value)
+            for value in (row[c] for c in COLUMNS)
+        ])
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 — формат gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _counted(rows, fmt, scope):
+    started = time.monotonic()
+    count = 0
+    try:
+        for row in rows:
+            count += 1
+            yield row
+    finally:
+        metrics.inc('transaction_export_rows_total', count, format=fmt, scope=scope)
+        metrics.observe('transaction_export_seconds', time.monotonic() - started, format=fmt, scope=scope)
+
+
+def export_response(request, queryset, user_id, scope):
+    """
+    Потоковая выгрузка queryset транзакций. Параметры запроса:
+    export_format=ndjson|csv, gzip=1, cursor (продолжить после строки), limit.
+    Память постоянна: строки идут серверным курсором и отдаются чанками по ~64 КБ.
+    """
+    params = request.query_params
+    fmt = params.get('export_format', 'ndjson')
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+    try:
+        limit = int(params['limit']) if params.get('limit') else None
+    except ValueError:
+        raise ValueError("limit должен быть числом")
+    cursor = params.get('cursor')
+    if cursor:
+        TransactionCursorPagination.decode_cursor(cursor)  # некорректный курсор — 400 до начала потока
+
+    rows = _counted(export_rows(queryset, str(user_id), cursor, limit), fmt, scope)
+    chunks = csv_chunks(rows) if fmt == 'csv' else ndjson_chunks(rows)
+    filename = f"transactions_{user_id}_{timezone.now().strftime('%Y%m%d%H%M%S')}.{fmt}"
+    use_gzip = params.get('gzip') in ('1', 'true', 'True')
+    if use_gzip:
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+
+    response = StreamingHttpResponse(
+        stream_content(request, chunks),
+        content_type='application/gzip' if use_gzip else CONTENT_TYPES[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    response['X-Accel-Buffering'] = 'no'  # nginx не копит ответ целиком
+    return response
@@ -0,0 +1,61 @@
+from django.db.models import Exists, OuterRef, Q
+
+from apps.transactions_apps.models import LedgerFeed, Transactions
+
+
+def filter_user_transactions(txs, user_id, params, through=''):
+    """
+    Фильтры истории пользователя: direction, type (bank/card/crypto), card_type, start_date, end_date.
+    through='transaction' — txs это строки ledger_feed; даты фильтруются по её created_at (тот же индекс).
+    """
+    user_id = str(user_id)
+    prefix = f"{through}__" if through else ''
+    tx_type = params.get('type')
+    card_type = params.get('card_type')
+    direction = params.get('direction')
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+
+    if direction == 'internal':
+        txs = txs.filter(**{f'{prefix}sender_id': user_id, f'{prefix}receiver_id': user_id})
+    elif direction == 'inbound':
+        txs = txs.filter(**{f'{prefix}receiver_id': user_id}).exclude(**{f'{prefix}sender_id': user_id})
+    elif direction == 'outbound':
+        txs = txs.exclude(**{f'{prefix}receiver_id': user_id})
+    if tx_type in ('bank', 'card', 'crypto'):
+        txs = txs.filter(**{f'{prefix}id__in': feed_transaction_ids(user_id, tx_type)})
+    if card_type:
+        txs = txs.filter(**{f'{prefix}card__type__iexact': card_type})
+    if start_date:
+        txs = txs.filter(created_at__gte=start_date)
+    if end_date:
+        txs = txs.filter(created_at__lte=f"{end_date} 23:59:59")
+    return txs
+
+
+def user_transactions(user_id, include_owner=False):
+    user_id = str(user_id)
+    condition = Q(sender_id=user_id) | Q(receiver_id=user_id)
+    if include_owner:
+        condition |= Q(user_id=user_id)
+    return Transactions.objects.filter(condition)
+
+
+def feed_transaction_ids(user_id, account_type):
+    return LedgerFeed.objects.filter(user_id=str(user_id), account_type=account_type).values('transaction_id')
+
+
+def account_feed(user_id, account_type):
+    """
+    История по счёту пользователя (bank/card/crypto): страница строится по ledger_feed
+    (индекс user_id, account_type, created_at), транзакция подтягивается JOIN'ом.
+    Перевод между своими счетами одного типа (debit + credit) даёт одну строку — debit.
+    """
+    user_id = str(user_id)
+    paired_debit = LedgerFeed.objects.filter(
+        user_id=OuterRef('user_id'), transaction_id=OuterRef('transaction_id'),
+        account_type=OuterRef('account_type'), direction='debit',
+    )
+    return LedgerFeed.objects.filter(user_id=user_id, account_type=account_type).exclude(
+        Exists(paired_debit), direction='credit',
+    )
@@ -0,0 +1,114 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+def approximate_count(queryset):
+    """Оценка количества строк по плану Postgres (без COUNT по всей выборке)."""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class TransactionCursorPagination(BasePagination):
+    """
+    Keyset-пагинация по (created_at, id), от новых к старым.
+    Параметры: cursor, page_size (или limit), include_total=1 (оценка approx_count по плану).
+    exact_count=True — точный count в каждом ответе, для клиентов, которые листают по нему страницы.
+    offset поддерживается только для старых клиентов как стартовая позиция.
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self, default_page_size=None, max_page_size=None, exact_count=False):
+        self.default_page_size = default_page_size or getattr(settings, 'TRANSACTIONS_PAGE_SIZE', 50)
+        self.max_page_size = max_page_size or getattr(settings, 'TRANSACTIONS_MAX_PAGE_SIZE', 200)
+        self.exact_count = exact_count
+
+    @staticmethod
+    def encode_cursor(obj):
+        return TransactionCursorPagination.encode_position(obj.created_at, obj.id)
+
+    @staticmethod
+    def encode_position(created_at, obj_id):
+        raw = json.dumps([created_at.isoformat(), str(obj_id)])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @classmethod
+    def after_cursor(cls, queryset, cursor):
+        """Строки после позиции курсора в порядке ordering (от новых к старым)."""
+        created_at, obj_id = cls.decode_cursor(cursor)
+        return queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=obj_id))
+
+    @staticmethod
+    def decode_cursor(value):
+        try:
+            padded = value + '=' * (-len(value) % 4)
+            created_at, obj_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError
+            return created_at, obj_id
+        except Exception:
+            raise ValidationError({"error": "Некорректный cursor"})
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param) or request.query_params.get('limit')
+        try:
+            size = int(raw) if raw else self.default_page_size
+        except (TypeError, ValueError):
+            size = self.default_page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.count = self.approx_total = None
+        if self.exact_count:
+            self.count = queryset.count()
+        elif request.query_params.get('include_total') in ('1', 'true', 'True'):
+            self.approx_total = approximate_count(queryset)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = self.after_cursor(queryset, cursor)
+            start = 0
+        else:
+            try:
+                start = max(int(request.query_params.get('offset', 0)), 0)
+            except (TypeError, ValueError):
+                start = 0
+
+        rows = list(queryset[start:start + self.page_size + 1])
+        self.has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        self.next_cursor = self.encode_cursor(self.page[-1]) if self.has_more else None
+        return self.page
+
+    def get_paginated_data(self, data):
+        payload = {
+            "results": data,
+            "next_cursor": self.next_cursor,
+            "has_more": self.has_more,
+            "page_size": self.page_size,
+        }
+        if self.count is not None:
+            payload["count"] = self.count
+        if self.approx_total is not None:
+            payload["approx_count"] = self.approx_total
+        return payload
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
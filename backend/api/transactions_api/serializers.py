@@ -1,6 +1,25 @@
 from apps.transactions_apps.models import Transactions
 from rest_framework import serializers
 
+
+class EagerLoadingMixin:
+    """Сериализатор объявляет связи, которые читает; список подгружает их одним запросом."""
+    SELECT_RELATED = ()
+    PREFETCH_RELATED = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, through=None):
+        """through — FK на сериализуемую модель, если список строится по другой (ledger_feed -> transaction)."""
+        prefix = f"{through}__" if through else ''
+        if through:
+            queryset = queryset.select_related(through)
+        if cls.SELECT_RELATED:
+            queryset = queryset.select_related(*(prefix + name for name in cls.SELECT_RELATED))
+        if cls.PREFETCH_RELATED:
+            queryset = queryset.prefetch_related(*(prefix + name for name in cls.PREFETCH_RELATED))
+        return queryset
+
+
 class BankTopupRequestSerializer(serializers.Serializer):
     transfer_rail = serializers.ChoiceField(
         choices=['UAE_LOCAL_AED', 'SWIFT_INTL'],
@@ -133,7 +152,10 @@ class CryptoWalletWithdrawalResponseSerializer(serializers.Serializer):
     credited_amount = serializers.DecimalField(max_digits=15, decimal_places=6)
 
 
-class TransactionFullSerializer(serializers.ModelSerializer):
+class TransactionFullSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    SELECT_RELATED = ('card_transfer', 'bank_withdrawal', 'crypto_withdrawal', 'bank_topup', 'crypto_topup')
+    PREFETCH_RELATED = ('fee_revenues',)
+
     fee_details = serializers.SerializerMethodField(help_text="Умная структура комиссий (поддерживает составные списания)")
 
     class Meta:
@@ -144,8 +166,8 @@ class TransactionFullSerializer(serializers.ModelSerializer):
         total_fee = float(obj.fee) if obj.fee is not None else 0.0
         currency = obj.currency
         components = []
-        fee_revenues = obj.fee_revenues.all()
-        if fee_revenues.exists():
+        fee_revenues = list(obj.fee_revenues.all())
+        if fee_revenues:
             for fr in fee_revenues:
                 components.append({
                     "name": fr.fee_type,
@@ -215,7 +237,12 @@ class TransactionFullSerializer(serializers.ModelSerializer):
         }
 
 
-class AdminTransactionSerializerDirect(serializers.ModelSerializer):
+class AdminTransactionSerializerDirect(EagerLoadingMixin, serializers.ModelSerializer):
+    # строка списка читает только колонки transactions: card отдаётся как card_id, поля квитанции — из metadata;
+    # новое обращение к связи добавляется сюда, иначе тесты assertNumQueries по спискам упадут
+    SELECT_RELATED = ()
+    PREFETCH_RELATED = ()
+
     direction = serializers.SerializerMethodField()
     display = serializers.SerializerMethodField()
 
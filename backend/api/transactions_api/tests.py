@@ -1,3 +1,789 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+import threading
+import time
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+
+from channels.routing import URLRouter
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.throttling import BaseThrottle
+from rest_framework.test import APIClient
+
+from api.accounts_api.ws_auth import TokenAuthMiddleware
+from api.transactions_api.export import COLUMNS
+from api.transactions_api.views import XerimeInfoView
+from api.transactions_api.routing import websocket_urlpatterns
+
+from apps.cards_apps.models import Cards
+from apps.transactions_apps.models import (
+    BalanceMovements, CryptoWallets, FeeRevenue, FeeRevenueDaily, FundsHolds, LedgerFeed, ProviderTokens, Transactions,
+)
+from apps.transactions_apps import statements
+from apps.transactions_apps.services import (
+    FundsHoldService, PricingService, RevenueRollup, SettingsManager, TransactionService,
+)
+from apps.transactions_apps.xerime_client import AsyncXerimeClient, CircuitBreaker, XerimeClient, XerimeTokenManager
+
+
+def index_name(model, *fields):
+    return next(index.name for index in model._meta.indexes if tuple(index.fields) == fields)
+
+
+class TransactionIndexPlanTests(TestCase):
+    """
+    Горячие запросы по транзакциям должны идти по индексам из user-003, а не Seq Scan.
+    На тестовом объёме Seq Scan дешевле любого индекса, поэтому он выключен (enable_seqscan = off):
+    тест проверяет, что нужный индекс подходит запросу, а выбор на проде — explain_transaction_queries.
+    """
+
+    USERS = 200
+    PER_USER = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        statuses = ['completed'] * 18 + ['pending', 'failed']
+        txns = []
+        for u in range(cls.USERS):
+            for i in range(cls.PER_USER):
+                txns.append(Transactions(
+                    user_id=str(u), type='card_transfer', status=statuses[i % len(statuses)],
+                    amount=Decimal('10.00'), currency='AED',
+                    sender_id=str(u), receiver_id=str((u + 1) % cls.USERS),
+                    reference_id=f"REF-{u}-{i}",
+                ))
+        Transactions.objects.bulk_create(txns, batch_size=1000)
+        # created_at — auto_now_add; разносим по времени, как в живой базе
+        Transactions.objects.update(created_at=now - timedelta(days=30))
+        movements = []
+        feed = []
+        for txn in txns:
+            movements.append(BalanceMovements(
+                transaction=txn, user_id=txn.sender_id, account_type='bank', amount=txn.amount, type='debit',
+            ))
+            feed.append(LedgerFeed(
+                transaction=txn, user_id=txn.sender_id, account_type='bank', direction='debit',
+                amount=txn.amount, created_at=now,
+            ))
+        BalanceMovements.objects.bulk_create(movements, batch_size=1000)
+        LedgerFeed.objects.bulk_create(feed, batch_size=1000)
+        with connection.cursor() as cursor:
+            for model in (Transactions, BalanceMovements, LedgerFeed):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def setUp(self):
+        # действует до конца транзакции теста
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, *names):
+        plan = queryset.explain()
+        table = queryset.model._meta.db_table
+        self.assertNotIn(f"Seq Scan on {table}", plan, plan)
+        for name in names:
+            self.assertIn(name, plan, plan)
+
+    def test_history_by_party(self):
+        uid = '7'
+        self.assertUsesIndex(
+            Transactions.objects.filter(Q(sender_id=uid) | Q(receiver_id=uid)).order_by('-created_at')[:50],
+            index_name(Transactions, 'sender_id', 'created_at'),
+            index_name(Transactions, 'receiver_id', 'created_at'),
+        )
+
+    def test_sent_since(self):
+        self.assertUsesIndex(
+            Transactions.objects.filter(sender_id='7', created_at__gte=timezone.now() - timedelta(days=1)),
+            index_name(Transactions, 'sender_id', 'created_at'),
+        )
+
+    def test_by_reference(self):
+        self.assertUsesIndex(
+            Transactions.objects.filter(reference_id='REF-7-3'),
+            index_name(Transactions, 'reference_id'),
+        )
+
+    def test_in_flight(self):
+        self.assertUsesIndex(
+            Transactions.objects.filter(
+                status__in=['pending', 'processing'], created_at__lt=timezone.now() - timedelta(minutes=10)
+            ),
+            'transactions_in_flight_idx',
+        )
+
+    def test_movements_by_account(self):
+        self.assertUsesIndex(
+            BalanceMovements.objects.filter(user_id='7', account_type='bank'),
+            index_name(BalanceMovements, 'user_id', 'account_type'),
+        )
+
+    def test_account_list_view(self):
+        # план запроса, который реально выполняет /transactions/iban/, а не его упрощённой копии
+        client = APIClient()
+        client.force_authenticate(User.objects.create(id=7, username='971500000007'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get('/api/v1/transactions/iban/').status_code, 200)
+        [sql] = [q['sql'] for q in queries.captured_queries if 'FROM "ledger_feed"' in q['sql']]
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}")
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        self.assertNotIn("Seq Scan on ledger_feed", plan, plan)
+        self.assertIn(index_name(LedgerFeed, 'user_id', 'account_type', 'created_at'), plan, plan)
+
+
+class PricingRuleTests(SimpleTestCase):
+    """types и quotes одной котировки описывают одну и ту же комиссию."""
+
+    TABLE = {
+        'exchange_rates': dict(PricingService.EXCHANGE_RATE_DEFAULTS),
+        'fees': dict(PricingService.FEE_DEFAULTS),
+        'limits': {kind: {'min': 0, 'max': 10 ** 7, 'daily': 10 ** 7, 'monthly': 10 ** 7} for kind in ('transfer', 'withdrawal')},
+    }
+
+    def test_type_info_matches_quote(self):
+        for tx_type in PricingService.TYPES:
+            with self.subTest(tx_type=tx_type):
+                info = PricingService.get_type_info(tx_type, self.TABLE)
+                quote = PricingService.calculate(tx_type, Decimal('100'), self.TABLE)
+                self.assertEqual(info['service_fee_percent'] + info['network_fee_percent'], quote['fee_percent'])
+                self.assertEqual(info['service_fee_flat'] + info['network_fee_flat'], quote['fee_flat'])
+                self.assertEqual(info['exchange_rate'], quote['exchange_rate'])
+
+    def test_provider_types_have_no_fee(self):
+        for tx_type in ('iban_to_iban', 'crypto_to_crypto'):
+            info = PricingService.get_type_info(tx_type, self.TABLE)
+            quote = PricingService.calculate(tx_type, Decimal('100'), self.TABLE)
+            self.assertEqual(quote['fee'], 0)
+            self.assertEqual(info['service_fee_percent'] + info['network_fee_percent'], 0)
+
+
+
+class PricingQuoteExecutionTests(TestCase):
+    """Котировка /quotes/ совпадает с тем, что реально списывают и зачисляют execute_*."""
+
+    def setUp(self):
+        cache.clear()
+        SettingsManager._snapshot = None
+        self.sender = Cards.objects.create(
+            user_id='1', type='virtual', name='Virtual', status='active', balance=Decimal('1000.00'),
+            card_number_encrypted='4000000000000001',
+        )
+        self.receiver = Cards.objects.create(
+            user_id='2', type='metal', name='Metal', status='active', balance=Decimal('0.00'),
+            card_number_encrypted='4000000000000002',
+        )
+        self.wallet = CryptoWallets.objects.create(
+            user_id='1', address='TQuoteWallet', token='USDT', network='TRC20', balance=Decimal('500'),
+        )
+        self.table = PricingService.get_pricing_table('1')
+
+    def assertMoved(self, quote, source, source_before, target, target_before):
+        source.refresh_from_db()
+        target.refresh_from_db()
+        self.assertEqual(source_before - source.balance, Decimal(str(quote['total_debit'])))
+        self.assertEqual(target.balance - target_before, Decimal(str(quote['credit_amount'])))
+
+    def test_card_to_card(self):
+        quote = PricingService.calculate('card_to_card', Decimal('123.45'), self.table)
+        txn = TransactionService.execute_card_transfer(
+            '1', self.sender.id, self.receiver.card_number_encrypted, Decimal('123.45'),
+        )
+        self.assertEqual(txn.fee, Decimal(str(quote['fee'])))
+        self.assertMoved(quote, self.sender, Decimal('1000.00'), self.receiver, Decimal('0.00'))
+
+    def test_card_to_crypto(self):
+        quote = PricingService.calculate('card_to_crypto', Decimal('100'), self.table)
+        txn, total_debit, fee, credited = TransactionService.execute_card_to_crypto(
+            '1', self.sender.id, self.wallet.address, Decimal('100'),
+        )
+        self.assertEqual(fee, Decimal(str(quote['fee'])))
+        self.assertMoved(quote, self.sender, Decimal('1000.00'), self.wallet, Decimal('500'))
+
+    def test_crypto_to_card(self):
+        quote = PricingService.calculate('crypto_to_card', Decimal('50'), self.table)
+        txn, total_debit, fee, credited = TransactionService.execute_crypto_to_card(
+            '1', self.wallet.id, self.receiver.card_number_encrypted, Decimal('50'),
+        )
+        self.assertEqual(fee, Decimal(str(quote['fee'])))
+        self.assertMoved(quote, self.wallet, Decimal('500'), self.receiver, Decimal('0.00'))
+
+
+class TransactionListQueryCountTests(TestCase):
+    """Число запросов списка не зависит от размера страницы (нет N+1 в AdminTransactionSerializerDirect)."""
+
+    ROWS = 30
+    PAGE_SIZES = (5, 25)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='971500000000')
+        cls.uid = str(cls.user.id)
+        cls.card = Cards.objects.create(user_id=cls.uid, type='virtual', name='Virtual', status='active')
+        now = timezone.now()
+        for i in range(cls.ROWS):
+            account_type = ('bank', 'card', 'crypto')[i % 3]
+            txn = Transactions.objects.create(
+                user_id=cls.uid, type='bank_withdrawal', status='completed', amount=Decimal('10.00'),
+                currency='AED', sender_id=cls.uid, receiver_id='other',
+                card=cls.card if account_type == 'card' else None,
+                metadata={'iban_mask': 'AE07****1234', 'beneficiary_name': 'Receiver'},
+            )
+            LedgerFeed.objects.create(
+                transaction=txn, user_id=cls.uid, account_type=account_type, direction='debit',
+                amount=txn.amount, created_at=now,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertListQueries(self, url, expected, **params):
+        for page_size in self.PAGE_SIZES:
+            with self.subTest(url=url, page_size=page_size), self.assertNumQueries(expected):
+                response = self.client.get(url, {'page_size': page_size, **params})
+                self.assertEqual(response.status_code, 200, response.content)
+
+    def test_all(self):
+        # страница + проверка следующей строки входит в тот же запрос
+        self.assertListQueries('/api/v1/transactions/all/', 1)
+
+    def test_by_account(self):
+        for url in ('/api/v1/transactions/iban/', '/api/v1/transactions/card-transactions/', '/api/v1/transactions/crypto/'):
+            self.assertListQueries(url, 1)
+
+    def test_card_filter(self):
+        # + поиск карты
+        self.assertListQueries('/api/v1/transactions/card-transactions/', 2, card_id=self.card.id)
+        self.assertListQueries(f'/api/v1/cards/cards/{self.card.id}/transactions/', 2)
+
+    def test_exact_count_lists(self):
+        # + точный COUNT
+        self.assertListQueries(f'/api/v1/transactions/admin/user/{self.uid}/transactions/', 2)
+        self.assertListQueries('/api/v1/transactions/open/user/transactions/', 2)
+
+
+
+class AccountFeedListTests(TestCase):
+    """Список по счёту листается по ledger_feed; перевод между своими картами — одна строка."""
+
+    def setUp(self):
+        self.user = User.objects.create(username='971500000002')
+        self.uid = str(self.user.id)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        self.ids = []
+        for i in range(3):
+            txn = Transactions.objects.create(
+                user_id=self.uid, type='card_transfer', status='completed', amount=Decimal('5.00'),
+                currency='AED', sender_id=self.uid, receiver_id=self.uid,
+            )
+            for direction in ('debit', 'credit'):
+                LedgerFeed.objects.create(
+                    transaction=txn, user_id=self.uid, account_type='card', direction=direction,
+                    amount=txn.amount, created_at=now - timedelta(minutes=i),
+                )
+            self.ids.append(str(txn.id))
+
+    def test_pages_follow_feed_without_duplicates(self):
+        seen, cursor = [], None
+        while True:
+            params = {'page_size': 2, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get('/api/v1/transactions/card-transactions/', params).json()
+            seen += [row['id'] for row in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, self.ids)
+
+
+class RecoverStuckHoldsTests(TestCase):
+    """Спорный резерв возвращается только по явному отказу провайдера, а не по отсутствию заявки."""
+
+    def setUp(self):
+        self.wallet = CryptoWallets.objects.create(user_id='1', address='TTestAddress', balance=Decimal('100'))
+        self.hold = FundsHoldService.reserve(
+            '1', 'crypto_wallet', self.wallet.id, Decimal('40'), 'USDT', 'crypto_withdrawal', 'CW-TEST-1',
+        )
+        FundsHolds.objects.filter(id=self.hold.id).update(
+            status='in_doubt', updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+    def run_command(self, **provider):
+        with mock.patch.object(XerimeClient, 'get_crypto_withdrawal_details', **provider) as lookup:
+            call_command('recover_stuck_holds', stdout=StringIO(), stderr=StringIO())
+        lookup.assert_called_once_with('CW-TEST-1')
+        self.hold.refresh_from_db()
+        self.wallet.refresh_from_db()
+
+    def test_not_found_stays_in_doubt(self):
+        response = requests.Response()
+        response.status_code = 404
+        self.run_command(side_effect=requests.HTTPError(response=response))
+        self.assertEqual(self.hold.status, 'in_doubt')
+        self.assertEqual(self.wallet.balance, Decimal('60'))
+
+    def test_provider_error_stays_in_doubt(self):
+        response = requests.Response()
+        response.status_code = 503
+        self.run_command(side_effect=requests.HTTPError(response=response))
+        self.assertEqual(self.hold.status, 'in_doubt')
+        self.assertEqual(self.wallet.balance, Decimal('60'))
+
+    def test_failed_is_released(self):
+        self.run_command(return_value={'external_reference': 'CW-TEST-1', 'status': 'FAILED'})
+        self.assertEqual(self.hold.status, 'released')
+        self.assertEqual(self.wallet.balance, Decimal('100'))
+
+    def test_manual_release(self):
+        call_command('recover_stuck_holds', release='CW-TEST-1', stdout=StringIO())
+        self.hold.refresh_from_db()
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.hold.status, 'released')
+        self.assertEqual(self.wallet.balance, Decimal('100'))
+
+
+
+class WithdrawalHoldFailureTests(TestCase):
+    """Резерв возвращается только при явном отказе провайдера; 409 и битый ответ 2xx — in_doubt."""
+
+    def setUp(self):
+        self.wallet = CryptoWallets.objects.create(user_id='1', address='TTestAddress', balance=Decimal('100'))
+
+    def withdraw(self, status_code, content=b'{}'):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = content
+        with mock.patch.object(XerimeClient, '_request', return_value=response):
+            with self.assertRaises(ValueError):
+                TransactionService.execute_crypto_wallet_withdrawal(
+                    '1', self.wallet.id, 'TExternalAddr', Decimal('40'), 'USDT', 'TRC20',
+                )
+        self.wallet.refresh_from_db()
+        return FundsHolds.objects.get(user_id='1', operation='crypto_withdrawal')
+
+    def test_rejection_is_released(self):
+        hold = self.withdraw(422)
+        self.assertEqual(hold.status, 'released')
+        self.assertEqual(self.wallet.balance, Decimal('100'))
+
+    def test_bad_request_without_json_is_released(self):
+        hold = self.withdraw(400, b'<html>Bad Request</html>')
+        self.assertEqual(hold.status, 'released')
+        self.assertEqual(self.wallet.balance, Decimal('100'))
+
+    def test_already_exists_stays_in_doubt(self):
+        hold = self.withdraw(409)
+        self.assertEqual(hold.status, 'in_doubt')
+        self.assertEqual(self.wallet.balance, Decimal('60'))
+
+    def test_unparseable_success_stays_in_doubt(self):
+        hold = self.withdraw(200, b'<html>gateway</html>')
+        self.assertEqual(hold.status, 'in_doubt')
+        self.assertEqual(self.wallet.balance, Decimal('60'))
+
+
+class XerimeTokenSingleFlightTests(TransactionTestCase):
+    """Одновременный старт 50 потоков без токена — один логин у провайдера."""
+
+    THREADS = 50
+
+    def setUp(self):
+        XerimeTokenManager._remember(None, None)
+        self.addCleanup(XerimeTokenManager._remember, None, None)
+
+    def test_concurrent_get_token_logs_in_once(self):
+        def slow_login():
+            # окно гонки: остальные потоки успевают прийти за токеном, пока идёт логин
+            time.sleep(0.2)
+            return 'token-1', 3600
+
+        barrier = threading.Barrier(self.THREADS)
+        results, errors = [], []
+
+        def worker():
+            try:
+                barrier.wait()
+                results.append(XerimeClient.get_token())
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        with mock.patch.object(XerimeClient, 'fetch_token', side_effect=slow_login) as login:
+            threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(login.call_count, 1)
+        self.assertEqual(results, ['token-1'] * self.THREADS)
+
+    def test_refresh_survives_caller_rollback(self):
+        # логин внутри чужой транзакции: токен сохраняется отдельно и не теряется при её откате
+        with mock.patch.object(XerimeClient, 'fetch_token', return_value=('token-1', 3600)) as login:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    self.assertEqual(XerimeClient.get_token(), 'token-1')
+                    raise RuntimeError("caller failed")
+            XerimeTokenManager._remember(None, None)
+            self.assertEqual(XerimeClient.get_token(), 'token-1')
+
+        self.assertEqual(login.call_count, 1)
+        self.assertEqual(ProviderTokens.objects.get(provider=XerimeTokenManager.PROVIDER).token, 'token-1')
+
+
+
+class CircuitBreakerHalfOpenTests(TransactionTestCase):
+    """Half-open breaker и истёкший токен: логин не упирается в пробный запрос, breaker закрывается."""
+
+    def setUp(self):
+        XerimeTokenManager._remember(None, None)
+        self.addCleanup(XerimeTokenManager._remember, None, None)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.failures = 1
+        breaker.opened_at = time.monotonic() - 31
+        patcher = mock.patch.object(XerimeClient, '_breaker', breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = breaker
+
+    @staticmethod
+    def respond(method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        if url.endswith('/login'):
+            response._content = b'{"access_token": "token-2", "expires_in": 3600}'
+        else:
+            assert kwargs['headers'] == {"Authorization": "Bearer token-2"}
+            response._content = b'{"rate": "3.67"}'
+        return response
+
+    def test_expired_token_login_closes_breaker(self):
+        session = mock.Mock(request=mock.Mock(side_effect=self.respond))
+        with mock.patch.object(XerimeClient, 'get_session', return_value=session):
+            response = XerimeClient._request('GET', '/rates/USD/AED', 'rates')
+
+        self.assertEqual(response.json(), {"rate": "3.67"})
+        self.assertEqual(session.request.call_count, 2)
+        self.assertIsNone(self.breaker.opened_at)
+        self.assertFalse(self.breaker.trial_in_flight)
+
+    def test_failed_login_does_not_leave_trial_in_flight(self):
+        session = mock.Mock(request=mock.Mock(side_effect=requests.ConnectionError("down")))
+        with mock.patch.object(XerimeClient, 'get_session', return_value=session):
+            with self.assertRaises(ValueError):
+                XerimeClient._request('GET', '/rates/USD/AED', 'rates')
+
+        self.assertFalse(self.breaker.trial_in_flight)
+        self.assertIsNotNone(self.breaker.opened_at)
+
+
+class LedgerSocketAuthTests(TransactionTestCase):
+    """Токен сокета — в Sec-WebSocket-Protocol; ?token= больше не принимается (попадает в логи)."""
+
+    KEY = 'b' * 40
+
+    def setUp(self):
+        Token.objects.create(user=User.objects.create(username='971500000002'), key=self.KEY)
+        self.application = TokenAuthMiddleware(URLRouter(websocket_urlpatterns))
+
+    @async_to_sync
+    async def connect(self, query_string='', subprotocols=()):
+        communicator = ApplicationCommunicator(self.application, {
+            'type': 'websocket', 'path': '/ws/ledger/', 'query_string': query_string.encode(),
+            'headers': [], 'subprotocols': list(subprotocols),
+        })
+        await communicator.send_input({'type': 'websocket.connect'})
+        response = await communicator.receive_output(timeout=5)
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait(timeout=5)
+        return response
+
+    def test_subprotocol_token_is_accepted(self):
+        response = self.connect(subprotocols=['token', self.KEY])
+        self.assertEqual(response['type'], 'websocket.accept')
+        self.assertEqual(response['subprotocol'], 'token')
+
+    def test_query_string_token_is_rejected(self):
+        response = self.connect(query_string=f'token={self.KEY}')
+        self.assertEqual(response['type'], 'websocket.close')
+        self.assertEqual(response['code'], 4401)
+
+
+class DenyThrottle(BaseThrottle):
+
+    def allow_request(self, request, view):
+        return False
+
+    def wait(self):
+        return 30
+
+
+class AsyncAPIViewDispatchTests(TestCase):
+    """AsyncAPIView под ASGI: аутентификация, permissions и handle_exception работают как у APIView."""
+
+    URL = '/api/v1/transactions/xerime/info/rate/'
+    KEY = 'c' * 40
+
+    def setUp(self):
+        cache.clear()
+        Token.objects.create(user=User.objects.create(username='971500000003'), key=self.KEY)
+        self.client = AsyncClient()
+        self.auth = {'Authorization': f"Token {self.KEY}"}
+
+    async def test_authenticated_request_awaits_handler(self):
+        rate = mock.AsyncMock(return_value={'rate': '90.5'})
+        with mock.patch.object(AsyncXerimeClient, 'get_exchange_rate', rate):
+            response = await self.client.get(self.URL, {'from': 'RUB', 'to': 'USDT'}, headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'rate': '90.5'})
+        rate.assert_awaited_once_with('RUB', 'USDT')
+
+    async def test_missing_credentials(self):
+        response = await self.client.get(self.URL)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    async def test_rejected_token(self):
+        rejected = mock.Mock(status_code=401)
+        with mock.patch('api.accounts_api.authentication.requests.get', return_value=rejected):
+            response = await self.client.get(self.URL, headers={'Authorization': f"Token {'d' * 40}"})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    async def test_throttled(self):
+        with mock.patch.object(XerimeInfoView, 'throttle_classes', [DenyThrottle]):
+            response = await self.client.get(self.URL, headers=self.auth)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+    async def test_method_not_allowed(self):
+        response = await self.client.post(self.URL, headers=self.auth)
+        self.assertEqual(response.status_code, 405)
+
+
+class TransactionExportTests(TestCase):
+    """Выгрузка продолжается по cursor последней строки без пропусков и повторов; gzip распаковывается целиком."""
+
+    URL = '/api/v1/transactions/export/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='971500000004')
+        cls.uid = str(cls.user.id)
+        now = timezone.now()
+        for i in range(7):
+            txn = Transactions.objects.create(
+                user_id=cls.uid, type='card_transfer', status='completed', amount=Decimal(i + 1),
+                currency='AED', sender_id=cls.uid if i % 2 else 'other', receiver_id='other' if i % 2 else cls.uid,
+                description=f"Перевод №{i}",
+            )
+            # три строки с одинаковым created_at: порядок между ними решает id
+            Transactions.objects.filter(id=txn.id).update(created_at=now - timedelta(minutes=min(i, 3)))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def ndjson(self, **params):
+        return [json.loads(line) for line in self.export(**params)[1].decode().splitlines()]
+
+    def test_cursor_resumes_after_last_row(self):
+        full = self.ndjson()
+        expected = list(
+            Transactions.objects.filter(user_id=self.uid).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual([row['id'] for row in full], [str(pk) for pk in expected])
+
+        resumed = []
+        page = self.ndjson(limit=2)
+        while page:
+            resumed += page
+            page = self.ndjson(limit=2, cursor=page[-1]['cursor'])
+        self.assertEqual(resumed, full)
+        self.assertEqual({row['direction'] for row in full}, {'inbound', 'outbound'})
+
+    def test_gzip_csv(self):
+        response, content = self.export(export_format='csv', gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertTrue(response['Content-Disposition'].endswith('.csv.gz"'))
+        rows = list(csv.reader(StringIO(gzip.decompress(content).decode())))
+        self.assertEqual(tuple(rows[0]), COLUMNS)
+        self.assertEqual([row[0] for row in rows[1:]], [row['id'] for row in self.ndjson()])
+
+    def test_invalid_parameters(self):
+        for params in ({'cursor': 'not-a-cursor'}, {'export_format': 'xml'}, {'limit': 'ten'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.URL, params).status_code, 400)
+
+    async def test_streams_under_asgi(self):
+        key = 'e' * 40
+        await Token.objects.acreate(user=self.user, key=key)
+        response = await AsyncClient().get(self.URL, {'export_format': 'csv'}, headers={'Authorization': f"Token {key}"})
+        self.assertEqual(response.status_code, 200)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.decode().splitlines()), 8)
+
+
+class RevenueRollupTests(TestCase):
+    """Дневные итоги комиссий совпадают с сырыми fee_revenue после вставки, правки и удаления."""
+
+    def setUp(self):
+        self.txn = Transactions.objects.create(
+            user_id='1', type='card_transfer', status='completed', amount=Decimal('100.00'), currency='AED',
+        )
+
+    def fee(self, fee_type, amount, currency='AED', at=None):
+        with mock.patch('django.utils.timezone.now', return_value=at or timezone.now()):
+            return FeeRevenue.objects.create(
+                transaction=self.txn, user_id='1', fee_type=fee_type, fee_amount=Decimal(amount),
+                fee_currency=currency, base_amount=Decimal('100.00'), base_currency='AED',
+            )
+
+    def assertConsistent(self):
+        self.assertEqual(RevenueRollup.rollup_totals(), RevenueRollup.raw_totals())
+
+    def test_signals_keep_rollups_in_sync(self):
+        first = self.fee('card_to_card', '1.00')
+        self.fee('card_to_card', '2.50')
+        network = self.fee('network_fee', '0.75', currency='USDT')
+        self.assertConsistent()
+
+        first.fee_amount = Decimal('3.00')
+        first.save()
+        network.delete()
+        self.assertConsistent()
+
+        summary = RevenueRollup.summary()
+        self.assertEqual(summary['total_revenue'], '5.50')
+        self.assertEqual(summary['by_type'], {'card_to_card': {'count': 2, 'total': '5.50'}})
+        self.assertNotIn('network', summary['by_category'])
+
+    def test_day_follows_local_timezone(self):
+        # 20:30 UTC — уже следующий день по TIME_ZONE (Asia/Almaty)
+        at = datetime(2026, 3, 1, 20, 30, tzinfo=dt_timezone.utc)
+        self.fee('card_to_card', '1.00', at=at)
+        self.assertEqual(list(RevenueRollup.rollup_totals()), [(timezone.localdate(at), 'card_to_card', 'AED')])
+        self.assertConsistent()
+
+    def test_rebuild_restores_totals_for_period(self):
+        old = timezone.now() - timedelta(days=10)
+        self.fee('card_to_card', '1.00', at=old)
+        self.fee('card_to_card', '2.00')
+        FeeRevenueDaily.objects.update(total=0)
+
+        today = timezone.localdate()
+        self.assertEqual(RevenueRollup.rebuild(today, today), 1)
+        self.assertEqual(RevenueRollup.rollup_totals(today, today), RevenueRollup.raw_totals(today, today))
+        # вне периода итоги не тронуты
+        self.assertNotEqual(RevenueRollup.rollup_totals(), RevenueRollup.raw_totals())
+
+        RevenueRollup.rebuild()
+        self.assertConsistent()
+
+    def test_check_fee_rollups(self):
+        self.fee('card_to_card', '1.00')
+        self.fee('bank_transfer', '4.00', at=timezone.now() - timedelta(days=3))
+        call_command('check_fee_rollups', stdout=StringIO())
+
+        FeeRevenueDaily.objects.filter(fee_type='bank_transfer').delete()
+        with self.assertRaisesMessage(CommandError, "Расхождений: 1"):
+            call_command('check_fee_rollups', stdout=StringIO())
+
+        out = StringIO()
+        call_command('check_fee_rollups', fix=True, stdout=out)
+        self.assertIn("Пересобрано дней: 1", out.getvalue())
+        self.assertConsistent()
+        call_command('check_fee_rollups', stdout=StringIO())
+
+
+class StatementBalanceTests(TestCase):
+    """Остатки выписки сходятся с балансом и строками при резерве, выводе и возврате."""
+
+    def setUp(self):
+        self.wallet = CryptoWallets.objects.create(user_id='1', address='TStatementAddr', balance=Decimal('100'))
+        today = timezone.localdate()
+        self.start, self.end = statements.period_bounds(
+            str(today - timedelta(days=1)), str(today + timedelta(days=1)),
+        )
+
+    def statement(self):
+        balances = statements.period_balances('1', ['crypto'], self.start, self.end)['crypto']
+        rows = list(statements.statement_rows('1', ['crypto'], self.start, self.end))
+        total = sum((r.amount if r.direction == 'credit' else -r.amount for r in rows), Decimal('0'))
+        opening, closing = balances
+        self.assertEqual(opening + total, closing)
+        return opening, closing
+
+    def reserve(self):
+        return FundsHoldService.reserve(
+            '1', 'crypto_wallet', self.wallet.id, Decimal('40'), 'USDT', 'crypto_withdrawal', 'CW-STMT-1',
+            details={'crypto_address': 'TExternalAddr', 'network': 'TRC20'},
+        )
+
+    def test_open_hold_is_not_booked(self):
+        self.reserve()
+        self.assertEqual(self.statement(), (Decimal('100'), Decimal('100')))
+
+    def test_capture_and_refund_are_booked(self):
+        hold = self.reserve()
+        txn = TransactionService.complete_crypto_wallet_withdrawal(hold.id, {'reference_id': 'XR-1', 'status': 'pending'})
+        self.assertEqual(self.statement(), (Decimal('100'), Decimal('60')))
+
+        TransactionService.refund_crypto_withdrawal(txn.id)
+        TransactionService.refund_crypto_withdrawal(txn.id)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('100'))
+        self.assertEqual(self.statement(), (Decimal('100'), Decimal('100')))
+
+    def test_released_hold_leaves_no_trace(self):
+        hold = self.reserve()
+        FundsHoldService.release(hold.id)
+        self.assertEqual(self.statement(), (Decimal('100'), Decimal('100')))
+        self.assertFalse(BalanceMovements.objects.exists())
+
+    def test_rub_deposit_is_booked_once(self):
+        txn = Transactions.objects.create(
+            sender_id='EXTERNAL_RUB', receiver_id='1', type='top_up', amount=Decimal('1000'), currency='RUB',
+            status='pending', reference_id='RUB-1',
+        )
+        TransactionService.credit_rub_deposit(txn.id, '1', '12.5')
+        TransactionService.credit_rub_deposit(txn.id, '1', '12.5')
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('112.5'))
+        self.assertEqual(self.statement(), (Decimal('100'), Decimal('112.5')))
+
+    def test_backfill_is_idempotent(self):
+        hold = self.reserve()
+        txn = TransactionService.complete_crypto_wallet_withdrawal(hold.id, {'reference_id': 'XR-2'})
+        BalanceMovements.objects.all().delete()
+        LedgerFeed.objects.all().delete()
+
+        call_command('backfill_balance_movements', stdout=StringIO(), stderr=StringIO())
+        call_command('backfill_balance_movements', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(BalanceMovements.objects.filter(transaction=txn, type='debit').count(), 1)
+        self.assertEqual(self.statement(), (Decimal('100'), Decimal('60')))
@@ -15,6 +15,7 @@ urlpatterns = [
     path('iban/', views.IBANTransactionsListView.as_view(), name='iban_transactions'),
     path('card-transactions/', views.CardTransactionsListView.as_view(), name='card_transactions'),
     path('crypto/', views.CryptoTransactionsListView.as_view(), name='crypto_transactions'),
+    path('export/', views.TransactionExportView.as_view(), name='transactions_export'),
 
     path('recipient-info/', views.RecipientInfoView.as_view(), name='recipient_info'),
     path('bank-accounts/', views.UserBankAccountsView.as_view(), name='user_bank_accounts'),
@@ -31,7 +32,9 @@ urlpatterns = [
     path('admin/revenue/summary/', views.AdminRevenueSummaryView.as_view(), name='admin_revenue_summary'),
     path('admin/revenue/transactions/', views.AdminRevenueTransactionsView.as_view(), name='admin_revenue_transactions'),
     path('admin/user/<str:target_user_id>/transactions/', views.AdminUserTransactionsView.as_view(), name='admin_user_transactions'),
+    path('admin/user/<str:target_user_id>/transactions/export/', views.AdminUserTransactionsExportView.as_view(), name='admin_user_transactions_export'),
     path('info/', views.TransactionInfoView.as_view(), name='transaction-info'),
+    path('quote/', views.TransactionQuoteView.as_view(), name='transaction-quote'),
 
     path('open/user/transactions/', views.OpenUserTransactionsView.as_view(), name='open_user_transactions'),
 
@@ -1,15 +1,14 @@
-from apps.transactions_apps.xerime_client import XerimeClient
+from apps.transactions_apps.xerime_client import AsyncXerimeClient, XerimeClient
 from rest_framework.views import APIView
+from core.async_views import AsyncAPIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.db.models import Q
-from django.contrib.auth.models import User
-from django.db.models import Sum, Count
-from django.db.models.functions import TruncDate
 from apps.cards_apps.models import Cards
-from apps.accounts_apps.models import Profiles
+from apps.accounts_apps import identity
+from apps.accounts_apps.models import UserRoles
 from apps.transactions_apps.models import FeeRevenue, SavedFiatRecipients, Transactions, BankDepositAccounts, CryptoWallets
 from decimal import Decimal
 from .serializers import (
@@ -22,11 +21,26 @@ from .serializers import (
     ErrorResponseSerializer, TransactionFullSerializer, TransferResponseSerializer,
     CryptoWalletWithdrawalRequestSerializer, CryptoWalletWithdrawalResponseSerializer, ValidateFiatRecipientSerializer
 )
-from apps.transactions_apps.services import SettingsManager, TransactionService
+from apps.transactions_apps.services import LimitCounters, PricingService, RevenueRollup, TransactionService
+from django.utils import timezone
+from .export import export_response
+from .filters import account_feed, filter_user_transactions, user_transactions
+from .pagination import TransactionCursorPagination
+import hashlib
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+TRANSACTION_LIST_PARAMS = [
+    openapi.Parameter('cursor', openapi.IN_QUERY, description="Курсор следующей страницы (next_cursor из ответа)", type=openapi.TYPE_STRING, required=False),
+    openapi.Parameter('page_size', openapi.IN_QUERY, description="Размер страницы (по умолчанию 50, максимум 200)", type=openapi.TYPE_INTEGER, required=False),
+    openapi.Parameter('include_total', openapi.IN_QUERY, description="1 — вернуть приблизительное количество (approx_count)", type=openapi.TYPE_STRING, required=False),
+    openapi.Parameter('direction', openapi.IN_QUERY, description="Направление: inbound, outbound, internal", type=openapi.TYPE_STRING, required=False),
+    openapi.Parameter('start_date', openapi.IN_QUERY, description="С даты (YYYY-MM-DD)", type=openapi.TYPE_STRING, required=False),
+    openapi.Parameter('end_date', openapi.IN_QUERY, description="По дату (YYYY-MM-DD)", type=openapi.TYPE_STRING, required=False),
+]
+
 
 class RecipientInfoView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -50,13 +64,9 @@ class RecipientInfoView(APIView):
             card = Cards.objects.filter(card_number_encrypted=card_number).first()
             if not card:
                 return Response({"error": "Card not found"}, status=status.HTTP_404_NOT_FOUND)
-            user = User.objects.filter(id=card.user_id).first()
-            recipient_name = f"{user.first_name or ''} {user.last_name or ''}".strip() if user else "Unknown User"
-            avatar_url = None
-            if user:
-                profile = Profiles.objects.filter(user_id=str(user.id)).first()
-                if profile:
-                    avatar_url = profile.avatar_url
+            recipient = identity.get(card.user_id)
+            recipient_name = recipient.name
+            avatar_url = recipient.avatar_url
             return Response({
                 "recipient_name": recipient_name,
                 "card_type": card.type,
@@ -67,13 +77,9 @@ class RecipientInfoView(APIView):
             account = BankDepositAccounts.objects.filter(iban=iban).first()
             if not account:
                 return Response({"error": "IBAN not found"}, status=status.HTTP_404_NOT_FOUND)
-            user = User.objects.filter(id=account.user_id).first()
-            recipient_name = f"{user.first_name or ''} {user.last_name or ''}".strip() if user else "Unknown User"
-            avatar_url = None
-            if user:
-                profile = Profiles.objects.filter(user_id=str(user.id)).first()
-                if profile:
-                    avatar_url = profile.avatar_url
+            recipient = identity.get(account.user_id)
+            recipient_name = recipient.name
+            avatar_url = recipient.avatar_url
             return Response({
                 "recipient_name": recipient_name,
                 "bank_name": account.bank_name,
@@ -90,13 +96,9 @@ class RecipientInfoView(APIView):
                     "avatar_url": None,
                     "message": "Внешний кошелёк — перевод будет в статусе pending"
                 }, status=status.HTTP_200_OK)
-            user = User.objects.filter(id=wallet.user_id).first()
-            recipient_name = f"{user.first_name or ''} {user.last_name or ''}".strip() if user else "Unknown User"
-            avatar_url = None
-            if user:
-                profile = Profiles.objects.filter(user_id=str(user.id)).first()
-                if profile:
-                    avatar_url = profile.avatar_url
+            recipient = identity.get(wallet.user_id)
+            recipient_name = recipient.name
+            avatar_url = recipient.avatar_url
             return Response({
                 "is_internal": True,
                 "recipient_name": recipient_name,
@@ -112,30 +114,29 @@ class RecipientInfoView(APIView):
 class AllTransactionsListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
-    @swagger_auto_schema(operation_summary="Все транзакции пользователя", tags=["Транзакции (Списки)"])
+    @swagger_auto_schema(operation_summary="Все транзакции пользователя", manual_parameters=TRANSACTION_LIST_PARAMS, tags=["Транзакции (Списки)"])
     def get(self, request):
         user_id = str(request.user.id)
-        txs = Transactions.objects.filter(
-            Q(sender_id=user_id) | Q(receiver_id=user_id)
-        ).order_by('-created_at')
-        
-        serializer = AdminTransactionSerializerDirect(txs, many=True, context={'target_user_id': user_id})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        txs = filter_user_transactions(user_transactions(user_id), user_id, request.query_params)
+        paginator = TransactionCursorPagination()
+        txs = AdminTransactionSerializerDirect.setup_eager_loading(txs)
+        page = paginator.paginate_queryset(txs, request, view=self)
+        serializer = AdminTransactionSerializerDirect(page, many=True, context={'target_user_id': user_id})
+        return paginator.get_paginated_response(serializer.data)
 
 
 class IBANTransactionsListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
-    @swagger_auto_schema(operation_summary="Транзакции по IBAN (Банк)", tags=["Транзакции (Списки)"])
+    @swagger_auto_schema(operation_summary="Транзакции по IBAN (Банк)", manual_parameters=TRANSACTION_LIST_PARAMS, tags=["Транзакции (Списки)"])
     def get(self, request):
         user_id = str(request.user.id)
-        txs = Transactions.objects.filter(
-            Q(sender_id=user_id) | Q(receiver_id=user_id),
-            movements__user_id=user_id, movements__account_type='bank'
-        ).distinct().order_by('-created_at')
-        
-        serializer = AdminTransactionSerializerDirect(txs, many=True, context={'target_user_id': user_id})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        feed = filter_user_transactions(account_feed(user_id, 'bank'), user_id, request.query_params, through='transaction')
+        paginator = TransactionCursorPagination()
+        feed = AdminTransactionSerializerDirect.setup_eager_loading(feed, through='transaction')
+        page = [entry.transaction for entry in paginator.paginate_queryset(feed, request, view=self)]
+        serializer = AdminTransactionSerializerDirect(page, many=True, context={'target_user_id': user_id})
+        return paginator.get_paginated_response(serializer.data)
 
 
 class CardTransactionsListView(APIView):
@@ -145,46 +146,45 @@ class CardTransactionsListView(APIView):
         operation_summary="Транзакции по Картам",
         manual_parameters=[
             openapi.Parameter('card_id', openapi.IN_QUERY, description="UUID конкретной карты для фильтрации", type=openapi.TYPE_STRING, required=False),
-        ],
+        ] + TRANSACTION_LIST_PARAMS,
         tags=["Транзакции (Списки)"]
     )
     def get(self, request):
         user_id = str(request.user.id)
-        txs = Transactions.objects.filter(
-            Q(sender_id=user_id) | Q(receiver_id=user_id),
-            movements__user_id=user_id, movements__account_type='card'
-        ).distinct().order_by('-created_at')
+        feed = account_feed(user_id, 'card')
         card_id = request.query_params.get('card_id')
         if card_id:
             card = Cards.objects.filter(id=card_id, user_id=user_id).first()
             if card:
                 last4 = card.last_four_digits or ''
                 card_number = card.card_number_encrypted or ''
-                txs = txs.filter(
-                    Q(card_id=card_id) |
-                    Q(recipient_card=card_number) |
-                    Q(sender_card=card_number) |
-                    Q(recipient_card__endswith=last4) |
-                    Q(sender_card__endswith=last4)
-                ).distinct()
-        
-        serializer = AdminTransactionSerializerDirect(txs, many=True, context={'target_user_id': user_id})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+                feed = feed.filter(
+                    Q(transaction__card_id=card_id) |
+                    Q(transaction__recipient_card=card_number) |
+                    Q(transaction__sender_card=card_number) |
+                    Q(transaction__recipient_card__endswith=last4) |
+                    Q(transaction__sender_card__endswith=last4)
+                )
+        feed = filter_user_transactions(feed, user_id, request.query_params, through='transaction')
+        paginator = TransactionCursorPagination()
+        feed = AdminTransactionSerializerDirect.setup_eager_loading(feed, through='transaction')
+        page = [entry.transaction for entry in paginator.paginate_queryset(feed, request, view=self)]
+        serializer = AdminTransactionSerializerDirect(page, many=True, context={'target_user_id': user_id})
+        return paginator.get_paginated_response(serializer.data)
     
 
 class CryptoTransactionsListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
-    @swagger_auto_schema(operation_summary="Транзакции по Крипте", tags=["Транзакции (Списки)"])
+    @swagger_auto_schema(operation_summary="Транзакции по Крипте", manual_parameters=TRANSACTION_LIST_PARAMS, tags=["Транзакции (Списки)"])
     def get(self, request):
         user_id = str(request.user.id)
-        txs = Transactions.objects.filter(
-            Q(sender_id=user_id) | Q(receiver_id=user_id),
-            movements__user_id=user_id, movements__account_type='crypto'
-        ).distinct().order_by('-created_at')
-        
-        serializer = AdminTransactionSerializerDirect(txs, many=True, context={'target_user_id': user_id})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        feed = filter_user_transactions(account_feed(user_id, 'crypto'), user_id, request.query_params, through='transaction')
+        paginator = TransactionCursorPagination()
+        feed = AdminTransactionSerializerDirect.setup_eager_loading(feed, through='transaction')
+        page = [entry.transaction for entry in paginator.paginate_queryset(feed, request, view=self)]
+        serializer = AdminTransactionSerializerDirect(page, many=True, context={'target_user_id': user_id})
+        return paginator.get_paginated_response(serializer.data)
 
 
 class UserBankAccountsView(APIView):
@@ -473,74 +473,8 @@ class AdminRevenueSummaryView(APIView):
     def get(self, request):
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
-
-        query = FeeRevenue.objects.all()
-        if start_date:
-            query = query.filter(created_at__date__gte=start_date)
-        if end_date:
-            query = query.filter(created_at__date__lte=end_date)
-
-        total_revenue = query.aggregate(total=Sum('fee_amount'))['total'] or Decimal('0.00')
-
-        # --- by_type (как раньше) ---
-        by_type_qs = query.values('fee_type').annotate(
-            count=Count('id'),
-            total=Sum('fee_amount')
-        )
-        by_type = {item['fee_type']: {"count": item['count'], "total": str(item['total'])} for item in by_type_qs}
-
-        # --- by_currency: разбивка по валюте комиссии ---
-        by_currency_qs = query.values('fee_currency').annotate(
-            count=Count('id'),
-            total=Sum('fee_amount')
-        )
-        by_currency = {
-            item['fee_currency']: {"count": item['count'], "total": str(item['total'])}
-            for item in by_currency_qs
-        }
-
-        # --- by_category: группировка типов в категории ---
-        # network_fee -> "network", currency_conversion -> "exchange", остальное -> "service"
-        category_map = {
-            'network_fee': 'network',
-            'currency_conversion': 'exchange',
-        }
-        categories = {}
-        for item in by_type_qs:
-            cat = category_map.get(item['fee_type'], 'service')
-            if cat not in categories:
-                categories[cat] = {"count": 0, "total": Decimal('0.00')}
-            categories[cat]['count'] += item['count']
-            categories[cat]['total'] += item['total']
-        by_category = {k: {"count": v['count'], "total": str(v['total'])} for k, v in categories.items()}
-
-        # --- by_currency_and_type: двойная группировка ---
-        by_ct_qs = query.values('fee_currency', 'fee_type').annotate(
-            count=Count('id'),
-            total=Sum('fee_amount')
-        )
-        by_currency_and_type = {}
-        for item in by_ct_qs:
-            cur = item['fee_currency']
-            ft = item['fee_type']
-            if cur not in by_currency_and_type:
-                by_currency_and_type[cur] = {}
-            by_currency_and_type[cur][ft] = {"count": item['count'], "total": str(item['total'])}
-
-        # --- by_day ---
-        by_day_qs = query.annotate(date=TruncDate('created_at')).values('date').annotate(
-            total=Sum('fee_amount')
-        ).order_by('-date')
-        by_day = [{"date": item['date'].isoformat(), "total": str(item['total'])} for item in by_day_qs]
-
-        return Response({
-            "total_revenue": str(total_revenue),
-            "by_type": by_type,
-            "by_currency": by_currency,
-            "by_category": by_category,
-            "by_currency_and_type": by_currency_and_type,
-            "by_day": by_day
-        }, status=status.HTTP_200_OK)
+        # дневные итоги fee_revenue_daily вместо пяти GROUP BY по всей fee_revenue
+        return Response(RevenueRollup.summary(start_date, end_date), status=status.HTTP_200_OK)
     
 
 class AdminRevenueTransactionsView(APIView):
@@ -619,54 +553,64 @@ class AdminUserTransactionsView(APIView):
         manual_parameters=[
             openapi.Parameter('type', openapi.IN_QUERY, description="Фильтр: bank, card, crypto", type=openapi.TYPE_STRING, required=False),
             openapi.Parameter('card_type', openapi.IN_QUERY, description="Тип карты: virtual или metal", type=openapi.TYPE_STRING, required=False),
-            openapi.Parameter('direction', openapi.IN_QUERY, description="Направление: inbound, outbound, internal", type=openapi.TYPE_STRING, required=False),
-            openapi.Parameter('start_date', openapi.IN_QUERY, description="С даты (YYYY-MM-DD)", type=openapi.TYPE_STRING, required=False),
-            openapi.Parameter('end_date', openapi.IN_QUERY, description="По дату (YYYY-MM-DD)", type=openapi.TYPE_STRING, required=False),
-            openapi.Parameter('limit', openapi.IN_QUERY, description="Лимит (по умолчанию 50)", type=openapi.TYPE_INTEGER, required=False),
-            openapi.Parameter('offset', openapi.IN_QUERY, description="Смещение (по умолчанию 0)", type=openapi.TYPE_INTEGER, required=False)
-        ],
+        ] + TRANSACTION_LIST_PARAMS,
         responses={200: openapi.Response("Paginated list of transactions")}
     )
     def get(self, request, target_user_id):
         user_id_str = str(target_user_id)
-        tx_type = request.query_params.get('type')
-        card_type = request.query_params.get('card_type')
-        direction = request.query_params.get('direction')
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        limit = int(request.query_params.get('limit', 50))
-        offset = int(request.query_params.get('offset', 0))
-        txs = Transactions.objects.filter(
-            Q(user_id=user_id_str) | 
-            Q(sender_id=user_id_str) | 
-            Q(receiver_id=user_id_str)
-        )
-        if direction == 'internal':
-            txs = txs.filter(sender_id=user_id_str, receiver_id=user_id_str)
-        elif direction == 'inbound':
-            txs = txs.filter(receiver_id=user_id_str).exclude(sender_id=user_id_str)
-        elif direction == 'outbound':
-            txs = txs.exclude(receiver_id=user_id_str)
-        if tx_type == 'bank':
-            txs = txs.filter(movements__user_id=user_id_str, movements__account_type='bank').distinct()
-        elif tx_type == 'card':
-            txs = txs.filter(movements__user_id=user_id_str, movements__account_type='card').distinct()
-        elif tx_type == 'crypto':
-            txs = txs.filter(movements__user_id=user_id_str, movements__account_type='crypto').distinct()
-        if card_type:
-            txs = txs.filter(card__type__iexact=card_type)
-        if start_date:
-            txs = txs.filter(created_at__gte=start_date)
-        if end_date:
-            txs = txs.filter(created_at__lte=f"{end_date} 23:59:59")
-        txs = txs.order_by('-created_at')
-        total_count = txs.count()
-        paginated_txs = txs[offset:offset+limit]
-        serializer = AdminTransactionSerializerDirect(paginated_txs, many=True, context={'target_user_id': user_id_str})
-        return Response({
-            "count": total_count,
-            "results": serializer.data
-        }, status=status.HTTP_200_OK)
+        txs = user_transactions(user_id_str, include_owner=True)
+        txs = filter_user_transactions(txs, user_id_str, request.query_params)
+        paginator = TransactionCursorPagination(exact_count=True)
+        txs = AdminTransactionSerializerDirect.setup_eager_loading(txs)
+        page = paginator.paginate_queryset(txs, request, view=self)
+        serializer = AdminTransactionSerializerDirect(page, many=True, context={'target_user_id': user_id_str})
+        return paginator.get_paginated_response(serializer.data)
+
+
+EXPORT_PARAMS = [
+    openapi.Parameter('export_format', openapi.IN_QUERY, description="ndjson (по умолчанию) или csv", type=openapi.TYPE_STRING, required=False),
+    openapi.Parameter('gzip', openapi.IN_QUERY, description="1 — поток gzip", type=openapi.TYPE_STRING, required=False),
+    openapi.Parameter('cursor', openapi.IN_QUERY, description="Продолжить после строки (поле cursor последней полученной строки)", type=openapi.TYPE_STRING, required=False),
+    openapi.Parameter('limit', openapi.IN_QUERY, description="Максимум строк в выгрузке", type=openapi.TYPE_INTEGER, required=False),
+    openapi.Parameter('type', openapi.IN_QUERY, description="Фильтр: bank, card, crypto", type=openapi.TYPE_STRING, required=False),
+    openapi.Parameter('card_type', openapi.IN_QUERY, description="Тип карты: virtual или metal", type=openapi.TYPE_STRING, required=False),
+] + [p for p in TRANSACTION_LIST_PARAMS if p.name in ('direction', 'start_date', 'end_date')]
+
+
+class TransactionExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Потоковая выгрузка истории транзакций (NDJSON/CSV)",
+        manual_parameters=EXPORT_PARAMS,
+        tags=["Транзакции (Списки)"]
+    )
+    def get(self, request):
+        user_id_str = str(request.user.id)
+        txs = filter_user_transactions(user_transactions(user_id_str, include_owner=True), user_id_str, request.query_params)
+        try:
+            return export_response(request, txs, user_id_str, scope='user')
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class AdminUserTransactionsExportView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Потоковая выгрузка транзакций пользователя (Админ, фильтры как у списка)",
+        manual_parameters=EXPORT_PARAMS,
+        tags=["Транзакции (Админ/Служебные)"]
+    )
+    def get(self, request, target_user_id):
+        if not UserRoles.objects.filter(user_id=str(request.user.id), role__in=['admin', 'root']).exists():
+            return Response({"error": "Доступ запрещен"}, status=status.HTTP_403_FORBIDDEN)
+        user_id_str = str(target_user_id)
+        txs = filter_user_transactions(user_transactions(user_id_str, include_owner=True), user_id_str, request.query_params)
+        try:
+            return export_response(request, txs, user_id_str, scope='admin')
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
 class TransactionInfoView(APIView):
@@ -682,53 +626,80 @@ class TransactionInfoView(APIView):
     )
     def get(self, request):
         tx_type = request.query_params.get('type')
+        table = PricingService.get_pricing_table(request.user.id)
+        return Response(PricingService.get_type_info(tx_type, table), status=status.HTTP_200_OK)
+
+
+class TransactionQuoteView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Котировка: матрица комиссий/курсов/лимитов и расчёт суммы",
+        manual_parameters=[
+            openapi.Parameter('type', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                description="Тип операции (как в /info/). Без type расчёт делается для всех типов"),
+            openapi.Parameter('amount', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, required=False,
+                description="Сумма в валюте списания: точные списание, зачисление и комиссия"),
+        ],
+        tags=["Инфо (Транзакции)"]
+    )
+    def get(self, request):
         user_id = str(request.user.id)
-        usdt_to_aed_buy = float(SettingsManager.get_setting('exchange_rates', 'usdt_to_aed_buy', 3.65))
-        usdt_to_aed_sell = float(SettingsManager.get_setting('exchange_rates', 'usdt_to_aed_sell', 3.69))
-        transfer_min = float(SettingsManager.get_setting('limits', 'transfer_min', 1.0, user_id))
-        transfer_max = float(SettingsManager.get_setting('limits', 'transfer_max', 50000.0, user_id))
-        withdrawal_min = float(SettingsManager.get_setting('limits', 'withdrawal_min', 50.0, user_id))
-        withdrawal_max = float(SettingsManager.get_setting('limits', 'withdrawal_max', 50000.0, user_id))
-        info = {
-            "currency_from": "AED",
-            "currency_to": "AED",
-            "exchange_rate": None,
-            "service_fee_percent": 0.0,
-            "service_fee_flat": 0.0,
-            "network_fee_percent": 0.0,
-            "network_fee_flat": 0.0,
-            "min_amount": transfer_min,
-            "max_amount": transfer_max,
+        tx_type = request.query_params.get('type')
+        amount = request.query_params.get('amount')
+
+        if tx_type and tx_type not in PricingService.TYPES:
+            return Response({"error": f"Неизвестный тип операции: {tx_type}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if amount is not None:
+            try:
+                amount = Decimal(str(amount))
+                if amount <= 0:
+                    raise ValueError
+            except Exception:
+                return Response({"error": "Некорректная сумма"}, status=status.HTTP_400_BAD_REQUEST)
+
+        table = PricingService.get_pricing_table(user_id)
+        today = timezone.localdate()
+        usage = {kind: LimitCounters.usage(user_id, kind, today) for kind in ('transfer', 'withdrawal')}
+
+        # ETag — из версии снимка цен, параметров и использованных лимитов: 304 отдаётся без сборки ответа
+        etag_key = [table['version'], tx_type, str(amount) if amount is not None else None]
+        etag_key += [str(usage[kind][period]) for kind in sorted(usage) for period in ('day', 'month')]
+        etag = '"' + hashlib.sha1(json.dumps(etag_key).encode()).hexdigest() + '"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+
+        types = [tx_type] if tx_type else list(PricingService.TYPES)
+        data = {
+            "exchange_rates": {k: float(v) for k, v in table['exchange_rates'].items()},
+            "fees": {k: float(v) for k, v in table['fees'].items()},
+            "limits": {
+                kind: {
+                    **{k: float(v) for k, v in limits.items()},
+                    "daily_used": float(usage[kind]['day']),
+                    "monthly_used": float(usage[kind]['month']),
+                }
+                for kind, limits in table['limits'].items()
+            },
+            "types": {t: PricingService.get_type_info(t, table) for t in types},
         }
-        if tx_type in ["card_to_card", "internal_transfer"]:
-            info["service_fee_percent"] = float(SettingsManager.get_setting('fees', 'card_to_card_percent', 1.0, user_id))
-        elif tx_type in ["card_to_crypto", "bank_to_crypto"]:
-            info["service_fee_percent"] = float(SettingsManager.get_setting('fees', 'currency_conversion_percent', 1.5, user_id))
-            info["network_fee_flat"] = float(SettingsManager.get_setting('fees', 'top_up_crypto_flat', 5.90, user_id))
-            info["exchange_rate"] = usdt_to_aed_sell
-            info["currency_to"] = "USDT"
-        elif tx_type in ["crypto_to_card", "crypto_to_bank", "crypto_to_iban"]:
-            info["service_fee_percent"] = float(SettingsManager.get_setting('fees', 'network_fee_percent', 1.0, user_id))
-            info["network_fee_flat"] = float(SettingsManager.get_setting('fees', 'top_up_crypto_flat', 5.90, user_id))
-            info["exchange_rate"] = usdt_to_aed_buy
-            info["currency_from"] = "USDT"
-        elif tx_type in ["crypto_to_crypto", "crypto_withdrawal"]:
-            info["network_fee_percent"] = float(SettingsManager.get_setting('fees', 'network_fee_percent', 1.0, user_id))
-            info["currency_from"] = "USDT"
-            info["currency_to"] = "USDT"
-            info["min_amount"] = withdrawal_min
-            info["max_amount"] = withdrawal_max
-        elif tx_type in ["bank_to_card", "iban_to_card"]:
-            info["service_fee_percent"] = float(SettingsManager.get_setting('fees', 'bank_transfer_percent', 2.0, user_id))
-        elif tx_type == "card_to_bank":
-            info["service_fee_percent"] = float(SettingsManager.get_setting('fees', 'card_to_card_percent', 1.0, user_id))
-        elif tx_type == "iban_to_iban":
-            info["service_fee_percent"] = float(SettingsManager.get_setting('fees', 'bank_transfer_percent', 2.0, user_id))
-            info["min_amount"] = withdrawal_min
-            info["max_amount"] = withdrawal_max
-
-        return Response(info, status=status.HTTP_200_OK)
-    
+
+        if amount is not None:
+            quotes = {}
+            for t in types:
+                quote = PricingService.calculate(t, amount, table)
+                quote["limit_error"] = PricingService.check_quote_limits(quote, table, usage)
+                quotes[t] = quote
+            data["quotes"] = quotes
+
+        response = Response(data, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
 
 class OpenUserTransactionsView(APIView):
@@ -736,24 +707,18 @@ class OpenUserTransactionsView(APIView):
 
     @swagger_auto_schema(
         operation_summary="Получить транзакции пользователя",
+        manual_parameters=TRANSACTION_LIST_PARAMS,
         tags=["Открытые API (Публичные)"]
     )
     def get(self, request):
         user_id_str = str(request.user.id)
-        limit = int(request.query_params.get('limit', 50))
-        offset = int(request.query_params.get('offset', 0))
-
-        txs = Transactions.objects.filter(
-            Q(user_id=user_id_str) | 
-            Q(sender_id=user_id_str) | 
-            Q(receiver_id=user_id_str)
-        ).order_by('-created_at')[offset:offset+limit]
-
-        serializer = AdminTransactionSerializerDirect(txs, many=True, context={'target_user_id': user_id_str})
-        return Response({
-            "count": txs.count(),
-            "results": serializer.data
-        }, status=status.HTTP_200_OK)
+        txs = user_transactions(user_id_str, include_owner=True)
+        txs = filter_user_transactions(txs, user_id_str, request.query_params)
+        paginator = TransactionCursorPagination(exact_count=True)
+        txs = AdminTransactionSerializerDirect.setup_eager_loading(txs)
+        page = paginator.paginate_queryset(txs, request, view=self)
+        serializer = AdminTransactionSerializerDirect(page, many=True, context={'target_user_id': user_id_str})
+        return paginator.get_paginated_response(serializer.data)
     
 
 class RegisterCryptoDepositView(APIView):
@@ -800,16 +765,16 @@ class RubToCryptoTopupView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
 
-class XerimeTransactionHistoryView(APIView):
+class XerimeTransactionHistoryView(AsyncAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
-    def get(self, request, reference_id=None):
+    async def get(self, request, reference_id=None):
         try:
             if reference_id:
-                data = XerimeClient.get_transaction_details(reference_id)
+                data = await AsyncXerimeClient.get_transaction_details(reference_id)
             else:
                 status_filter = request.query_params.get('status')
-                data = XerimeClient.get_transactions_history(
+                data = await AsyncXerimeClient.get_transactions_history(
                     merchant_id=str(request.user.id), 
                     status=status_filter
                 )
@@ -830,14 +795,8 @@ class XerimeWithdrawalStatusView(APIView):
                 if xerime_status == "completed":
                     transaction.status = "success"
                 elif xerime_status in ["failed", "on_chain_failed"]:
-                    transaction.status = "failed"
-                    if transaction.metadata.get("refunded") != True:
-                        wallet_id = transaction.metadata.get("from_wallet_id")
-                        wallet = CryptoWallets.objects.filter(id=wallet_id).first()
-                        if wallet:
-                            wallet.balance += transaction.amount
-                            wallet.save()
-                            transaction.metadata["refunded"] = True       
+                    # возврат с движением в ленте, под блокировкой транзакции и кошелька
+                    transaction = TransactionService.refund_crypto_withdrawal(transaction.id)
                 transaction.metadata["xerime_status"] = xerime_status
                 transaction.metadata["tx_hash"] = data.get("tx_hash")
                 transaction.save()
@@ -869,13 +828,7 @@ class RubWebhookView(APIView):
         if not transaction:
             return Response({"message": "Transaction not found"}, status=status.HTTP_200_OK)
         if real_status == "paid" and transaction.status != "success":
-            transaction.status = "success"
-            if real_crypto_amount and user_id:
-                wallet = CryptoWallets.objects.filter(user_id=user_id, token="USDT").first()
-                if wallet:
-                    wallet.balance += Decimal(str(real_crypto_amount))
-                    wallet.save()
-            transaction.save()
+            TransactionService.credit_rub_deposit(transaction.id, user_id, real_crypto_amount)
             logger.info(f"Webhook success: RUB deposit {reference_id} processed and credited.")
         elif real_status in ["expired", "cancelled", "failed"]:
             transaction.status = "failed"
@@ -926,17 +879,17 @@ class FiatWithdrawalView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class XerimeInfoView(APIView):
+class XerimeInfoView(AsyncAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
-    def get(self, request, action):
+    async def get(self, request, action):
         try:
             if action == 'rate':
                 from_c = request.query_params.get('from', 'RUB')
                 to_c = request.query_params.get('to', 'USDT')
-                return Response(XerimeClient.get_exchange_rate(from_c, to_c))
+                return Response(await AsyncXerimeClient.get_exchange_rate(from_c, to_c))
             elif action == 'balances':
-                return Response(XerimeClient.get_merchant_balances(request.user.id))
+                return Response(await AsyncXerimeClient.get_merchant_balances(request.user.id))
             return Response({"error": "Неизвестный action"}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
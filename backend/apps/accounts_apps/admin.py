@@ -2,7 +2,8 @@ import requests
 from django.contrib import admin
 from django.apps import apps
 from django.utils.html import format_html
-from .models import AdminSettings, Profiles, WahaSession
+from django.utils import timezone
+from .models import AdminSettings, OutboxEvent, Profiles, WahaSession
 
 @admin.register(Profiles)
 class ProfileAdmin(admin.ModelAdmin):
@@ -113,10 +114,25 @@ class WahaSessionAdmin(admin.ModelAdmin):
     qr_code_display.short_description = "QR Код для WhatsApp"
 
 
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('event_type', 'status', 'attempts', 'available_at', 'created_at', 'processed_at')
+    list_filter = ('status', 'event_type')
+    search_fields = ('id', 'event_type', 'last_error')
+    actions = ['requeue']
+
+    @admin.action(description="Повторить доставку")
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status='processing').update(
+            status='pending', attempts=0, available_at=timezone.now(), locked_until=None, last_error=None
+        )
+        self.message_user(request, f"Возвращено в очередь: {updated}")
+
+
 app = apps.get_app_config('accounts_apps')
 for model_name, model in app.models.items():
     try:
-        if model.__name__ in ['WahaSession', 'Profiles', 'AdminSettings']:
+        if model.__name__ in ['WahaSession', 'Profiles', 'AdminSettings', 'OutboxEvent']:
             continue 
             
         @admin.register(model)
@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core import metrics
+from .models import AdminNotificationSettings, UserRoles
+
+PRIVILEGED_ROLES = ('admin', 'root')
+VERSION_CACHE_KEY = 'admin_routing_version'
+
+# actions=None — подписка по умолчанию (всё, кроме ADMIN_NOTIFY_MUTED_ACTIONS)
+Route = namedtuple('Route', ['settings_id', 'telegram', 'whatsapp', 'email', 'actions'])
+
+_lock = threading.Lock()
+_table = None
+
+
+def _load():
+    """Получатели с ролью admin/root и хотя бы одним включённым каналом — один запрос."""
+    privileged = UserRoles.objects.filter(role__in=PRIVILEGED_ROLES).values('user_id')
+    routes = []
+    for s in AdminNotificationSettings.objects.filter(user_id__in=privileged):
+        route = Route(
+            settings_id=str(s.id),
+            telegram=bool(s.telegram_enabled and s.telegram_username),
+            whatsapp=s.whatsapp_number if s.whatsapp_enabled and s.whatsapp_number else None,
+            email=s.email_address if s.email_enabled and s.email_address else None,
+            actions=frozenset(s.subscribed_actions) if s.subscribed_actions else None,
+        )
+        if route.telegram or route.whatsapp or route.email:
+            routes.append(route)
+    return routes
+
+
+def get_routes():
+    """Таблица маршрутизации процесса; перечитывается при смене версии (invalidate) или по TTL."""
+    global _table
+    version = cache.get(VERSION_CACHE_KEY, 0)
+    ttl = getattr(settings, 'ADMIN_ROUTING_TTL', 300)
+    table = _table
+    if table and table['version'] == version and time.monotonic() - table['loaded_at'] < ttl:
+        metrics.inc('admin_routing_lookups_total', result='hit')
+        return table['routes']
+    with _lock:
+        table = _table
+        if not (table and table['version'] == version and time.monotonic() - table['loaded_at'] < ttl):
+            table = _table = {'version': version, 'loaded_at': time.monotonic(), 'routes': _load()}
+            metrics.inc('admin_routing_lookups_total', result='miss')
+        return table['routes']
+
+
+def routes_for(action):
+    muted = getattr(settings, 'ADMIN_NOTIFY_MUTED_ACTIONS', set())
+    return [
+        r for r in get_routes()
+        if (action in r.actions if r.actions is not None else action not in muted)
+    ]
+
+
+def invalidate():
+    # версия меняется после коммита: иначе параллельный читатель перечитает старые строки под новой версией
+    transaction.on_commit(_bump_version)
+
+
+def _bump_version():
+    global _table
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, None)
+    _table = None
@@ -0,0 +1,83 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError
+from rest_framework.authtoken.models import Token
+
+VERIFIED_KEY = 'auth_token:{}'
+REJECTED_KEY = 'auth_token_rejected:{}'
+
+# пароль в кэш не кладём: при обращении к нему Django догрузит поле из БД
+USER_FIELDS = [f.attname for f in User._meta.concrete_fields if f.attname != 'password']
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_user(key):
+    """User из кэша проверенных токенов (без запроса в БД) или None."""
+    values = cache.get(VERIFIED_KEY.format(_digest(key)))
+    if not values:
+        return None
+    return User.from_db('default', USER_FIELDS, [values[f] for f in USER_FIELDS])
+
+
+def remember(key, user):
+    values = {f: getattr(user, f) for f in USER_FIELDS}
+    cache.set(VERIFIED_KEY.format(_digest(key)), values, getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 300))
+
+
+def forget(key):
+    cache.delete(VERIFIED_KEY.format(_digest(key)))
+
+
+def forget_user(user_id):
+    for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        forget(key)
+
+
+def upsert_token(user, key):
+    """Один токен на пользователя: заменяем ключ на месте вместо delete + create."""
+    old_key = Token.objects.filter(user=user).values_list('key', flat=True).first()
+    if old_key is None:
+        try:
+            return Token.objects.create(user=user, key=key)
+        except IntegrityError:
+            old_key = Token.objects.filter(user=user).values_list('key', flat=True).first()
+    if old_key != key:
+        Token.objects.filter(user=user).update(key=key)
+        forget(old_key)
+    return Token(key=key, user=user)
+
+
+def is_rejected(key):
+    return cache.get(REJECTED_KEY.format(_digest(key))) is not None
+
+
+def reject(key):
+    cache.set(REJECTED_KEY.format(_digest(key)), 1, getattr(settings, 'AUTH_NEGATIVE_CACHE_TTL', 60))
+
+
+@contextmanager
+def single_flight(key):
+    """Одна проверка токена в процессе: параллельные запросы с тем же токеном ждут её результата."""
+    digest = _digest(key)
+    with _locks_guard:
+        entry = _locks.setdefault(digest, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _locks.pop(digest, None)
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+
+from core import metrics
+from .models import Profiles
+
+Identity = namedtuple('Identity', ['name', 'avatar_url', 'language'])
+
+EXTERNAL_IDENTITY = Identity("External", None, 'en')
+UNKNOWN_IDENTITY = Identity("Unknown User", None, 'en')
+
+VERSION_CACHE_KEY = 'identity_version:{}'
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # user_id -> (Identity, expires, version)
+
+
+def _ttl():
+    return getattr(settings, 'IDENTITY_CACHE_TTL', 300)
+
+
+def _max_size():
+    return getattr(settings, 'IDENTITY_CACHE_MAX_USERS', 10000)
+
+
+def _is_external(user_id):
+    return not user_id or str(user_id) == 'EXTERNAL'
+
+
+def _load(user_ids):
+    """Profiles одним запросом; User только для тех, у кого в профиле нет имени."""
+    profiles = {p.user_id: p for p in Profiles.objects.filter(user_id__in=user_ids)}
+    need_user = [uid for uid in user_ids if uid.isdigit() and not (
+        uid in profiles and (profiles[uid].first_name or profiles[uid].last_name)
+    )]
+    users = {str(u.id): u for u in User.objects.filter(id__in=need_user)} if need_user else {}
+
+    loaded = {}
+    for uid in user_ids:
+        profile = profiles.get(uid)
+        user = users.get(uid)
+        if profile and (profile.first_name or profile.last_name):
+            name = f"{profile.first_name or ''} {profile.last_name or ''}".strip()
+        elif user:
+            name = f"{user.first_name or ''} {user.last_name or ''}".strip() or user.username
+        else:
+            name = UNKNOWN_IDENTITY.name
+        language = profile.language.lower()[:2] if profile and profile.language else 'en'
+        loaded[uid] = Identity(name, profile.avatar_url if profile else None, language)
+    return loaded
+
+
+def _versions(user_ids):
+    """Версии пользователей из общего кэша: invalidate в любом процессе сбрасывает запись во всех."""
+    keys = {uid: VERSION_CACHE_KEY.format(uid) for uid in user_ids}
+    stored = cache.get_many(list(keys.values())) if keys else {}
+    return {uid: stored.get(key, 0) for uid, key in keys.items()}
+
+
+def get_many(user_ids):
+    """{user_id: Identity} для списка user_id; промахи догружаются одним запросом."""
+    result = {}
+    missing = []
+    uids = {str(raw) for raw in user_ids if not _is_external(raw)}
+    versions = _versions(uids)
+    now = time.monotonic()
+    with _lock:
+        for raw in user_ids:
+            if _is_external(raw):
+                result[str(raw) if raw else raw] = EXTERNAL_IDENTITY
+                continue
+            uid = str(raw)
+            entry = _entries.get(uid)
+            if entry and entry[1] > now and entry[2] == versions[uid]:
+                _entries.move_to_end(uid)
+                result[uid] = entry[0]
+            elif uid not in missing:
+                missing.append(uid)
+    metrics.inc('identity_cache_lookups_total', len(result), result='hit')
+    if not missing:
+        return result
+    metrics.inc('identity_cache_lookups_total', len(missing), result='miss')
+
+    # версия прочитана до загрузки: если invalidate случится во время _load, следующий get перечитает
+    loaded = _load(missing)
+    expires = time.monotonic() + _ttl()
+    with _lock:
+        for uid, identity in loaded.items():
+            _entries[uid] = (identity, expires, versions[uid])
+            _entries.move_to_end(uid)
+        while len(_entries) > _max_size():
+            _entries.popitem(last=False)
+    result.update(loaded)
+    return result
+
+
+def get(user_id):
+    if _is_external(user_id):
+        return EXTERNAL_IDENTITY
+    return get_many([user_id]).get(str(user_id), UNKNOWN_IDENTITY)
+
+
+def invalidate(user_id):
+    # версия меняется после коммита: иначе параллельный читатель перечитает старый профиль под новой версией
+    uid = str(user_id)
+    transaction.on_commit(lambda: _bump_version(uid))
+
+
+def _bump_version(uid):
+    key = VERSION_CACHE_KEY.format(uid)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+    with _lock:
+        _entries.pop(uid, None)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
@@ -0,0 +1,164 @@
+import logging
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Pending:
+    __slots__ = ('message', 'done', 'sent')
+
+    def __init__(self, message):
+        self.message = message
+        self.done = threading.Event()
+        self.sent = False
+
+
+class PooledMailer:
+    """
+    Одно постоянное SMTP-соединение на аккаунт отправки.
+    Параллельные отправители не открывают свои сессии: первый, кто взял соединение,
+    отправляет всё накопившееся одной пачкой (group commit), остальные ждут результата.
+    Темп ограничен token bucket (EMAIL_RATE_PER_SECOND, EMAIL_RATE_BURST),
+    при обрыве соединение пересоздаётся и письмо отправляется повторно один раз.
+    """
+
+    MESSAGE_ERRORS = (
+        smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError, smtplib.SMTPNotSupportedError,
+    )
+
+    def __init__(self, account, connection_kwargs):
+        self.account = account
+        self.connection_kwargs = connection_kwargs
+        self.rate = getattr(settings, 'EMAIL_RATE_PER_SECOND', 1.0)
+        self.burst = max(1, getattr(settings, 'EMAIL_RATE_BURST', 10))
+        self.idle_timeout = getattr(settings, 'EMAIL_IDLE_TIMEOUT', 60)
+        self.tokens = float(self.burst)
+        self.refilled_at = time.monotonic()
+        self.connection = None
+        self.last_used = 0.0
+        self.pending = []
+        self.pending_lock = threading.Lock()
+        self.send_lock = threading.Lock()
+
+    def _connection(self):
+        if self.connection is not None and time.monotonic() - self.last_used > self.idle_timeout:
+            # сервер мог закрыть простаивающую сессию — не ждём ошибки на отправке
+            self._close()
+        if self.connection is None:
+            connection = get_connection(fail_silently=False, **self.connection_kwargs)
+            connection.open()
+            self.connection = connection
+            metrics.inc('email_connections_total', account=self.account)
+        return self.connection
+
+    def _close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def _throttle(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+            self.refilled_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait = (1 - self.tokens) / self.rate
+            metrics.observe('email_throttle_seconds', wait, account=self.account)
+            time.sleep(wait)
+
+    def _send_one(self, message):
+        for attempt in (1, 2):
+            try:
+                self._connection().send_messages([message])
+                self.last_used = time.monotonic()
+                return True
+            except self.MESSAGE_ERRORS as e:
+                # отказ сервера по конкретному письму: smtplib уже сделал RSET, сессия жива
+                self.last_used = time.monotonic()
+                logger.error(f"[mailer:{self.account}] {message.to}: {e}")
+                return False
+            except OSError as e:
+                # SMTPException — подкласс OSError: сюда попадают обрыв, таймаут и сбой сессии
+                self._close()
+                if attempt == 2:
+                    logger.error(f"[mailer:{self.account}] SMTP connection failed: {e}")
+        return False
+
+    def _deliver(self, batch):
+        started = time.monotonic()
+        try:
+            for item in batch:
+                self._throttle()
+                item.sent = self._send_one(item.message)
+                metrics.inc('email_sent_total', account=self.account, result='sent' if item.sent else 'failed')
+                item.done.set()
+        finally:
+            # ждущие отправители не должны зависнуть, если пачка прервалась исключением
+            for item in batch:
+                item.done.set()
+        metrics.observe('email_batch_size', len(batch), account=self.account)
+        metrics.observe('email_batch_seconds', time.monotonic() - started, account=self.account)
+
+    def send(self, message):
+        item = _Pending(message)
+        with self.pending_lock:
+            self.pending.append(item)
+        with self.send_lock:
+            if not item.done.is_set():
+                with self.pending_lock:
+                    batch, self.pending = self.pending, []
+                self._deliver(batch)
+        item.done.wait()
+        return item.sent
+
+
+_mailers = {}
+_mailers_lock = threading.Lock()
+
+
+def _account_kwargs(account):
+    if account == 'transaction' and getattr(settings, 'TRANSACTION_EMAIL_HOST', None):
+        return {
+            'host': settings.TRANSACTION_EMAIL_HOST,
+            'port': getattr(settings, 'TRANSACTION_EMAIL_PORT', 587),
+            'username': getattr(settings, 'TRANSACTION_EMAIL_HOST_USER', ''),
+            'password': getattr(settings, 'TRANSACTION_EMAIL_HOST_PASSWORD', ''),
+            'use_tls': getattr(settings, 'TRANSACTION_EMAIL_USE_TLS', True),
+        }
+    return {}
+
+
+def get_mailer(account='default'):
+    mailer = _mailers.get(account)
+    if mailer is None:
+        with _mailers_lock:
+            mailer = _mailers.get(account)
+            if mailer is None:
+                mailer = _mailers[account] = PooledMailer(account, _account_kwargs(account))
+    return mailer
+
+
+def from_email(account='default'):
+    if account == 'transaction':
+        return getattr(settings, 'TRANSACTION_EMAIL_HOST_USER', None) or settings.DEFAULT_FROM_EMAIL
+    return settings.DEFAULT_FROM_EMAIL
+
+
+def send(to, subject, body, account='default', attachments=None):
+    """Письмо через пул аккаунта. False — не отправлено (outbox повторит)."""
+    message = EmailMessage(subject, body, from_email(account), [to])
+    for filename, content, mimetype in attachments or []:
+        message.attach(filename, content, mimetype)
+    return get_mailer(account).send(message)
@@ -0,0 +1,43 @@
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.accounts_apps import telegram_chats
+
+
+class Command(BaseCommand):
+    help = "Проставить telegram_chat_id настройкам уведомлений по индексу telegram_chats (один пакетный проход)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-updates', action='store_true',
+            help="Перед проходом однократно пополнить индекс из getUpdates обоих ботов (если webhook не установлен)",
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['from_updates']:
+            for bot_token in {settings.TELEGRAM_BOT_TOKEN, getattr(settings, 'USER_TELEGRAM_BOT_TOKEN', '')}:
+                if bot_token:
+                    self._seed_from_updates(bot_token)
+
+        filled = telegram_chats.backfill(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"chat_id проставлен: {filled}"))
+
+    def _seed_from_updates(self, bot_token):
+        try:
+            resp = requests.get(f"https://api.telegram.org/bot{bot_token}/getUpdates", timeout=30).json()
+        except Exception as e:
+            self.stderr.write(f"getUpdates недоступен: {e}")
+            return
+        if not resp.get('ok'):
+            self.stderr.write(f"getUpdates: {resp.get('description')}")
+            return
+        seen = {}
+        for update in resp['result']:
+            chat = update.get('message', {}).get('chat', {})
+            if chat.get('username') and chat.get('id'):
+                seen[chat['username']] = chat['id']
+        for username, chat_id in seen.items():
+            telegram_chats.remember(username, chat_id)
+        self.stdout.write(f"Из getUpdates получено чатов: {len(seen)}")
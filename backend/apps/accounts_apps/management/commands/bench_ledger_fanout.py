@@ -0,0 +1,71 @@
+import asyncio
+import statistics
+import time
+
+from channels.layers import get_channel_layer
+from django.core.management.base import BaseCommand
+
+from apps.accounts_apps.realtime import ledger_group
+
+
+class Command(BaseCommand):
+    help = "Нагрузочный тест fan-out ledger-событий через channel layer (N подписчиков, задержка доставки)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=10000)
+        parser.add_argument('--rounds', type=int, default=5, help="Сколько раз разослать событие всем клиентам")
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        latencies, lost = asyncio.run(self._run(options['clients'], options['rounds'], options['timeout']))
+        if not latencies:
+            self.stderr.write("Ни одно событие не доставлено")
+            return
+        latencies.sort()
+
+        def p(q):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+
+        self.stdout.write(self.style.SUCCESS(
+            f"clients={options['clients']} delivered={len(latencies)} lost={lost} "
+            f"p50={p(0.5):.1f}ms p95={p(0.95):.1f}ms p99={p(0.99):.1f}ms "
+            f"max={latencies[-1] * 1000:.1f}ms mean={statistics.mean(latencies) * 1000:.1f}ms"
+        ))
+
+    async def _run(self, clients, rounds, timeout):
+        layer = get_channel_layer()
+        prefix = f"bench{int(time.time())}"
+        channels = []
+        for i in range(clients):
+            channel = await layer.new_channel()
+            await layer.group_add(ledger_group(f"{prefix}-{i}"), channel)
+            channels.append(channel)
+
+        latencies = []
+        lost = 0
+        try:
+            for _ in range(rounds):
+                sent_at = time.monotonic()
+                # как push_ledger_events: одна группа на пользователя
+                await asyncio.gather(*(
+                    layer.group_send(ledger_group(f"{prefix}-{i}"), {"type": "ledger.event", "payload": {}})
+                    for i in range(clients)
+                ))
+                results = await asyncio.gather(
+                    *(asyncio.wait_for(self._receive(layer, channel), timeout) for channel in channels),
+                    return_exceptions=True,
+                )
+                for received_at in results:
+                    if isinstance(received_at, BaseException):
+                        lost += 1
+                    else:
+                        latencies.append(received_at - sent_at)
+        finally:
+            for i, channel in enumerate(channels):
+                await layer.group_discard(ledger_group(f"{prefix}-{i}"), channel)
+        return latencies, lost
+
+    @staticmethod
+    async def _receive(layer, channel):
+        await layer.receive(channel)
+        return time.monotonic()
@@ -0,0 +1,75 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from apps.accounts_apps.whatsapp import WahaConfig, WhatsAppSender
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Локальная заглушка WAHA: читает тело целиком и отвечает 201 после задержки."""
+    latency = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        time.sleep(self.latency)
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Нагрузочный тест WhatsAppSender против локальной заглушки WAHA (темп, очередь, задержка)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument('--recipients', type=int, default=50)
+        parser.add_argument('--threads', type=int, default=16, help="Параллельные отправители (как воркеры outbox)")
+        parser.add_argument('--file-kb', type=int, default=0, help="Размер вложения sendFile; 0 — только sendText")
+        parser.add_argument('--latency', type=float, default=0.05, help="Задержка ответа заглушки, с")
+
+    def handle(self, *args, **options):
+        _StubHandler.latency = options['latency']
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        sender = WhatsAppSender(WahaConfig(f"http://127.0.0.1:{server.server_port}", 'bench', 'bench'))
+        content = b'x' * (options['file_kb'] * 1024)
+
+        def send_one(i):
+            phone = f"971500{i % options['recipients']:06d}"
+            started = time.monotonic()
+            if content:
+                resp = sender.send_file(phone, content, 'statement.html', 'bench')
+            else:
+                resp = sender.send_text(phone, f"bench {i}")
+            return resp is not False and resp.ok, time.monotonic() - started
+
+        started = time.monotonic()
+        try:
+            with ThreadPoolExecutor(options['threads']) as pool:
+                results = list(pool.map(send_one, range(options['messages'])))
+        finally:
+            server.shutdown()
+        elapsed = time.monotonic() - started
+
+        latencies = sorted(latency for ok, latency in results if ok)
+        failed = len(results) - len(latencies)
+        if not latencies:
+            self.stderr.write("Ни одно сообщение не доставлено")
+            return
+
+        def p(q):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+
+        self.stdout.write(self.style.SUCCESS(
+            f"sent={len(latencies)} rejected_or_failed={failed} elapsed={elapsed:.1f}s "
+            f"rate={len(latencies) / elapsed:.2f}/s (limit {sender.rate}/s) "
+            f"p50={p(0.5):.0f}ms p95={p(0.95):.0f}ms max={latencies[-1] * 1000:.0f}ms"
+        ))
@@ -0,0 +1,82 @@
+import logging
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.accounts_apps import notifications  # noqa: F401  регистрирует обработчики
+from api.accounts_api import profile_sync  # noqa: F401
+from apps.accounts_apps import outbox, realtime
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Воркер outbox: выполняет уведомления и broadcast после коммита (retry, backoff, dead-letter)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help="Размер пула потоков")
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help="Один проход и выход")
+        parser.add_argument('--purge-interval', type=float, default=600.0,
+                            help="Раз в сколько секунд удалять done старше OUTBOX_DONE_RETENTION_DAYS (0 — не удалять)")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        batch_size = options['batch_size']
+        in_flight = {event_type: set() for event_type in outbox.HANDLERS}
+        self.stdout.write(f"Outbox worker started: {', '.join(sorted(outbox.HANDLERS))}")
+
+        purge_interval = options['purge_interval']
+        next_purge = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while not self.stopping:
+                if purge_interval and time.monotonic() >= next_purge:
+                    self._purge()
+                    next_purge = time.monotonic() + purge_interval
+                claimed = 0
+                for event_type, entry in outbox.HANDLERS.items():
+                    running = in_flight[event_type]
+                    running.difference_update({f for f in running if f.done()})
+                    free = min(entry.concurrency - len(running), batch_size)
+                    for event in outbox.claim(event_type, free):
+                        running.add(pool.submit(self._run, event))
+                        claimed += 1
+                if options['once']:
+                    break
+                if not claimed:
+                    close_old_connections()
+                    time.sleep(options['poll_interval'])
+
+        realtime.broadcaster.flush()
+        self.stdout.write("Outbox worker stopped")
+
+    def _purge(self):
+        try:
+            purged = outbox.purge_done()
+        except Exception as e:
+            logger.error(f"[outbox] purge failed: {e}")
+            return
+        if purged:
+            logger.info(f"[outbox] purged {purged} done events")
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    @staticmethod
+    def _run(event):
+        close_old_connections()
+        try:
+            outbox.process(event)
+        except Exception as e:
+            # lease истечёт, и событие будет взято повторно
+            logger.error(f"[outbox] {event.event_type} {event.id} crashed: {e}")
+        finally:
+            close_old_connections()
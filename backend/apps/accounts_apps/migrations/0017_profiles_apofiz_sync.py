@@ -0,0 +1,28 @@
+# Generated by Django 5.2.11 on 2026-10-17 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts_apps', '0016_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profiles',
+            name='apofiz_data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='profiles',
+            name='apofiz_payload_hash',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='profiles',
+            name='apofiz_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
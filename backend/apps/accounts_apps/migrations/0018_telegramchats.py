@@ -0,0 +1,27 @@
+# Generated by Django 5.2.11 on 2026-10-17 15:40
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts_apps', '0017_profiles_apofiz_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelegramChats',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('username', models.CharField(help_text='Без @, в нижнем регистре', max_length=100, unique=True)),
+                ('chat_id', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'telegram_chats',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-17 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts_apps', '0018_telegramchats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adminnotificationsettings',
+            name='subscribed_actions',
+            field=models.JSONField(blank=True, default=list, help_text='Действия для уведомлений; пусто — все, кроме ADMIN_NOTIFY_MUTED_ACTIONS'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.11 on 2026-10-17 18:40
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('accounts_apps', '0019_adminnotificationsettings_subscribed_actions'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('status', 'done')), fields=['processed_at'], name='outbox_done_idx'),
+        ),
+    ]
@@ -99,6 +99,11 @@ class Profiles(models.Model):
 
     referral_level = models.CharField(max_length=50, choices=REFERRAL_CHOICES, default='R1(DEFAULT)')
 
+    # Последний ответ Apofiz users/me (обновляется в фоне, см. profile_sync)
+    apofiz_data = models.JSONField(null=True, blank=True)
+    apofiz_payload_hash = models.CharField(max_length=40, null=True, blank=True)
+    apofiz_synced_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         db_table = 'profiles'
 
@@ -180,6 +185,11 @@ class AdminNotificationSettings(models.Model):
     
     email_address = models.EmailField(blank=True, null=True)
     email_enabled = models.BooleanField(default=False)
+
+    subscribed_actions = models.JSONField(
+        default=list, blank=True,
+        help_text="Действия для уведомлений; пусто — все, кроме ADMIN_NOTIFY_MUTED_ACTIONS",
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -217,4 +227,41 @@ class AiChatHistory(models.Model):
 
     class Meta:
         db_table = 'ai_chat_history'
-        ordering = ['created_at']
\ No newline at end of file
+        ordering = ['created_at']
+
+class OutboxEvent(models.Model):
+    """Побочный эффект после коммита (уведомления, broadcast), выполняется воркером run_outbox_worker."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('dead', 'Dead letter'),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbox_events'
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['processed_at'], name='outbox_done_idx', condition=models.Q(status='done')),
+        ]
+
+class TelegramChats(models.Model):
+    """username -> chat_id из webhook-ов ботов (общий для бота админов и пользовательского бота)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    username = models.CharField(max_length=100, unique=True, help_text="Без @, в нижнем регистре")
+    chat_id = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'telegram_chats'
@@ -1,4 +1,3 @@
-import threading
 import requests
 import logging
 import ast
@@ -6,9 +5,11 @@ import re
 from datetime import timedelta, timezone
 from decimal import Decimal
 from django.conf import settings
-from django.core.mail import send_mail, get_connection, EmailMessage
-from .models import AdminNotificationSettings, UserRoles, WahaSession, UserNotificationSettings, Profiles
+from apps.transactions_apps import statements
+from . import admin_routing, identity, mailer, outbox, realtime, telegram_chats, whatsapp
+from .models import AdminNotificationSettings, UserNotificationSettings, Profiles
 from django.apps import apps
+from django.db import transaction
 
 logger = logging.getLogger(__name__)
 
@@ -241,94 +242,49 @@ def to_2_decimals(value):
     return str(value)
 
 
-def resolve_telegram_username_to_id(username):
-    username = username.replace('@', '').strip().lower()
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/getUpdates"
-    try:
-        resp = requests.get(url, timeout=10).json()
-        if resp.get('ok'):
-            for update in resp['result']:
-                msg = update.get('message', {})
-                chat = msg.get('chat', {})
-                if chat.get('username', '').lower() == username:
-                    return str(chat.get('id'))
-    except Exception as e:
-        logger.error(f"TG Resolve Error: {e}")
-    return None
+def _delivered(resp, channel):
+    """False — временный сбой (429/5xx), outbox повторит доставку; прочие ответы не повторяются."""
+    if resp.status_code == 429 or resp.status_code >= 500:
+        logger.error(f"{channel} delivery failed: {resp.status_code} - {resp.text[:200]}")
+        return False
+    return True
 
 def send_telegram(settings_obj, text):
     try:
-        chat_id = settings_obj.telegram_chat_id
-        if not chat_id and settings_obj.telegram_username:
-            chat_id = resolve_telegram_username_to_id(settings_obj.telegram_username)
-            if chat_id:
-                settings_obj.telegram_chat_id = chat_id
-                settings_obj.save(update_fields=['telegram_chat_id'])
+        chat_id = telegram_chats.chat_id_for(settings_obj)
         
         if not chat_id:
             logger.error(f"TG: chat_id not found for {settings_obj.telegram_username}. The user must press /start in the bot!")
             return
 
         url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
-        requests.post(url, json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"}, timeout=10)
+        resp = requests.post(url, json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"}, timeout=10)
+        return _delivered(resp, "Telegram")
     except Exception as e:
         logger.error(f"Telegram Notification Error: {e}")
+        return False
 
 def send_whatsapp(phone, text):
     try:
-        clean_phone = ''.join(filter(str.isdigit, str(phone)))
-        try:
-            WahaSession = apps.get_model('accounts_apps', 'WahaSession')
-            session = WahaSession.objects.filter(is_active=True).first()
-        except Exception:
-            session = None
-        api_url = session.api_url if session else getattr(settings, 'WAHA_API_URL', 'http://waha:3000')
-        session_name = session.session_name if session else getattr(settings, 'WAHA_SESSION_NAME', 'default')
-        api_key = session.api_key if session else getattr(settings, 'WAHA_API_KEY', '5f0ed637143a4fddac67e3108cfd80ed')
-        url = f"{api_url.rstrip('/')}/api/sendText"
-        payload = {
-            "chatId": f"{clean_phone}@c.us",
-            "text": text,
-            "session": session_name
-        }
-        headers = {
-            "Content-Type": "application/json",
-            "X-Api-Key": api_key
-        }
-        resp = requests.post(url, json=payload, headers=headers, timeout=30)
-        
+        resp = whatsapp.sender.send_text(phone, text)
+        if resp is False:
+            return False
         if resp.status_code not in [200, 201]:
             logger.error(f"WAHA Error: {resp.status_code} - {resp.text}")
-        else:
-            logger.info(f"WhatsApp message sent to {clean_phone} successfully.")
+            return _delivered(resp, "WhatsApp")
+        logger.info(f"WhatsApp message sent to {phone} successfully.")
+        return True
     except Exception as e:
         logger.error(f"WhatsApp Notification Error: {str(e)}")
+        return False
 
 def send_email_async(email, text, is_transaction=False):
+    subject = "💳 Financial Notification | uEasyCard" if is_transaction else "🔔 System Notification | uEasyCard"
     try:
-        subject = "💳 Financial Notification | uEasyCard" if is_transaction else "🔔 System Notification | uEasyCard"
-        if is_transaction:
-            from_email = getattr(settings, 'TRANSACTION_EMAIL_HOST_USER', getattr(settings, 'DEFAULT_FROM_EMAIL'))
-            tx_host = getattr(settings, 'TRANSACTION_EMAIL_HOST', None)
-            
-            if tx_host:
-                connection = get_connection(
-                    host=tx_host,
-                    port=getattr(settings, 'TRANSACTION_EMAIL_PORT', 587),
-                    username=getattr(settings, 'TRANSACTION_EMAIL_HOST_USER', ''),
-                    password=getattr(settings, 'TRANSACTION_EMAIL_HOST_PASSWORD', ''),
-                    use_tls=getattr(settings, 'TRANSACTION_EMAIL_USE_TLS', True)
-                )
-                email_msg = EmailMessage(subject, text, from_email, [email], connection=connection)
-                email_msg.send()
-                return
-            else:
-                send_mail(subject, text, from_email, [email], fail_silently=False)
-        else:
-            send_mail(subject, text, settings.DEFAULT_FROM_EMAIL, [email], fail_silently=False)
-            
+        return mailer.send(email, subject, text, account='transaction' if is_transaction else 'default')
     except Exception as e:
         logger.error(f"Email Notification Error: {e}")
+        return False
 
 def format_human_readable_details(details_str):
     if not details_str:
@@ -364,48 +320,33 @@ def format_notification_message(instance):
         f"📝 <b>Details:</b>\n{pretty_details}"
     )
 
+def to_whatsapp_text(text):
+    return text.replace('<b>', '*').replace('</b>', '*').replace('<i>', '_').replace('</i>', '_')
+
+def to_plain_text(text):
+    return text.replace('<b>', '').replace('</b>', '').replace('<i>', '').replace('</i>', '')
+
 def dispatch_notifications(instance):
-    privileged_users = UserRoles.objects.filter(role__in=['admin', 'root']).values_list('user_id', flat=True)
-    active_settings = AdminNotificationSettings.objects.filter(user_id__in=privileged_users)
+    """Получатели из кэшированной таблицы маршрутов; текст рендерится один раз на формат канала."""
+    routes = admin_routing.routes_for(instance.action)
+    if not routes:
+        return
     text = format_notification_message(instance)
-    wa_text = text.replace('<b>', '*').replace('</b>', '*').replace('<i>', '_').replace('</i>', '_')
-    plain_text = text.replace('<b>', '').replace('</b>', '').replace('<i>', '').replace('</i>', '')
+    telegram_ids = [r.settings_id for r in routes if r.telegram]
+    phones = sorted({r.whatsapp for r in routes if r.whatsapp})
+    emails = sorted({r.email for r in routes if r.email})
 
-    for s in active_settings:
-        if s.telegram_enabled and s.telegram_username:
-            threading.Thread(target=send_telegram, args=(s, text), daemon=True).start()
-        if s.whatsapp_enabled and s.whatsapp_number:
-            threading.Thread(target=send_whatsapp, args=(s.whatsapp_number, wa_text), daemon=True).start()
-        if s.email_enabled and s.email_address:
-            threading.Thread(target=send_email_async, args=(s.email_address, plain_text, False), daemon=True).start()
+    if telegram_ids:
+        outbox.enqueue('admin_notify.telegram', {"text": text, "recipients": telegram_ids})
+    if phones:
+        outbox.enqueue('admin_notify.whatsapp', {"text": to_whatsapp_text(text), "recipients": phones})
+    if emails:
+        outbox.enqueue('admin_notify.email', {"text": to_plain_text(text), "recipients": emails})
 
 def dispatch_test_notification(s):
     text = "🔧 <b>Test notification from uEasyCard system</b>\nIf you are reading this, the integration works successfully!"
-    if s.telegram_enabled and s.telegram_username:
-        threading.Thread(target=send_telegram, args=(s, text), daemon=True).start()
-    if s.whatsapp_enabled and s.whatsapp_number:
-        threading.Thread(target=send_whatsapp, args=(s.whatsapp_number, text), daemon=True).start()
-    if s.email_enabled and s.email_address:
-        plain_text = text.replace('<b>', '').replace('</b>', '')
-        threading.Thread(target=send_email_async, args=(s.email_address, plain_text, False), daemon=True).start()
-
-def resolve_user_telegram_username_to_id(username):
-    username = username.replace('@', '').strip().lower()
-    bot_token = getattr(settings, 'USER_TELEGRAM_BOT_TOKEN', '')
-    if not bot_token:
-        return None
-    url = f"https://api.telegram.org/bot{bot_token}/getUpdates"
-    try:
-        resp = requests.get(url, timeout=10).json()
-        if resp.get('ok'):
-            for update in resp['result']:
-                msg = update.get('message', {})
-                chat = msg.get('chat', {})
-                if chat.get('username', '').lower() == username:
-                    return str(chat.get('id'))
-    except Exception as e:
-        logger.error(f"User TG Resolve Error: {e}")
-    return None
+    plain_text = text.replace('<b>', '').replace('</b>', '')
+    enqueue_channel_notifications(s, text, text, plain_text)
 
 def send_user_telegram(settings_obj, text):
     try:
@@ -414,21 +355,18 @@ def send_user_telegram(settings_obj, text):
             logger.error("USER_TELEGRAM_BOT_TOKEN is not configured!")
             return
 
-        chat_id = settings_obj.telegram_chat_id
-        if not chat_id and settings_obj.telegram_username:
-            chat_id = resolve_user_telegram_username_to_id(settings_obj.telegram_username)
-            if chat_id:
-                settings_obj.telegram_chat_id = chat_id
-                settings_obj.save(update_fields=['telegram_chat_id'])
+        chat_id = telegram_chats.chat_id_for(settings_obj)
         
         if not chat_id:
             logger.error(f"User TG: chat_id not found for {settings_obj.telegram_username}. The user must start the bot!")
             return
 
         url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        requests.post(url, json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"}, timeout=10)
+        resp = requests.post(url, json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"}, timeout=10)
+        return _delivered(resp, "User Telegram")
     except Exception as e:
         logger.error(f"User Telegram Notification Error: {e}")
+        return False
 
 
 def build_transaction_message(txn, role, lang_code='en'):
@@ -514,12 +452,9 @@ def get_user_language(user_id):
     if not user_id or str(user_id) == 'EXTERNAL':
         return 'en'
     try:
-        profile = Profiles.objects.filter(user_id=str(user_id)).first()
-        if profile and profile.language:
-            return profile.language.lower()[:2]
+        return identity.get(user_id).language
     except Exception:
-        pass
-    return 'en'
+        return 'en'
 
 
 def notify_transaction_parties(transaction_id):
@@ -528,17 +463,21 @@ def notify_transaction_parties(transaction_id):
         txn = Transactions.objects.get(id=transaction_id)
     except Transactions.DoesNotExist:
         return
-        
-    if txn.sender_id and txn.sender_id != 'EXTERNAL':
-        sender_lang = get_user_language(txn.sender_id)
-        sender_text = build_transaction_message(txn, 'sender', sender_lang)
-        send_user_notification(txn.sender_id, sender_text, is_transaction=True)
-        
-    if txn.receiver_id and txn.receiver_id != 'EXTERNAL':
-        if txn.sender_id != txn.receiver_id:
-            receiver_lang = get_user_language(txn.receiver_id)
-            receiver_text = build_transaction_message(txn, 'receiver', receiver_lang)
-            send_user_notification(txn.receiver_id, receiver_text, is_transaction=True)
+    # обе стороны одним запросом, дальше get_user_language берёт из кэша
+    identity.get_many([txn.sender_id, txn.receiver_id])
+
+    # события обеих сторон пишутся вместе: при сбое на получателе повтор не продублирует уведомления отправителю
+    with transaction.atomic():
+        if txn.sender_id and txn.sender_id != 'EXTERNAL':
+            sender_lang = get_user_language(txn.sender_id)
+            sender_text = build_transaction_message(txn, 'sender', sender_lang)
+            send_user_notification(txn.sender_id, sender_text, is_transaction=True)
+
+        if txn.receiver_id and txn.receiver_id != 'EXTERNAL':
+            if txn.sender_id != txn.receiver_id:
+                receiver_lang = get_user_language(txn.receiver_id)
+                receiver_text = build_transaction_message(txn, 'receiver', receiver_lang)
+                send_user_notification(txn.receiver_id, receiver_text, is_transaction=True)
 
 
 def send_user_notification(user_id, text, is_transaction=False):
@@ -546,14 +485,7 @@ def send_user_notification(user_id, text, is_transaction=False):
         settings_obj = UserNotificationSettings.objects.get(user_id=str(user_id))
     except UserNotificationSettings.DoesNotExist:
         return
-    wa_text = text.replace('<b>', '*').replace('</b>', '*').replace('<i>', '_').replace('</i>', '_')
-    plain_text = text.replace('<b>', '').replace('</b>', '').replace('<i>', '').replace('</i>', '')
-    if settings_obj.telegram_enabled and settings_obj.telegram_username:
-        threading.Thread(target=send_user_telegram, args=(settings_obj, text), daemon=True).start()
-    if settings_obj.whatsapp_enabled and settings_obj.whatsapp_number:
-        threading.Thread(target=send_whatsapp, args=(settings_obj.whatsapp_number, wa_text), daemon=True).start()
-    if settings_obj.email_enabled and settings_obj.email_address:
-        threading.Thread(target=send_email_async, args=(settings_obj.email_address, plain_text, is_transaction), daemon=True).start()
+    enqueue_channel_notifications(settings_obj, text, to_whatsapp_text(text), to_plain_text(text), is_transaction)
 
 
 def dispatch_user_transaction_notification(user_id, tx_details_text=None, transaction_id=None):
@@ -563,8 +495,117 @@ def dispatch_user_transaction_notification(user_id, tx_details_text=None, transa
         send_user_notification(user_id, tx_details_text, is_transaction=True)
 
 
+# ─── OUTBOX CONSUMERS ───
+
+ADMIN_BATCH_MAX_ATTEMPTS = 5
+
+
+def enqueue_channel_notifications(settings_obj, text, wa_text, plain_text, is_transaction=False):
+    """Одно событие outbox на канал, чтобы повтор одного канала не дублировал остальные."""
+    if settings_obj.telegram_enabled and settings_obj.telegram_username:
+        outbox.enqueue('notify.telegram', {
+            "settings_model": settings_obj.__class__.__name__,
+            "settings_id": str(settings_obj.id),
+            "text": text,
+        })
+    if settings_obj.whatsapp_enabled and settings_obj.whatsapp_number:
+        outbox.enqueue('notify.whatsapp', {"phone": settings_obj.whatsapp_number, "text": wa_text})
+    if settings_obj.email_enabled and settings_obj.email_address:
+        outbox.enqueue('notify.email', {
+            "email": settings_obj.email_address, "text": plain_text, "is_transaction": is_transaction,
+        })
+
+
+@outbox.handler('transaction.broadcast', concurrency=8, max_attempts=5)
+def handle_transaction_broadcast(payload):
+    Transactions = apps.get_model('transactions_apps', 'Transactions')
+    txn = Transactions.objects.filter(id=payload['transaction_id']).first()
+    # publish ждёт отправки пачки: событие отмечается выполненным только после доставки
+    if txn and not realtime.broadcaster.publish(realtime.transaction_events(txn)):
+        raise outbox.RetryLater("Realtime broadcast failed")
+
+
+@outbox.handler('ledger.push', concurrency=8, max_attempts=3)
+def handle_ledger_push(payload):
+    Transactions = apps.get_model('transactions_apps', 'Transactions')
+    txn = Transactions.objects.filter(id=payload['transaction_id']).first()
+    if txn and not realtime.push_ledger_events(txn):
+        raise outbox.RetryLater("Ledger push failed")
+
+
+@outbox.handler('transaction.completed', concurrency=4)
+def handle_transaction_completed(payload):
+    notify_transaction_parties(payload['transaction_id'])
+
+
+@outbox.handler('admin_action.created', concurrency=2)
+def handle_admin_action(payload):
+    AdminActionHistory = apps.get_model('accounts_apps', 'AdminActionHistory')
+    instance = AdminActionHistory.objects.filter(id=payload['admin_action_id']).first()
+    if instance:
+        dispatch_notifications(instance)
+
+
+@outbox.handler('notify.telegram', concurrency=4)
+def handle_telegram(payload):
+    model = apps.get_model('accounts_apps', payload['settings_model'])
+    settings_obj = model.objects.filter(id=payload['settings_id']).first()
+    if not settings_obj:
+        return
+    sender = send_user_telegram if model is UserNotificationSettings else send_telegram
+    if sender(settings_obj, payload['text']) is False:
+        raise outbox.RetryLater("Telegram delivery failed")
+
+
+@outbox.handler('notify.whatsapp', concurrency=4)
+def handle_whatsapp(payload):
+    if send_whatsapp(payload['phone'], payload['text']) is False:
+        raise outbox.RetryLater("WhatsApp delivery failed")
+
+
+@outbox.handler('notify.email', concurrency=4)
+def handle_email(payload):
+    if send_email_async(payload['email'], payload['text'], payload.get('is_transaction', False)) is False:
+        raise outbox.RetryLater("Email delivery failed")
+
+
+def _deliver_batch(event_type, payload, send):
+    """Пачка одного канала; повтор уходит новым событием только недоставленным — без дублей остальным."""
+    failed = [recipient for recipient in payload['recipients'] if send(recipient, payload['text']) is False]
+    if not failed:
+        return
+    attempt = payload.get('attempt', 1) + 1
+    if attempt > ADMIN_BATCH_MAX_ATTEMPTS:
+        logger.error(f"{event_type}: gave up on {len(failed)} recipients after {ADMIN_BATCH_MAX_ATTEMPTS} attempts")
+        return
+    outbox.enqueue(event_type, {**payload, "recipients": failed, "attempt": attempt}, delay=outbox.backoff_seconds(attempt))
+
+
+@outbox.handler('admin_notify.telegram', concurrency=2)
+def handle_admin_telegram(payload):
+    settings_by_id = {str(pk): obj for pk, obj in AdminNotificationSettings.objects.in_bulk(payload['recipients']).items()}
+
+    def send(settings_id, text):
+        settings_obj = settings_by_id.get(settings_id)
+        return send_telegram(settings_obj, text) if settings_obj else None
+
+    _deliver_batch('admin_notify.telegram', payload, send)
+
+
+@outbox.handler('admin_notify.whatsapp', concurrency=2)
+def handle_admin_whatsapp(payload):
+    _deliver_batch('admin_notify.whatsapp', payload, send_whatsapp)
+
+
+@outbox.handler('admin_notify.email', concurrency=2)
+def handle_admin_email(payload):
+    _deliver_batch('admin_notify.email', payload, send_email_async)
+
+
 # ─── STATEMENT FILE DELIVERY ───
 
+EMPTY_STATEMENT_BASE64 = 'PGh0bWw+PGJvZHk+RW1wdHkgc3RhdGVtZW50PC9ib2R5PjwvaHRtbD4='
+
 STATEMENT_TRANSLATIONS = {
     'en': {
         'subject': '📄 Your Statement | uEasyCard',
@@ -604,20 +645,15 @@ STATEMENT_TRANSLATIONS = {
 }
 
 
-def send_telegram_document(settings_obj, file_bytes, filename, caption):
+def send_telegram_document(settings_obj, file_bytes, filename, caption, mimetype='text/html'):
     """Send a file (document) via Telegram Bot API."""
     try:
-        chat_id = settings_obj.telegram_chat_id
-        if not chat_id and settings_obj.telegram_username:
-            chat_id = resolve_telegram_username_to_id(settings_obj.telegram_username)
-            if chat_id:
-                settings_obj.telegram_chat_id = chat_id
-                settings_obj.save(update_fields=['telegram_chat_id'])
+        chat_id = telegram_chats.chat_id_for(settings_obj)
         if not chat_id:
             logger.error(f"TG Document: chat_id not found for {settings_obj.telegram_username}")
             return False
         url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendDocument"
-        files = {'document': (filename, file_bytes, 'text/html')}
+        files = {'document': (filename, file_bytes, mimetype)}
         data = {'chat_id': chat_id, 'caption': caption, 'parse_mode': 'HTML'}
         resp = requests.post(url, data=data, files=files, timeout=30)
         if resp.status_code == 200:
@@ -631,36 +667,14 @@ def send_telegram_document(settings_obj, file_bytes, filename, caption):
         return False
 
 
-def send_whatsapp_file(phone, file_bytes, filename, caption):
-    """Send a file via WAHA sendFile API."""
-    import base64
+def send_whatsapp_file(phone, file_bytes, filename, caption, mimetype='text/html'):
+    """Send a file via WAHA sendFile API (base64 кодируется потоком при отправке)."""
     try:
-        clean_phone = ''.join(filter(str.isdigit, str(phone)))
-        try:
-            WahaSessionModel = apps.get_model('accounts_apps', 'WahaSession')
-            session = WahaSessionModel.objects.filter(is_active=True).first()
-        except Exception:
-            session = None
-        api_url = session.api_url if session else getattr(settings, 'WAHA_API_URL', 'http://waha:3000')
-        session_name = session.session_name if session else getattr(settings, 'WAHA_SESSION_NAME', 'default')
-        api_key = session.api_key if session else getattr(settings, 'WAHA_API_KEY', '5f0ed637143a4fddac67e3108cfd80ed')
-
-        b64 = base64.b64encode(file_bytes).decode('utf-8')
-        url = f"{api_url.rstrip('/')}/api/sendFile"
-        payload = {
-            "chatId": f"{clean_phone}@c.us",
-            "file": {
-                "mimetype": "text/html",
-                "filename": filename,
-                "data": f"data:text/html;base64,{b64}",
-            },
-            "caption": caption,
-            "session": session_name,
-        }
-        headers = {"Content-Type": "application/json", "X-Api-Key": api_key}
-        resp = requests.post(url, json=payload, headers=headers, timeout=30)
+        resp = whatsapp.sender.send_file(phone, file_bytes, filename, caption, mimetype)
+        if resp is False:
+            return False
         if resp.status_code in [200, 201]:
-            logger.info(f"WA file sent to {clean_phone}")
+            logger.info(f"WA file sent to {phone}")
             return True
         else:
             logger.error(f"WAHA File Error: {resp.status_code} - {resp.text}")
@@ -670,80 +684,68 @@ def send_whatsapp_file(phone, file_bytes, filename, caption):
         return False
 
 
-def send_email_with_attachment(email_address, subject, body_text, file_bytes, filename):
-    """Send email with HTML file attachment."""
+def send_email_with_attachment(email_address, subject, body_text, file_bytes, filename, mimetype='text/html'):
+    """Send email with file attachment."""
     try:
-        from_email = getattr(settings, 'TRANSACTION_EMAIL_HOST_USER', getattr(settings, 'DEFAULT_FROM_EMAIL'))
-        tx_host = getattr(settings, 'TRANSACTION_EMAIL_HOST', None)
-
-        if tx_host:
-            connection = get_connection(
-                host=tx_host,
-                port=getattr(settings, 'TRANSACTION_EMAIL_PORT', 587),
-                username=getattr(settings, 'TRANSACTION_EMAIL_HOST_USER', ''),
-                password=getattr(settings, 'TRANSACTION_EMAIL_HOST_PASSWORD', ''),
-                use_tls=getattr(settings, 'TRANSACTION_EMAIL_USE_TLS', True)
-            )
-        else:
-            connection = None
-
-        email_msg = EmailMessage(subject, body_text, from_email, [email_address], connection=connection)
-        email_msg.attach(filename, file_bytes, 'text/html')
-        email_msg.send()
-        logger.info(f"Email with attachment sent to {email_address}")
-        return True
+        sent = mailer.send(
+            email_address, subject, body_text, account='transaction',
+            attachments=[(filename, file_bytes, mimetype)],
+        )
+        if sent:
+            logger.info(f"Email with attachment sent to {email_address}")
+        return sent
     except Exception as e:
         logger.error(f"Email Attachment Error: {e}")
         return False
 
 
-def send_statement_to_channels(user_id, channels, period_label, asset_labels, lang='en', html_base64=None, file_name=None):
+def send_statement_to_channels(user_id, channels, period_label, asset_labels, lang='en', html_base64=None, file_name=None, statement=None):
     """
-    Send statement HTML file via selected channels (telegram, whatsapp, email).
-    Returns dict with results per channel.
+    Send statement file via selected channels (telegram, whatsapp, email).
+    statement — готовый StatementFile (серверная генерация); иначе файл из html_base64.
+    Один временный файл на все каналы. Returns dict with results per channel.
     """
-    import base64 as b64mod
     tr = STATEMENT_TRANSLATIONS.get(lang, STATEMENT_TRANSLATIONS['en'])
     assets_detail = '\n'.join(f'  • {label}' for label in asset_labels) if asset_labels else '—'
     message = tr['message'].format(period=period_label, assets_detail=assets_detail)
-    caption = tr['caption'].format(period=period_label)
     subject = tr['subject']
 
-    if html_base64:
-        file_bytes = b64mod.b64decode(html_base64)
-    else:
-        file_bytes = b'<html><body>Empty statement</body></html>'
-
-    file_date = __import__('datetime').datetime.now().strftime('%Y%m%d')
-    filename = file_name or f"uEasyCard_Statement_{file_date}.html"
-
     # Get user notification settings
     notif = UserNotificationSettings.objects.filter(user_id=user_id).first()
     if not notif:
         return {ch: {'ok': False, 'error': 'Notification settings not found'} for ch in channels}
 
-    results = {}
+    owns_file = statement is None
+    if owns_file:
+        statement = statements.from_base64(html_base64 or EMPTY_STATEMENT_BASE64, file_name)
+    filename = file_name or statement.filename
 
-    for ch in channels:
-        if ch == 'telegram':
-            if notif.telegram_enabled and (notif.telegram_chat_id or notif.telegram_username):
-                ok = send_telegram_document(notif, file_bytes, filename, message)
-                results['telegram'] = {'ok': ok}
-            else:
-                results['telegram'] = {'ok': False, 'error': 'Telegram not configured'}
-
-        elif ch == 'whatsapp':
-            if notif.whatsapp_enabled and notif.whatsapp_number:
-                ok = send_whatsapp_file(notif.whatsapp_number, file_bytes, filename, message)
-                results['whatsapp'] = {'ok': ok}
-            else:
-                results['whatsapp'] = {'ok': False, 'error': 'WhatsApp not configured'}
-
-        elif ch == 'email':
-            if notif.email_enabled and notif.email_address:
-                ok = send_email_with_attachment(notif.email_address, subject, message, file_bytes, filename)
-                results['email'] = {'ok': ok}
-            else:
-                results['email'] = {'ok': False, 'error': 'Email not configured'}
-
-    return results
\ No newline at end of file
+    results = {}
+    try:
+        for ch in channels:
+            if ch == 'telegram':
+                if notif.telegram_enabled and (notif.telegram_chat_id or notif.telegram_username):
+                    ok = send_telegram_document(notif, statement.open(), filename, message, statement.mimetype)
+                    results['telegram'] = {'ok': ok}
+                else:
+                    results['telegram'] = {'ok': False, 'error': 'Telegram not configured'}
+
+            elif ch == 'whatsapp':
+                if notif.whatsapp_enabled and notif.whatsapp_number:
+                    ok = send_whatsapp_file(notif.whatsapp_number, statement.content(), filename, message, statement.mimetype)
+                    results['whatsapp'] = {'ok': ok}
+                else:
+                    results['whatsapp'] = {'ok': False, 'error': 'WhatsApp not configured'}
+
+            elif ch == 'email':
+                if notif.email_enabled and notif.email_address:
+                    # MIME-вложение собирается в памяти в любом случае, поэтому здесь bytes
+                    ok = send_email_with_attachment(notif.email_address, subject, message, statement.content()[:], filename, statement.mimetype)
+                    results['email'] = {'ok': ok}
+                else:
+                    results['email'] = {'ok': False, 'error': 'Email not configured'}
+    finally:
+        if owns_file:
+            statement.close()
+
+    return results
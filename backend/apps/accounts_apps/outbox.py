@@ -0,0 +1,120 @@
+import logging
+import random
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core import metrics
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+Handler = namedtuple('Handler', ['func', 'concurrency', 'max_attempts'])
+
+HANDLERS = {}
+
+LEASE_SECONDS = 300
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 3600
+PURGE_BATCH_SIZE = 5000
+
+
+class RetryLater(Exception):
+    """Временная ошибка доставки: событие будет повторено с backoff."""
+
+
+def handler(event_type, concurrency=4, max_attempts=8):
+    """Регистрирует обработчик события outbox; concurrency — сколько событий типа выполняется одновременно."""
+    def decorator(func):
+        HANDLERS[event_type] = Handler(func, concurrency, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(event_type, payload=None, delay=0):
+    """Пишет событие в outbox в текущей транзакции БД — после отката события нет."""
+    event = OutboxEvent.objects.create(
+        event_type=event_type,
+        payload=payload or {},
+        available_at=timezone.now() + timedelta(seconds=delay),
+    )
+    metrics.inc('outbox_enqueued_total', event_type=event_type)
+    return event
+
+
+def backoff_seconds(attempts):
+    delay = min(BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)), BACKOFF_MAX_SECONDS)
+    return random.uniform(delay / 2, delay)
+
+
+def claim(event_type, limit):
+    """Забирает до limit готовых событий типа; зависшие после падения воркера (истёк lease) берутся повторно."""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(event_type=event_type)
+            .filter(Q(status='pending', available_at__lte=now) | Q(status='processing', locked_until__lt=now))
+            .order_by('available_at')[:limit]
+        )
+        if events:
+            OutboxEvent.objects.filter(id__in=[e.id for e in events]).update(
+                status='processing', locked_until=now + timedelta(seconds=LEASE_SECONDS)
+            )
+    return events
+
+
+def process(event):
+    entry = HANDLERS.get(event.event_type)
+    attempts = event.attempts + 1
+    try:
+        if entry is None:
+            raise LookupError(f"Нет обработчика для {event.event_type}")
+        entry.func(event.payload)
+    except Exception as e:
+        max_attempts = entry.max_attempts if entry else 1
+        if attempts >= max_attempts:
+            OutboxEvent.objects.filter(id=event.id).update(
+                status='dead', attempts=attempts, last_error=str(e)[:2000], locked_until=None, processed_at=timezone.now()
+            )
+            metrics.inc('outbox_events_total', event_type=event.event_type, result='dead')
+            logger.error(f"[outbox] {event.event_type} {event.id} dead after {attempts} attempts: {e}")
+        else:
+            OutboxEvent.objects.filter(id=event.id).update(
+                status='pending', attempts=attempts, last_error=str(e)[:2000], locked_until=None,
+                available_at=timezone.now() + timedelta(seconds=backoff_seconds(attempts)),
+            )
+            metrics.inc('outbox_events_total', event_type=event.event_type, result='retry')
+            logger.warning(f"[outbox] {event.event_type} {event.id} attempt {attempts} failed: {e}")
+        return False
+    OutboxEvent.objects.filter(id=event.id).update(
+        status='done', attempts=attempts, locked_until=None, processed_at=timezone.now()
+    )
+    metrics.inc('outbox_events_total', event_type=event.event_type, result='done')
+    return True
+
+
+def purge_done(retention_days=None, batch_size=PURGE_BATCH_SIZE):
+    """Удаляет выполненные события старше retention_days пачками, чтобы не держать долгую блокировку. dead остаются для разбора."""
+    if retention_days is None:
+        retention_days = settings.OUTBOX_DONE_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    total = 0
+    while True:
+        ids = list(
+            OutboxEvent.objects.filter(status='done', processed_at__lt=cutoff)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        deleted, _ = OutboxEvent.objects.filter(id__in=ids).delete()
+        total += deleted
+    if total:
+        metrics.inc('outbox_purged_total', value=total)
+    return total
@@ -0,0 +1,248 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.apps import apps
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_TRANSACTION_WEBHOOK = "https://uefgvthkwhpvpayteyif.supabase.co/functions/v1/transaction-webhook"
+
+
+class _Delivery:
+    """Ожидание отправки событий одного publish: done — все отправлены или хотя бы одно не ушло."""
+    __slots__ = ('remaining', 'ok', 'done')
+
+    def __init__(self, count):
+        self.remaining = count
+        self.ok = True
+        self.done = threading.Event()
+
+    def resolve(self, ok):
+        self.ok = self.ok and ok
+        self.remaining -= 1
+        if self.remaining <= 0 or not ok:
+            self.done.set()
+
+
+class RealtimeBroadcaster:
+    """
+    Realtime-события для фронтенда через edge-функцию transaction-webhook.
+    Параллельные publish копятся в очереди процесса и уходят одной пачкой по keep-alive сессии
+    (group commit): пачка отправляется, когда набралось batch_size, новые события перестали
+    приходить или прошёл flush_interval. publish ждёт отправки своей пачки — outbox отмечает
+    событие выполненным только после реальной доставки. Повторное событие по той же паре
+    (user, transaction) заменяет ещё не отправленное. False (очередь полна, ошибка, таймаут) —
+    вызывающий (outbox) повторит позже.
+    """
+
+    def __init__(self, url=SUPABASE_TRANSACTION_WEBHOOK):
+        self.url = url
+        self.max_queue = getattr(settings, 'REALTIME_QUEUE_MAX', 5000)
+        self.batch_size = getattr(settings, 'REALTIME_BATCH_SIZE', 100)
+        self.flush_interval = getattr(settings, 'REALTIME_FLUSH_INTERVAL', 0.25)
+        self.linger = self.flush_interval / 5
+        self.send_timeout = getattr(settings, 'REALTIME_SEND_TIMEOUT', 15)
+        self.pending = OrderedDict()  # (user_id, transaction_id) -> [event, [_Delivery]]
+        self.cond = threading.Condition()
+        self.session = None
+        self.thread = None
+        self.stopping = False
+
+    def get_session(self):
+        if self.session is None:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0))
+            session.headers['Content-Type'] = 'application/json'
+            secret = getattr(settings, 'REALTIME_WEBHOOK_SECRET', '')
+            if secret:
+                session.headers['x-webhook-secret'] = secret
+            self.session = session
+        return self.session
+
+    def _ensure_thread(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stopping = False
+            self.thread = threading.Thread(target=self._run, name='realtime-broadcaster', daemon=True)
+            self.thread.start()
+
+    def publish(self, events):
+        """Поставить события в очередь (целиком или ни одного) и дождаться их отправки."""
+        keys = {(e['user_id'], e['transaction_id']) for e in events}
+        if not keys:
+            return True
+        delivery = _Delivery(len(keys))
+        with self.cond:
+            self._ensure_thread()
+            if len(self.pending) + len(keys - self.pending.keys()) > self.max_queue:
+                metrics.inc('realtime_events_total', len(events), result='rejected')
+                return False
+            for event in events:
+                key = (event['user_id'], event['transaction_id'])
+                if key in self.pending:
+                    entry = self.pending[key]
+                    entry[0] = event
+                    if delivery not in entry[1]:
+                        entry[1].append(delivery)
+                    metrics.inc('realtime_events_total', result='merged')
+                else:
+                    self.pending[key] = [event, [delivery]]
+                    metrics.inc('realtime_events_total', result='queued')
+            metrics.set_gauge('realtime_queue_depth', len(self.pending))
+            self.cond.notify_all()
+        if not delivery.done.wait(self.send_timeout):
+            # событие останется в очереди и может уйти позже — повтор outbox даст дубль, а не потерю
+            metrics.inc('realtime_events_total', len(events), result='timeout')
+            return False
+        return delivery.ok
+
+    def _take_batch(self):
+        batch = []
+        while self.pending and len(batch) < self.batch_size:
+            key, (event, deliveries) = self.pending.popitem(last=False)
+            batch.append((event, deliveries))
+        metrics.set_gauge('realtime_queue_depth', len(self.pending))
+        return batch
+
+    def _send(self, batch):
+        started = time.monotonic()
+        try:
+            self.get_session().post(
+                self.url, json={"events": [event for event, _ in batch]}, timeout=(3, 10)
+            ).raise_for_status()
+            ok = True
+        except requests.RequestException as e:
+            ok = False
+            logger.warning(f"[realtime] Broadcast batch of {len(batch)} failed: {e}")
+        finally:
+            metrics.observe('realtime_flush_seconds', time.monotonic() - started)
+        metrics.inc('realtime_batches_total', result='sent' if ok else 'failed')
+        metrics.inc('realtime_events_total', len(batch), result='sent' if ok else 'failed')
+        if ok:
+            metrics.observe('realtime_batch_size', len(batch))
+        for _, deliveries in batch:
+            for delivery in deliveries:
+                delivery.resolve(ok)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.stopping:
+                    self.cond.wait()
+                # даём набраться пачке, пока приходят новые события, но не дольше flush_interval
+                deadline = time.monotonic() + self.flush_interval
+                while len(self.pending) < self.batch_size and not self.stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    size = len(self.pending)
+                    self.cond.wait(min(remaining, self.linger))
+                    if len(self.pending) == size:
+                        break
+                if self.stopping and not self.pending:
+                    return
+                batch = self._take_batch()
+            if batch:
+                try:
+                    self._send(batch)
+                except Exception as e:
+                    # ждущие publish не должны висеть до таймаута из-за неожиданной ошибки
+                    logger.error(f"[realtime] Broadcast batch crashed: {e}")
+                    for _, deliveries in batch:
+                        for delivery in deliveries:
+                            delivery.resolve(False)
+
+    def flush(self, timeout=10):
+        """Отправить накопленное и остановить поток (при остановке воркера)."""
+        with self.cond:
+            self.stopping = True
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+
+broadcaster = RealtimeBroadcaster()
+
+
+def transaction_events(transaction):
+    """События по транзакции: одно на каждого причастного пользователя."""
+    direction = getattr(transaction, 'direction', None)
+    if not direction:
+        direction = 'inbound' if str(transaction.sender_id) != str(transaction.user_id) else 'outgoing'
+
+    user_ids = set()
+    if transaction.sender_id and transaction.sender_id != 'EXTERNAL':
+        user_ids.add(str(transaction.sender_id))
+    if transaction.receiver_id and transaction.receiver_id != 'EXTERNAL':
+        user_ids.add(str(transaction.receiver_id))
+    if transaction.user_id:
+        user_ids.add(str(transaction.user_id))
+
+    return [{
+        "event": "transaction_incoming" if direction == "inbound" else "transaction_outgoing",
+        "user_id": uid,
+        "transaction_id": str(transaction.id),
+        "type": transaction.type,
+        "amount": float(transaction.amount),
+        "currency": transaction.currency or "AED",
+    } for uid in sorted(user_ids)]
+
+
+def ledger_group(user_id):
+    return f"ledger.user.{user_id}"
+
+
+def ledger_events(transaction):
+    """Дельты для WebSocket: сама транзакция и текущие балансы пользователя по каждому причастному."""
+    Cards = apps.get_model('cards_apps', 'Cards')
+    BankDepositAccounts = apps.get_model('transactions_apps', 'BankDepositAccounts')
+    CryptoWallets = apps.get_model('transactions_apps', 'CryptoWallets')
+
+    events = {}
+    for event in transaction_events(transaction):
+        uid = event['user_id']
+        event['status'] = transaction.status
+        event['created_at'] = transaction.created_at.isoformat() if transaction.created_at else None
+        event['balances'] = {
+            "cards": [
+                {"id": str(pk), "balance": str(balance)}
+                for pk, balance in Cards.objects.filter(user_id=uid).values_list('id', 'balance')
+            ],
+            "accounts": [
+                {"id": str(pk), "balance": str(balance)}
+                for pk, balance in BankDepositAccounts.objects.filter(user_id=uid).values_list('id', 'balance')
+            ],
+            "wallets": [
+                {"id": str(pk), "balance": str(balance)}
+                for pk, balance in CryptoWallets.objects.filter(user_id=uid).values_list('id', 'balance')
+            ],
+        }
+        events[uid] = event
+    return events
+
+
+def push_ledger_events(transaction):
+    """Отправить дельты в группы пользователей channel layer (из воркера outbox). False — повторить позже."""
+    layer = get_channel_layer()
+    if layer is None:
+        return True
+    started = time.monotonic()
+    try:
+        for uid, event in ledger_events(transaction).items():
+            async_to_sync(layer.group_send)(ledger_group(uid), {"type": "ledger.event", "payload": event})
+            metrics.inc('ledger_push_total', result='sent')
+        return True
+    except Exception as e:
+        metrics.inc('ledger_push_total', result='failed')
+        logger.warning(f"[realtime] Ledger push failed for tx {transaction.id}: {e}")
+        return False
+    finally:
+        metrics.observe('ledger_push_seconds', time.monotonic() - started)
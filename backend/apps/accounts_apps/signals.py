@@ -1,55 +1,56 @@
-from django.db.models.signals import post_save
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import AdminActionHistory, Profiles
+from rest_framework.authtoken.models import Token
+from . import admin_routing, auth_cache, identity, outbox, whatsapp
+from .models import AdminActionHistory, AdminNotificationSettings, AdminSettings, Profiles, UserRoles, WahaSession
 from apps.transactions_apps.models import Transactions
-from .notifications import dispatch_notifications, notify_transaction_parties
-import threading
-import requests
+from apps.transactions_apps.services import SettingsManager
+from . import notifications  # noqa: F401  регистрирует обработчики outbox
 import logging
 
 logger = logging.getLogger(__name__)
 
-SUPABASE_TRANSACTION_WEBHOOK = "https://uefgvthkwhpvpayteyif.supabase.co/functions/v1/transaction-webhook"
-
-
-def broadcast_transaction_to_frontend(transaction):
-    """Send realtime broadcast to frontend UI via Supabase edge function."""
-    try:
-        direction = getattr(transaction, 'direction', None)
-        if not direction:
-            direction = 'inbound' if str(transaction.sender_id) != str(transaction.user_id) else 'outgoing'
-
-        # Broadcast for all involved users
-        user_ids = set()
-        if transaction.sender_id and transaction.sender_id != 'EXTERNAL':
-            user_ids.add(str(transaction.sender_id))
-        if transaction.receiver_id and transaction.receiver_id != 'EXTERNAL':
-            user_ids.add(str(transaction.receiver_id))
-        if transaction.user_id:
-            user_ids.add(str(transaction.user_id))
-
-        for uid in user_ids:
-            requests.post(
-                SUPABASE_TRANSACTION_WEBHOOK,
-                json={
-                    "event": "transaction_incoming" if direction == "inbound" else "transaction_outgoing",
-                    "user_id": uid,
-                    "transaction_id": str(transaction.id),
-                    "amount": float(transaction.amount),
-                    "currency": transaction.currency or "AED",
-                },
-                headers={"Content-Type": "application/json"},
-                timeout=5,
-            )
-        logger.info(f"[signals] Frontend broadcast sent for tx {transaction.id}")
-    except Exception as e:
-        logger.warning(f"[signals] Frontend broadcast failed for tx {transaction.id}: {e}")
+
+@receiver([post_save, post_delete], sender=AdminSettings)
+def admin_settings_changed(sender, instance, **kwargs):
+    SettingsManager.invalidate()
+
+
+@receiver([post_save, post_delete], sender=WahaSession)
+def waha_session_changed(sender, instance, **kwargs):
+    whatsapp.invalidate()
+
+
+@receiver([post_save, post_delete], sender=UserRoles)
+@receiver([post_save, post_delete], sender=AdminNotificationSettings)
+def admin_routing_changed(sender, instance, **kwargs):
+    admin_routing.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Profiles)
+def profile_settings_changed(sender, instance, **kwargs):
+    SettingsManager.invalidate_user(instance.user_id)
+    identity.invalidate(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_identity_changed(sender, instance, **kwargs):
+    identity.invalidate(instance.pk)
+    auth_cache.forget_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def auth_token_deleted(sender, instance, **kwargs):
+    auth_cache.forget(instance.key)
 
 
 @receiver(post_save, sender=AdminActionHistory)
 def admin_action_notification(sender, instance, created, **kwargs):
-    if created:
-        threading.Thread(target=dispatch_notifications, args=(instance,), daemon=True).start()
+    # действие без подписчиков не создаёт событий вовсе
+    if created and admin_routing.routes_for(instance.action):
+        outbox.enqueue('admin_action.created', {"admin_action_id": str(instance.id)})
 
 
 @receiver(post_save, sender=Transactions)
@@ -64,7 +65,23 @@ def transaction_status_notification(sender, instance, created, **kwargs):
     )
 
     if should_notify:
-        # Broadcast to frontend FIRST (fastest path for UI update)
-        threading.Thread(target=broadcast_transaction_to_frontend, args=(instance,), daemon=True).start()
-        # Then send Telegram/WhatsApp/Email notifications
-        threading.Thread(target=notify_transaction_parties, args=(instance.id,), daemon=True).start()
\ No newline at end of file
+        # события пишутся в той же транзакции БД, воркер outbox выполнит их после коммита
+        outbox.enqueue('transaction.broadcast', {"transaction_id": str(instance.id)})
+        outbox.enqueue('transaction.completed', {"transaction_id": str(instance.id)})
+
+
+@receiver(post_save, sender=Transactions)
+def push_ledger_delta(sender, instance, created, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if not (created or not update_fields or 'status' in update_fields):
+        return
+    if getattr(instance, '_ledger_push_scheduled', False):
+        return
+    instance._ledger_push_scheduled = True
+
+    def reset():
+        instance._ledger_push_scheduled = False
+
+    # балансы читает и рассылает воркер outbox после коммита, а не поток запроса
+    outbox.enqueue('ledger.push', {"transaction_id": str(instance.id)})
+    transaction.on_commit(reset)
@@ -0,0 +1,72 @@
+import logging
+
+from django.db.models import Q
+
+from .models import AdminNotificationSettings, TelegramChats, UserNotificationSettings
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_MODELS = (AdminNotificationSettings, UserNotificationSettings)
+
+
+def normalize(username):
+    return (username or '').replace('@', '').strip().lower()
+
+
+def _pending(model):
+    return model.objects.filter(
+        Q(telegram_chat_id__isnull=True) | Q(telegram_chat_id=''),
+        telegram_username__isnull=False,
+    ).exclude(telegram_username='')
+
+
+def remember(username, chat_id):
+    """Сохранить chat_id из webhook-а бота и проставить его настройкам уведомлений с этим username."""
+    username = normalize(username)
+    chat_id = str(chat_id).strip()
+    if not username or not chat_id:
+        return 0
+    TelegramChats.objects.update_or_create(username=username, defaults={'chat_id': chat_id})
+
+    updated = 0
+    for model in SETTINGS_MODELS:
+        updated += model.objects.filter(
+            Q(telegram_username__iexact=username) | Q(telegram_username__iexact=f"@{username}")
+        ).update(telegram_chat_id=chat_id)
+    return updated
+
+
+def chat_id_for(settings_obj):
+    """chat_id из настроек или из индекса (с сохранением в настройки). Без запросов к Telegram API."""
+    if settings_obj.telegram_chat_id:
+        return settings_obj.telegram_chat_id
+    username = normalize(settings_obj.telegram_username)
+    if not username:
+        return None
+    chat_id = TelegramChats.objects.filter(username=username).values_list('chat_id', flat=True).first()
+    if chat_id:
+        settings_obj.telegram_chat_id = chat_id
+        settings_obj.save(update_fields=['telegram_chat_id'])
+    return chat_id
+
+
+def backfill(batch_size=500):
+    """Один проход по настройкам без chat_id: поиск в индексе пачками и bulk_update."""
+    filled = 0
+    for model in SETTINGS_MODELS:
+        rows = list(_pending(model).only('id', 'telegram_username'))
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            known = dict(TelegramChats.objects.filter(
+                username__in={normalize(row.telegram_username) for row in batch}
+            ).values_list('username', 'chat_id'))
+            changed = []
+            for row in batch:
+                chat_id = known.get(normalize(row.telegram_username))
+                if chat_id:
+                    row.telegram_chat_id = chat_id
+                    changed.append(row)
+            model.objects.bulk_update(changed, ['telegram_chat_id'])
+            filled += len(changed)
+    logger.info(f"[telegram] Backfilled chat_id for {filled} settings row(s)")
+    return filled
@@ -0,0 +1,170 @@
+import base64
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from core import metrics
+from .models import WahaSession
+
+logger = logging.getLogger(__name__)
+
+WahaConfig = namedtuple('WahaConfig', 'api_url session_name api_key')
+
+_config = None
+_config_loaded_at = 0.0
+_config_lock = threading.Lock()
+
+
+def get_config():
+    """Активная WAHA-сессия из кэша процесса; сбрасывается сигналом при сохранении WahaSession."""
+    global _config, _config_loaded_at
+    ttl = getattr(settings, 'WAHA_CONFIG_TTL', 60)
+    if _config is not None and time.monotonic() - _config_loaded_at < ttl:
+        return _config
+    with _config_lock:
+        if _config is None or time.monotonic() - _config_loaded_at >= ttl:
+            session = WahaSession.objects.filter(is_active=True).first()
+            _config = WahaConfig(
+                api_url=(session.api_url if session else getattr(settings, 'WAHA_API_URL', 'http://waha:3000')).rstrip('/'),
+                session_name=session.session_name if session else getattr(settings, 'WAHA_SESSION_NAME', 'default'),
+                api_key=(session.api_key if session else None) or getattr(settings, 'WAHA_API_KEY', '5f0ed637143a4fddac67e3108cfd80ed'),
+            )
+            _config_loaded_at = time.monotonic()
+        return _config
+
+
+def invalidate():
+    global _config
+    with _config_lock:
+        _config = None
+
+
+class Base64JsonBody:
+    """
+    JSON-тело sendFile, где поле file.data кодируется в base64 по частям при чтении,
+    без копии файла в памяти. Длина известна заранее, поэтому уходит с Content-Length.
+    """
+    CHUNK = 3 * 64 * 1024
+
+    def __init__(self, payload, data_prefix, content):
+        head, tail = json.dumps(payload).split('"__DATA__"')
+        self.head = (head + '"' + data_prefix).encode()
+        self.tail = ('"' + tail).encode()
+        self.content = content
+        self.length = len(self.head) + 4 * ((len(content) + 2) // 3) + len(self.tail)
+        self.parts = self._parts()
+        self.buffer = b''
+
+    def __len__(self):
+        return self.length
+
+    def _parts(self):
+        yield self.head
+        view = memoryview(self.content)
+        for start in range(0, len(view), self.CHUNK):
+            yield base64.b64encode(view[start:start + self.CHUNK])
+        yield self.tail
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            part = next(self.parts, None)
+            if part is None:
+                break
+            self.buffer += part
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+class WhatsAppSender:
+    """
+    Отправка в WAHA: общий keep-alive пул, ограниченная очередь ожидающих отправителей,
+    общий темп (WAHA_RATE_PER_SECOND) и интервал между сообщениями одному получателю
+    (WAHA_RECIPIENT_INTERVAL). При заполненной очереди send возвращает False — outbox повторит.
+    """
+
+    def __init__(self, config=None):
+        self.config = config  # явный WahaConfig (стенд/бенчмарк), иначе активная сессия из БД
+        self.rate = getattr(settings, 'WAHA_RATE_PER_SECOND', 2.0)
+        self.recipient_interval = getattr(settings, 'WAHA_RECIPIENT_INTERVAL', 1.0)
+        self.timeout = (getattr(settings, 'WAHA_CONNECT_TIMEOUT', 3), getattr(settings, 'WAHA_TIMEOUT', 30))
+        self.slots = threading.BoundedSemaphore(getattr(settings, 'WAHA_QUEUE_MAX', 100))
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+        self.next_for_recipient = {}
+        self.session = None
+
+    def get_session(self):
+        if self.session is None:
+            with self.lock:
+                if self.session is None:
+                    pool_size = getattr(settings, 'WAHA_POOL_SIZE', 4)
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self.session = session
+        return self.session
+
+    def get_config(self):
+        return self.config or get_config()
+
+    def _reserve(self, chat_id):
+        """Время ожидания до своего слота: и общий темп, и интервал для получателя."""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_slot, self.next_for_recipient.get(chat_id, 0.0))
+            self.next_slot = start + 1.0 / self.rate
+            self.next_for_recipient[chat_id] = start + self.recipient_interval
+            if len(self.next_for_recipient) > 10000:
+                self.next_for_recipient = {k: v for k, v in self.next_for_recipient.items() if v > now}
+            return start - now
+
+    def post(self, endpoint, chat_id, body, headers=None):
+        if not self.slots.acquire(blocking=False):
+            metrics.inc('whatsapp_messages_total', endpoint=endpoint, result='rejected')
+            logger.warning(f"WhatsApp queue is full, {endpoint} to {chat_id} postponed")
+            return False
+        try:
+            wait = self._reserve(chat_id)
+            if wait > 0:
+                metrics.observe('whatsapp_queue_wait_seconds', wait, endpoint=endpoint)
+                time.sleep(wait)
+            config = self.get_config()
+            started = time.monotonic()
+            resp = self.get_session().post(
+                f"{config.api_url}/api/{endpoint}",
+                headers={"Content-Type": "application/json", "X-Api-Key": config.api_key, **(headers or {})},
+                timeout=self.timeout,
+                **body,
+            )
+            metrics.observe('whatsapp_request_seconds', time.monotonic() - started, endpoint=endpoint)
+            metrics.inc('whatsapp_messages_total', endpoint=endpoint, result=resp.status_code)
+            return resp
+        finally:
+            self.slots.release()
+
+    def send_text(self, phone, text):
+        chat_id = f"{''.join(filter(str.isdigit, str(phone)))}@c.us"
+        payload = {"chatId": chat_id, "text": text, "session": self.get_config().session_name}
+        return self.post('sendText', chat_id, {"json": payload})
+
+    def send_file(self, phone, content, filename, caption, mimetype='text/html'):
+        chat_id = f"{''.join(filter(str.isdigit, str(phone)))}@c.us"
+        payload = {
+            "chatId": chat_id,
+            "file": {"mimetype": mimetype, "filename": filename, "data": "__DATA__"},
+            "caption": caption,
+            "session": self.get_config().session_name,
+        }
+        return self.post('sendFile', chat_id, {"data": Base64JsonBody(payload, f"data:{mimetype};base64,", content)})
+
+
+sender = WhatsAppSender()
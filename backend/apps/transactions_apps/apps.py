@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TransactionsAppsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.transactions_apps'
+
+    def ready(self):
+        import apps.transactions_apps.signals
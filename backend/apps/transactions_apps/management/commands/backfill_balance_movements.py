@@ -0,0 +1,60 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.transactions_apps.models import BalanceMovements, CryptoWallets, FundsHolds, Transactions
+from apps.transactions_apps.services import TransactionService
+
+
+class Command(BaseCommand):
+    help = (
+        "Дописать движения баланса, которые раньше не записывались: списания по захваченным резервам, "
+        "возвраты отклонённых крипто-выводов и зачисления RUB-пополнений. Повторный запуск ничего не дублирует."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        counts = {'captured': 0, 'refunds': 0, 'rub': 0, 'skipped': 0}
+
+        holds = FundsHolds.objects.filter(status='captured', transaction__isnull=False).select_related('transaction')
+        for hold in holds.iterator():
+            if self._record(hold.transaction, hold.user_id, FundsHolds.ACCOUNT_TYPES[hold.source_type], hold.amount, 'debit'):
+                counts['captured'] += 1
+
+        refunds = Transactions.objects.filter(type='crypto_withdrawal', metadata__refunded=True)
+        for txn in refunds.iterator():
+            wallet = CryptoWallets.objects.filter(id=(txn.metadata or {}).get('from_wallet_id')).first()
+            user_id = wallet.user_id if wallet else txn.sender_id
+            if self._record(txn, user_id, 'crypto', txn.amount, 'credit', created_at=txn.updated_at):
+                counts['refunds'] += 1
+
+        deposits = Transactions.objects.filter(sender_id='EXTERNAL_RUB', status='success')
+        for txn in deposits.iterator():
+            meta = txn.metadata or {}
+            try:
+                amount = Decimal(str(meta.get('credited_crypto_amount') or meta.get('expected_crypto_amount')))
+            except InvalidOperation:
+                counts['skipped'] += 1
+                self.stderr.write(f"{txn.id}: сумма зачисления USDT неизвестна, пропуск")
+                continue
+            if self._record(txn, txn.receiver_id, 'crypto', amount, 'credit', created_at=txn.updated_at):
+                counts['rub'] += 1
+
+        prefix = "Будет дописано" if self.dry_run else "Дописано"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}: списаний по резервам {counts['captured']}, возвратов {counts['refunds']}, "
+            f"RUB-пополнений {counts['rub']}; пропущено {counts['skipped']}"
+        ))
+
+    def _record(self, txn, user_id, account_type, amount, movement_type, created_at=None):
+        exists = BalanceMovements.objects.filter(transaction=txn, user_id=str(user_id), type=movement_type).exists()
+        if exists:
+            return False
+        if not self.dry_run:
+            with transaction.atomic():
+                TransactionService._record_movement(txn, str(user_id), account_type, amount, movement_type, created_at=created_at)
+        return True
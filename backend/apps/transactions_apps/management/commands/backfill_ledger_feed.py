@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from apps.transactions_apps.models import BalanceMovements, LedgerFeed
+
+
+class Command(BaseCommand):
+    help = "Заполнить ledger_feed по существующим balance_movements"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        movements = BalanceMovements.objects.select_related('transaction').only(
+            'user_id', 'account_type', 'amount', 'type', 'transaction__created_at'
+        ).order_by('created_at')
+
+        batch = []
+        total = 0
+        for movement in movements.iterator(chunk_size=batch_size):
+            batch.append(LedgerFeed(
+                user_id=str(movement.user_id),
+                transaction_id=movement.transaction_id,
+                account_type=LedgerFeed.feed_account_type(movement.account_type),
+                direction=movement.type,
+                amount=movement.amount,
+                created_at=movement.transaction.created_at,
+            ))
+            if len(batch) >= batch_size:
+                LedgerFeed.objects.bulk_create(batch, ignore_conflicts=True)
+                total += len(batch)
+                batch = []
+        if batch:
+            LedgerFeed.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Обработано движений: {total}"))
@@ -0,0 +1,51 @@
+import resource
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from apps.transactions_apps import statements
+
+
+class Command(BaseCommand):
+    help = "Замер генерации выписки: синтетические строки (по умолчанию) или реальный пользователь из БД"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help="Число синтетических строк")
+        parser.add_argument('--format', choices=sorted(statements.RENDERERS), default='html')
+        parser.add_argument('--user-id', help="Сформировать по ленте пользователя вместо синтетики")
+        parser.add_argument('--start', help="YYYY-MM-DD (с --user-id)")
+        parser.add_argument('--end', help="YYYY-MM-DD (с --user-id)")
+
+    def handle(self, *args, **options):
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.monotonic()
+        if options['user_id']:
+            statement = statements.generate(
+                options['user_id'], options['start'], options['end'], fmt=options['format'],
+            )
+        else:
+            meta = {'user_name': 'Bench', 'period_label': 'bench', 'generated_at': datetime.now().isoformat()}
+            balances = {'card': (Decimal('1000.00'), Decimal('0')), 'crypto': (Decimal('50.000000'), Decimal('0'))}
+            statement = statements.render(meta, balances, self._synthetic(options['rows']), options['format'])
+        elapsed = time.monotonic() - started
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        with statement:
+            self.stdout.write(self.style.SUCCESS(
+                f"format={options['format']} rows={statement.rows} size={statement.size / 1024 / 1024:.1f}MB "
+                f"elapsed={elapsed:.2f}s rate={statement.rows / elapsed if elapsed else 0:.0f} rows/s "
+                f"maxrss_growth={(rss_after - rss_before) / 1024:.1f}MB"
+            ))
+
+    @staticmethod
+    def _synthetic(count):
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for i in range(count):
+            account_type = 'crypto' if i % 5 == 0 else 'card'
+            yield statements.StatementRow(
+                start + timedelta(minutes=i), account_type, 'credit' if i % 2 else 'debit',
+                Decimal('12.34'), f"00000000-0000-0000-0000-{i:012d}", 'card_transfer', 'completed',
+                f"Counterparty {i % 100}", f"Payment #{i}",
+            )
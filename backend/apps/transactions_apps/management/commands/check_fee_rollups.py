@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.transactions_apps.services import RevenueRollup
+
+
+class Command(BaseCommand):
+    help = "Сверить дневные итоги комиссий с сырыми fee_revenue; --fix пересобирает расходящиеся дни"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="С даты YYYY-MM-DD")
+        parser.add_argument('--end', help="По дату YYYY-MM-DD включительно")
+        parser.add_argument('--fix', action='store_true')
+
+    def handle(self, *args, **options):
+        raw = RevenueRollup.raw_totals(options['start'], options['end'])
+        rollup = RevenueRollup.rollup_totals(options['start'], options['end'])
+
+        mismatched = sorted(key for key in raw.keys() | rollup.keys() if raw.get(key) != rollup.get(key))
+        for day, fee_type, currency in mismatched:
+            self.stdout.write(
+                f"{day} {fee_type} {currency}: raw={raw.get((day, fee_type, currency))} "
+                f"rollup={rollup.get((day, fee_type, currency))}"
+            )
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS(f"Итоги согласованы: {len(raw)} групп"))
+            return
+
+        if options['fix']:
+            days = sorted({day for day, _, _ in mismatched})
+            for day in days:
+                RevenueRollup.rebuild(day, day)
+            self.stdout.write(self.style.SUCCESS(f"Пересобрано дней: {len(days)}"))
+            return
+        raise CommandError(f"Расхождений: {len(mismatched)}")
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from api.transactions_api.filters import account_feed
+from api.transactions_api.pagination import TransactionCursorPagination
+from api.transactions_api.serializers import AdminTransactionSerializerDirect
+from apps.transactions_apps.models import BalanceMovements, Transactions
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN для горячих запросов по транзакциям. Падает, если план содержит Seq Scan "
+        "по transactions/balance_movements/ledger_feed. Имеет смысл на базе с объёмом данных как в проде."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', default='1')
+        parser.add_argument('--reference-id', default='00000000')
+
+    def handle(self, *args, **options):
+        uid = str(options['user_id'])
+        queries = {
+            'history_by_party': Transactions.objects.filter(
+                Q(sender_id=uid) | Q(receiver_id=uid)
+            ).order_by('-created_at')[:50],
+            'sent_last_day': Transactions.objects.filter(
+                sender_id=uid, created_at__gte=timezone.now() - timedelta(days=1)
+            ),
+            'by_reference': Transactions.objects.filter(reference_id=options['reference_id']),
+            'in_flight': Transactions.objects.filter(
+                status__in=['pending', 'processing'], created_at__lt=timezone.now() - timedelta(minutes=10)
+            ),
+            'movements_by_account': BalanceMovements.objects.filter(user_id=uid, account_type='bank'),
+            # тот же запрос, что строит IBANTransactionsListView для первой страницы
+            'feed_by_account': AdminTransactionSerializerDirect.setup_eager_loading(
+                account_feed(uid, 'bank'), through='transaction'
+            ).order_by(*TransactionCursorPagination.ordering)[:TransactionCursorPagination().default_page_size + 1],
+        }
+
+        failed = []
+        for name, qs in queries.items():
+            plan = qs.explain()
+            self.stdout.write(f"--- {name}\n{plan}\n")
+            if any(f"Seq Scan on {table}" in plan for table in ('transactions', 'balance_movements', 'ledger_feed')):
+                failed.append(name)
+
+        if failed:
+            raise CommandError(f"Seq Scan в запросах: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS("Все запросы используют индексы"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.transactions_apps.services import RevenueRollup
+
+
+class Command(BaseCommand):
+    help = "Пересобрать дневные итоги комиссий (fee_revenue_daily) по истории fee_revenue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="С даты YYYY-MM-DD (по умолчанию — вся история)")
+        parser.add_argument('--end', help="По дату YYYY-MM-DD включительно")
+
+    def handle(self, *args, **options):
+        rows = RevenueRollup.rebuild(options['start'], options['end'])
+        self.stdout.write(self.style.SUCCESS(f"Пересобрано строк итогов: {rows}"))
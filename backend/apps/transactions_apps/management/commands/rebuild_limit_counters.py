@@ -0,0 +1,55 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.transactions_apps.models import LimitUsageCounters, Transactions
+from apps.transactions_apps.services import LimitCounters
+
+
+class Command(BaseCommand):
+    help = "Пересчитать счётчики лимитов (limit_usage_counters) по истории транзакций"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', help="Пересчитать только для одного пользователя")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        user_id = options.get('user_id')
+        batch_size = options['batch_size']
+
+        all_types = [t for _, types in LimitCounters.OPERATIONS.values() for t in types]
+        txns = Transactions.objects.filter(type__in=all_types).exclude(
+            status__in=LimitCounters.RELEASED_STATUSES
+        ).only('type', 'status', 'amount', 'sender_id', 'receiver_id', 'created_at')
+        counters = LimitUsageCounters.objects.all()
+        if user_id:
+            txns = txns.filter(sender_id=str(user_id)) | txns.filter(receiver_id=str(user_id))
+            counters = counters.filter(user_id=str(user_id))
+
+        # Счётчики блокируются от записи до конца пересборки (чтение не блокируется):
+        # транзакции, уже обновившие счётчики, коммитятся раньше и попадают в пересчёт,
+        # остальные ждут и применяют свою дельту поверх — ни потерь, ни двойного счёта.
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {LimitUsageCounters._meta.db_table} IN EXCLUSIVE MODE')
+
+            totals = defaultdict(Decimal)
+            for txn in txns.iterator(chunk_size=batch_size):
+                for uid, operation_type, day, amount in LimitCounters.entries(txn):
+                    if user_id and uid != str(user_id):
+                        continue
+                    for period, period_start in LimitCounters.periods(day):
+                        totals[(uid, operation_type, period, period_start)] += amount
+
+            counters.delete()
+            LimitUsageCounters.objects.bulk_create(
+                [
+                    LimitUsageCounters(user_id=uid, operation_type=op, period=period, period_start=start, amount=amount)
+                    for (uid, op, period, start), amount in totals.items()
+                ],
+                batch_size=1000,
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано счётчиков: {len(totals)}"))
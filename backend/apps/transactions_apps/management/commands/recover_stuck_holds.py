@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.transactions_apps.models import FundsHolds
+from apps.transactions_apps.services import FundsHoldService, TransactionService
+from core import metrics
+
+NOT_FOUND_REASON = "Заявка не найдена у провайдера — нужна ручная проверка"
+
+
+class Command(BaseCommand):
+    help = (
+        "Разобрать зависшие резервы выводов (reserved / in_doubt) по данным провайдера. "
+        "Деньги возвращаются только при явном статусе отказа; ненайденные заявки остаются in_doubt."
+    )
+
+    COMPLETE = {
+        'fiat_withdrawal': TransactionService.complete_fiat_withdrawal,
+        'crypto_withdrawal': TransactionService.complete_crypto_wallet_withdrawal,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=10, help="Минут с последнего изменения резерва")
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--release', metavar='EXTERNAL_REFERENCE',
+                            help="Ручной возврат резерва после проверки у провайдера")
+
+    def handle(self, *args, **options):
+        if options['release']:
+            return self._release_manually(options['release'])
+
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        holds = FundsHolds.objects.filter(
+            status__in=FundsHoldService.OPEN_STATUSES, updated_at__lt=cutoff
+        ).order_by('created_at')
+
+        captured = released = failed = 0
+        unresolved = []
+        for hold in holds.iterator():
+            try:
+                record = FundsHoldService.find_provider_record(hold)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"{hold.external_reference}: провайдер недоступен ({e}), пропуск")
+                continue
+            action = FundsHoldService.resolution(record)
+
+            if options['dry_run']:
+                self.stdout.write(f"{hold.external_reference} [{hold.status}] -> {action}")
+                continue
+
+            if action == 'capture':
+                try:
+                    self.COMPLETE[hold.operation](hold.id, record)
+                except ValueError:
+                    # резерв успели закрыть параллельно
+                    continue
+                captured += 1
+            elif action == 'release':
+                FundsHoldService.release(hold.id, f"Провайдер отклонил заявку: {record.get('status')}")
+                released += 1
+            else:
+                FundsHoldService.mark_in_doubt(hold, NOT_FOUND_REASON)
+                unresolved.append(hold)
+
+        metrics.set_gauge('funds_holds_in_doubt', FundsHolds.objects.filter(status='in_doubt').count())
+        for hold in unresolved:
+            self.stderr.write(
+                f"{hold.external_reference}: не найдена у провайдера, остаётся in_doubt "
+                f"({hold.operation}, {hold.amount} {hold.currency}, user {hold.user_id}, с {hold.created_at:%Y-%m-%d %H:%M}); "
+                f"после проверки: recover_stuck_holds --release {hold.external_reference}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Завершено: {captured}, возвращено: {released}, на ручную проверку: {len(unresolved)}, "
+            f"ошибок провайдера: {failed}"
+        ))
+
+    def _release_manually(self, external_reference):
+        hold = FundsHolds.objects.filter(
+            external_reference=external_reference, status__in=FundsHoldService.OPEN_STATUSES
+        ).first()
+        if not hold:
+            raise CommandError(f"Открытый резерв {external_reference} не найден")
+        FundsHoldService.release(hold.id, "Возвращено вручную после проверки у провайдера")
+        self.stdout.write(self.style.SUCCESS(f"{external_reference}: резерв возвращён"))
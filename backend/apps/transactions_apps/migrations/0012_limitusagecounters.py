@@ -0,0 +1,30 @@
+# Generated by Django 5.2.11 on 2026-10-17 10:12
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions_apps', '0011_savedfiatrecipients'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LimitUsageCounters',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('user_id', models.CharField(max_length=50)),
+                ('operation_type', models.CharField(help_text='transfer / withdrawal / top_up', max_length=20)),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'limit_usage_counters',
+                'unique_together': {('user_id', 'operation_type', 'period', 'period_start')},
+            },
+        ),
+    ]
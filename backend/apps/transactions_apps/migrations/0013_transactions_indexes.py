@@ -0,0 +1,36 @@
+# Generated by Django 5.2.11 on 2026-10-17 11:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('transactions_apps', '0012_limitusagecounters'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='transactions',
+            index=models.Index(fields=['sender_id', 'created_at'], name='transaction_sender__34b6f3_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transactions',
+            index=models.Index(fields=['receiver_id', 'created_at'], name='transaction_receive_779c5d_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transactions',
+            index=models.Index(fields=['reference_id'], name='transaction_referen_897c8a_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='transactions',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'processing'])), fields=['status', 'created_at'], name='transactions_in_flight_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='balancemovements',
+            index=models.Index(fields=['user_id', 'account_type'], name='balance_mov_user_id_4ca461_idx'),
+        ),
+    ]
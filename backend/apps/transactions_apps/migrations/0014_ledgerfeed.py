@@ -0,0 +1,32 @@
+# Generated by Django 5.2.11 on 2026-10-17 12:20
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions_apps', '0013_transactions_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerFeed',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('user_id', models.CharField(max_length=50)),
+                ('account_type', models.CharField(max_length=50)),
+                ('direction', models.CharField(choices=[('debit', 'Debit (-)'), ('credit', 'Credit (+)')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('created_at', models.DateTimeField(help_text='created_at транзакции')),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='transactions_apps.transactions')),
+            ],
+            options={
+                'db_table': 'ledger_feed',
+                'indexes': [models.Index(fields=['user_id', 'account_type', 'created_at'], name='ledger_feed_user_id_64b81b_idx')],
+                'unique_together': {('user_id', 'transaction', 'account_type', 'direction')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.11 on 2026-10-17 12:40
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions_apps', '0014_ledgerfeed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionReceipts',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(help_text='Статус транзакции на момент сборки', max_length=20)),
+                ('metadata_hash', models.CharField(max_length=40)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('transaction', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='receipt', to='transactions_apps.transactions')),
+            ],
+            options={
+                'db_table': 'transaction_receipts',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.11 on 2026-10-17 13:40
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions_apps', '0015_transactionreceipts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FundsHolds',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('user_id', models.CharField(db_index=True, max_length=50)),
+                ('operation', models.CharField(help_text='fiat_withdrawal / crypto_withdrawal', max_length=30)),
+                ('source_type', models.CharField(help_text='bank_account / card / crypto_wallet', max_length=20)),
+                ('source_id', models.UUIDField()),
+                ('amount', models.DecimalField(decimal_places=6, max_digits=20)),
+                ('currency', models.CharField(max_length=10)),
+                ('external_reference', models.CharField(max_length=50, unique=True)),
+                ('status', models.CharField(choices=[('reserved', 'Reserved'), ('in_doubt', 'In doubt'), ('captured', 'Captured'), ('released', 'Released')], default='reserved', max_length=20)),
+                ('details', models.JSONField(default=dict, help_text='Параметры вывода для завершения после ответа провайдера')),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('transaction', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='funds_hold', to='transactions_apps.transactions')),
+            ],
+            options={
+                'db_table': 'funds_holds',
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='funds_holds_status_6fd514_idx')],
+            },
+        ),
+    ]
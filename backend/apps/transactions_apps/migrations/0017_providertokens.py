@@ -0,0 +1,27 @@
+# Generated by Django 5.2.11 on 2026-10-17 14:05
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions_apps', '0016_fundsholds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderTokens',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('provider', models.CharField(max_length=30, unique=True)),
+                ('token', models.TextField(blank=True, default='')),
+                ('expires_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'provider_tokens',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.11 on 2026-10-17 17:05
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions_apps', '0017_providertokens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeeRevenueDaily',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('fee_type', models.CharField(max_length=30)),
+                ('fee_currency', models.CharField(max_length=10)),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'fee_revenue_daily',
+                'unique_together': {('date', 'fee_type', 'fee_currency', 'shard')},
+            },
+        ),
+    ]
@@ -31,6 +31,16 @@ class Transactions(models.Model):
 
     class Meta:
         db_table = 'transactions'
+        indexes = [
+            models.Index(fields=['sender_id', 'created_at']),
+            models.Index(fields=['receiver_id', 'created_at']),
+            models.Index(fields=['reference_id']),
+            models.Index(
+                fields=['status', 'created_at'],
+                name='transactions_in_flight_idx',
+                condition=models.Q(status__in=['pending', 'processing']),
+            ),
+        ]
 
 class BankDepositAccounts(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -198,6 +208,35 @@ class BalanceMovements(models.Model):
 
     class Meta:
         db_table = 'balance_movements'
+        indexes = [
+            models.Index(fields=['user_id', 'account_type']),
+        ]
+
+
+class LedgerFeed(models.Model):
+    """Денормализованная лента: одна строка на (пользователь, транзакция, счёт, направление)."""
+    DIRECTION_TYPES = (('debit', 'Debit (-)',), ('credit', 'Credit (+)',))
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user_id = models.CharField(max_length=50)
+    transaction = models.ForeignKey('Transactions', on_delete=models.CASCADE, related_name='feed_entries')
+    account_type = models.CharField(max_length=50)
+    direction = models.CharField(max_length=10, choices=DIRECTION_TYPES)
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    created_at = models.DateTimeField(help_text="created_at транзакции")
+
+    # движения по картам пишутся с типом карты (metal/virtual), в ленте это один счёт 'card'
+    CARD_ACCOUNT_TYPES = ('metal', 'virtual')
+
+    @staticmethod
+    def feed_account_type(account_type):
+        return 'card' if account_type in LedgerFeed.CARD_ACCOUNT_TYPES else account_type
+
+    class Meta:
+        db_table = 'ledger_feed'
+        unique_together = ('user_id', 'transaction', 'account_type', 'direction')
+        indexes = [
+            models.Index(fields=['user_id', 'account_type', 'created_at']),
+        ]
 
 
 class FeeRevenue(models.Model):
@@ -224,6 +263,25 @@ class FeeRevenue(models.Model):
         ]
 
 
+class FeeRevenueDaily(models.Model):
+    """
+    Дневной итог комиссий по (дата, тип, валюта), ведётся в транзакции вставки FeeRevenue.
+    Итог дня разложен по shard, чтобы параллельные операции не ждали блокировку одной строки.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    date = models.DateField()
+    fee_type = models.CharField(max_length=30)
+    fee_currency = models.CharField(max_length=10)
+    shard = models.PositiveSmallIntegerField(default=0)
+    count = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'fee_revenue_daily'
+        unique_together = ('date', 'fee_type', 'fee_currency', 'shard')
+
+
 class SavedFiatRecipients(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user_id = models.CharField(max_length=255, db_index=True)
@@ -236,4 +294,76 @@ class SavedFiatRecipients(models.Model):
     class Meta:
         db_table = 'saved_fiat_recipients'
         unique_together = ('user_id', 'iban')
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+
+class LimitUsageCounters(models.Model):
+    PERIOD_CHOICES = (('day', 'Day'), ('month', 'Month'))
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user_id = models.CharField(max_length=50)
+    operation_type = models.CharField(max_length=20, help_text="transfer / withdrawal / top_up")
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'limit_usage_counters'
+        unique_together = ('user_id', 'operation_type', 'period', 'period_start')
+
+
+class TransactionReceipts(models.Model):
+    """Материализованная квитанция по транзакции в финальном статусе (без направления зрителя)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    transaction = models.OneToOneField('Transactions', on_delete=models.CASCADE, related_name='receipt')
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, help_text="Статус транзакции на момент сборки")
+    metadata_hash = models.CharField(max_length=40)
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'transaction_receipts'
+
+
+class FundsHolds(models.Model):
+    """Резерв средств под вывод через провайдера: reserved -> captured / released (in_doubt — ждёт recover_stuck_holds)."""
+    STATUS_CHOICES = (
+        ('reserved', 'Reserved'),
+        ('in_doubt', 'In doubt'),
+        ('captured', 'Captured'),
+        ('released', 'Released'),
+    )
+    OPEN_STATUSES = ('reserved', 'in_doubt')
+    # счёт ленты (LedgerFeed.account_type) для источника резерва
+    ACCOUNT_TYPES = {'bank_account': 'bank', 'card': 'card', 'crypto_wallet': 'crypto'}
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user_id = models.CharField(max_length=50, db_index=True)
+    operation = models.CharField(max_length=30, help_text="fiat_withdrawal / crypto_withdrawal")
+    source_type = models.CharField(max_length=20, help_text="bank_account / card / crypto_wallet")
+    source_id = models.UUIDField()
+    amount = models.DecimalField(max_digits=20, decimal_places=6)
+    currency = models.CharField(max_length=10)
+    external_reference = models.CharField(max_length=50, unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='reserved')
+    details = models.JSONField(default=dict, help_text="Параметры вывода для завершения после ответа провайдера")
+    transaction = models.OneToOneField('Transactions', on_delete=models.SET_NULL, null=True, blank=True, related_name='funds_hold')
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'funds_holds'
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+
+class ProviderTokens(models.Model):
+    """Токен доступа к внешнему провайдеру, общий для всех воркеров."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    provider = models.CharField(max_length=30, unique=True)
+    token = models.TextField(blank=True, default='')
+    expires_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'provider_tokens'
@@ -1,55 +1,143 @@
+import hashlib
+import json
+import random
+import threading
+import time
 import uuid
 
+import requests
+from django.conf import settings as django_settings
+from django.core.cache import cache
 from django.utils import timezone
 from decimal import Decimal
-from django.db import transaction
-from django.db.models import Sum
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
 from .models import (
     SavedFiatRecipients, Transactions, TopupsBank, TopupsCrypto, CardTransfers, 
     CryptoWithdrawals, BankWithdrawals, BalanceMovements,
-    BankDepositAccounts, CryptoWallets, FeeRevenue
+    BankDepositAccounts, CryptoWallets, FeeRevenue, FeeRevenueDaily, FundsHolds, LedgerFeed, LimitUsageCounters, TransactionReceipts
 )
 from apps.cards_apps.models import Cards
 from django.contrib.auth.models import User
+from apps.accounts_apps import identity
 from apps.accounts_apps.models import AdminSettings, Profiles
-from apps.transactions_apps.xerime_client import XerimeClient
+from apps.transactions_apps.xerime_client import ProviderRejected, XerimeClient
+from core import metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class SettingsManager:
+    PROFILE_SETTINGS_MAP = {
+        ('limits', 'transfer_min'): 'transfer_min',
+        ('limits', 'transfer_max'): 'transfer_max',
+        ('limits', 'daily_transfer_limit'): 'daily_transfer_limit',
+        ('limits', 'monthly_transfer_limit'): 'monthly_transfer_limit',
+        ('limits', 'withdrawal_min'): 'withdrawal_min',
+        ('limits', 'withdrawal_max'): 'withdrawal_max',
+        ('limits', 'daily_withdrawal_limit'): 'daily_withdrawal_limit',
+        ('limits', 'monthly_withdrawal_limit'): 'monthly_withdrawal_limit',
+        ('fees', 'card_to_card_percent'): 'card_to_card_percent',
+        ('fees', 'bank_transfer_percent'): 'bank_transfer_percent',
+        ('fees', 'network_fee_percent'): 'network_fee_percent',
+        ('fees', 'currency_conversion_percent'): 'currency_conversion_percent',
+        ('fees', 'top_up_crypto_flat'): 'top_up_crypto_flat',
+    }
+    VERSION_CACHE_KEY = 'settings_snapshot_version'
+    USER_VERSION_CACHE_KEY = 'settings_snapshot_version:{}'
+
+    _lock = threading.Lock()
+    _snapshot = None
+
+    @staticmethod
+    def _get_snapshot():
+        """Снимок AdminSettings процесса; перечитывается при смене версии или по TTL."""
+        version = cache.get(SettingsManager.VERSION_CACHE_KEY, 0)
+        ttl = getattr(django_settings, 'SETTINGS_CACHE_TTL', 60)
+        snap = SettingsManager._snapshot
+        if snap and snap['version'] == version and time.monotonic() - snap['loaded_at'] < ttl:
+            metrics.inc('settings_cache_lookups_total', scope='global', result='hit')
+            return snap
+
+        with SettingsManager._lock:
+            snap = SettingsManager._snapshot
+            if snap and snap['version'] == version and time.monotonic() - snap['loaded_at'] < ttl:
+                metrics.inc('settings_cache_lookups_total', scope='global', result='hit')
+                return snap
+            values = {(s.category, s.key): s.value for s in AdminSettings.objects.all()}
+            snap = {'version': version, 'loaded_at': time.monotonic(), 'values': values, 'users': {}}
+            SettingsManager._snapshot = snap
+            metrics.inc('settings_cache_lookups_total', scope='global', result='miss')
+            return snap
+
+    @staticmethod
+    def _get_user_overrides(snap, user_id):
+        uid = str(user_id)
+        user_version = cache.get(SettingsManager.USER_VERSION_CACHE_KEY.format(uid), 0)
+        entry = snap['users'].get(uid)
+        if entry is not None and entry[0] == user_version:
+            metrics.inc('settings_cache_lookups_total', scope='user', result='hit')
+            return entry[1]
+
+        overrides = {}
+        profile = Profiles.objects.filter(user_id=uid).first()
+        if profile and profile.custom_settings_enabled:
+            for setting_key, field in SettingsManager.PROFILE_SETTINGS_MAP.items():
+                val = getattr(profile, field, None)
+                if val is not None:
+                    overrides[setting_key] = Decimal(str(val))
+
+        if len(snap['users']) >= getattr(django_settings, 'SETTINGS_CACHE_MAX_USERS', 10000):
+            snap['users'].clear()
+        snap['users'][uid] = (user_version, overrides)
+        metrics.inc('settings_cache_lookups_total', scope='user', result='miss')
+        return overrides
+
+    @staticmethod
+    def invalidate():
+        # версия меняется после коммита: иначе параллельный читатель успеет перечитать
+        # старые строки под новой версией и отдавать их до TTL
+        transaction.on_commit(SettingsManager._bump_version)
+
+    @staticmethod
+    def _bump_version():
+        try:
+            cache.incr(SettingsManager.VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(SettingsManager.VERSION_CACHE_KEY, 1, None)
+        SettingsManager._snapshot = None
+
+    @staticmethod
+    def invalidate_user(user_id):
+        uid = str(user_id)
+        transaction.on_commit(lambda: SettingsManager._bump_user_version(uid))
+
+    @staticmethod
+    def _bump_user_version(uid):
+        key = SettingsManager.USER_VERSION_CACHE_KEY.format(uid)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+        snap = SettingsManager._snapshot
+        if snap:
+            snap['users'].pop(uid, None)
+
     @staticmethod
     def get_setting(category, key, default_value, user_id=None):
+        snap = SettingsManager._get_snapshot()
         if user_id:
-            profile = Profiles.objects.filter(user_id=str(user_id)).first()
-            if profile and profile.custom_settings_enabled:
-                mapping = {
-                    ('limits', 'transfer_min'): profile.transfer_min,
-                    ('limits', 'transfer_max'): profile.transfer_max,
-                    ('limits', 'daily_transfer_limit'): profile.daily_transfer_limit,
-                    ('limits', 'monthly_transfer_limit'): profile.monthly_transfer_limit,
-                    ('limits', 'withdrawal_min'): profile.withdrawal_min,
-                    ('limits', 'withdrawal_max'): profile.withdrawal_max,
-                    ('limits', 'daily_withdrawal_limit'): profile.daily_withdrawal_limit,
-                    ('limits', 'monthly_withdrawal_limit'): profile.monthly_withdrawal_limit,
-                    ('fees', 'card_to_card_percent'): profile.card_to_card_percent,
-                    ('fees', 'bank_transfer_percent'): profile.bank_transfer_percent,
-                    ('fees', 'network_fee_percent'): profile.network_fee_percent,
-                    ('fees', 'currency_conversion_percent'): profile.currency_conversion_percent,
-                    ('fees', 'top_up_crypto_flat'): getattr(profile, 'top_up_crypto_flat', None),
-                }
-                val = mapping.get((category, key))
-                if val is not None:
-                    return Decimal(str(val))
-        setting = AdminSettings.objects.filter(category=category, key=key).first()
-        return setting.value if setting else Decimal(str(default_value))
+            val = SettingsManager._get_user_overrides(snap, user_id).get((category, key))
+            if val is not None:
+                return val
+        val = snap['values'].get((category, key))
+        return val if val is not None else Decimal(str(default_value))
 
     @staticmethod
     def check_limits(user_id, amount, operation_type):
         amount = Decimal(str(amount))
-        today = timezone.now().date()
-        this_month = today.replace(day=1)
         min_limit = SettingsManager.get_setting('limits', f'{operation_type}_min', 0, user_id)
         max_limit = SettingsManager.get_setting('limits', f'{operation_type}_max', 9999999, user_id)
         daily_limit = SettingsManager.get_setting('limits', f'daily_{operation_type}_limit', 9999999, user_id)
@@ -59,49 +147,501 @@ class SettingsManager:
             raise ValueError(f"Сумма ниже минимального лимита ({min_limit})")
         if amount > max_limit:
             raise ValueError(f"Сумма превышает максимальный лимит операции ({max_limit})")
-            
-        base_query = Transactions.objects.filter(status__in=['completed', 'processing', 'pending'])
-        
-        if operation_type == 'transfer':
-            base_query = base_query.filter(
-                sender_id=str(user_id), 
-                type__in=['card_transfer', 'internal_transfer', 'iban_to_card', 'crypto_to_card', 'crypto_to_crypto', 'card_to_crypto', 'bank_to_crypto']
-            )
-        elif operation_type == 'withdrawal':
-            base_query = base_query.filter(
-                sender_id=str(user_id), 
-                type__in=['crypto_withdrawal', 'bank_withdrawal', 'iban_to_iban', 'crypto_to_iban', 'transfer_out']
-            )
-        elif operation_type == 'top_up':
-            base_query = base_query.filter(
-                receiver_id=str(user_id),
-                type__in=['top_up', 'crypto_deposit']
-            )
 
-        daily_sum = base_query.filter(created_at__date=today).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
+        usage = LimitCounters.lock_usage(user_id, operation_type, timezone.localdate())
+
+        daily_sum = usage['day']
         if daily_sum + amount > daily_limit:
             raise ValueError(f"Превышен дневной лимит ({daily_limit}). Доступно: {daily_limit - daily_sum}")
 
-        monthly_sum = base_query.filter(created_at__date__gte=this_month).aggregate(Sum('amount'))['amount__sum'] or Decimal('0')
+        monthly_sum = usage['month']
         if monthly_sum + amount > monthly_limit:
             raise ValueError(f"Превышен месячный лимит ({monthly_limit}). Доступно: {monthly_limit - monthly_sum}")
 
 
+class LimitCounters:
+    """Счётчики использования лимитов по пользователю/типу операции за день и месяц."""
+
+    OPERATIONS = {
+        'transfer': ('sender_id', ('card_transfer', 'internal_transfer', 'iban_to_card', 'crypto_to_card', 'crypto_to_crypto', 'card_to_crypto', 'bank_to_crypto')),
+        'withdrawal': ('sender_id', ('crypto_withdrawal', 'bank_withdrawal', 'iban_to_iban', 'crypto_to_iban', 'transfer_out')),
+        'top_up': ('receiver_id', ('top_up', 'crypto_deposit')),
+    }
+    RELEASED_STATUSES = ('failed', 'refunded', 'cancelled')
+    # поля Transactions, от которых зависит вклад в счётчики
+    COUNTED_FIELDS = frozenset(('type', 'status', 'amount', 'sender_id', 'receiver_id', 'created_at'))
+
+    @staticmethod
+    def entries(txn):
+        """Вклад транзакции в счётчики: [(user_id, operation_type, day, amount)]."""
+        if not txn.amount or not txn.created_at or str(txn.status).lower() in LimitCounters.RELEASED_STATUSES:
+            return []
+        result = []
+        for operation_type, (user_field, types) in LimitCounters.OPERATIONS.items():
+            uid = getattr(txn, user_field)
+            if txn.type in types and uid:
+                result.append((str(uid), operation_type, timezone.localdate(txn.created_at), Decimal(str(txn.amount))))
+        return result
+
+    @staticmethod
+    def periods(day):
+        return (('day', day), ('month', day.replace(day=1)))
+
+    @staticmethod
+    @transaction.atomic
+    def apply(entries, sign=1):
+        for uid, operation_type, day, amount in entries:
+            for period, period_start in LimitCounters.periods(day):
+                counter, _ = LimitUsageCounters.objects.get_or_create(
+                    user_id=uid, operation_type=operation_type, period=period, period_start=period_start
+                )
+                LimitUsageCounters.objects.filter(pk=counter.pk).update(amount=F('amount') + amount * sign)
+
+    @staticmethod
+    def lock_usage(user_id, operation_type, day):
+        usage = {}
+        for period, period_start in LimitCounters.periods(day):
+            LimitUsageCounters.objects.get_or_create(
+                user_id=str(user_id), operation_type=operation_type, period=period, period_start=period_start
+            )
+            counter = LimitUsageCounters.objects.select_for_update().get(
+                user_id=str(user_id), operation_type=operation_type, period=period, period_start=period_start
+            )
+            usage[period] = counter.amount
+        return usage
+
+    @staticmethod
+    def usage(user_id, operation_type, day):
+        usage = {'day': Decimal('0'), 'month': Decimal('0')}
+        periods = dict(LimitCounters.periods(day))
+        counters = LimitUsageCounters.objects.filter(
+            user_id=str(user_id), operation_type=operation_type, period_start__in=periods.values()
+        )
+        for counter in counters:
+            if periods[counter.period] == counter.period_start:
+                usage[counter.period] = counter.amount
+        return usage
+
+
+class RevenueRollup:
+    """Дневные итоги комиссий (fee_revenue_daily): запись вместе с FeeRevenue, сводка только по итогам."""
+
+    CATEGORY_MAP = {
+        'network_fee': 'network',
+        'currency_conversion': 'exchange',
+    }
+
+    @staticmethod
+    def entry(fee):
+        """Вклад записи FeeRevenue: (date, fee_type, fee_currency, amount) или None."""
+        if fee is None or fee.fee_amount is None or not fee.created_at:
+            return None
+        return (timezone.localdate(fee.created_at), fee.fee_type, fee.fee_currency, Decimal(str(fee.fee_amount)))
+
+    @staticmethod
+    @transaction.atomic
+    def apply(entry, sign=1):
+        if entry is None:
+            return
+        day, fee_type, fee_currency, amount = entry
+        shard = random.randrange(max(1, getattr(django_settings, 'FEE_ROLLUP_SHARDS', 8)))
+        row, _ = FeeRevenueDaily.objects.get_or_create(
+            date=day, fee_type=fee_type, fee_currency=fee_currency, shard=shard
+        )
+        FeeRevenueDaily.objects.filter(pk=row.pk).update(count=F('count') + sign, total=F('total') + amount * sign)
+
+    @staticmethod
+    def _bounded(queryset, field, start_date, end_date):
+        if start_date:
+            queryset = queryset.filter(**{f'{field}__gte': start_date})
+        if end_date:
+            queryset = queryset.filter(**{f'{field}__lte': end_date})
+        return queryset
+
+    @staticmethod
+    def rollup_totals(start_date=None, end_date=None):
+        """{(date, fee_type, fee_currency): (count, total)} из итогов — один небольшой GROUP BY."""
+        rows = RevenueRollup._bounded(FeeRevenueDaily.objects.all(), 'date', start_date, end_date).values(
+            'date', 'fee_type', 'fee_currency'
+        ).annotate(count_sum=Sum('count'), total_sum=Sum('total'))
+        return {
+            (r['date'], r['fee_type'], r['fee_currency']): (r['count_sum'], r['total_sum'])
+            for r in rows if r['count_sum']
+        }
+
+    @staticmethod
+    def raw_totals(start_date=None, end_date=None):
+        """То же по сырым FeeRevenue — для пересборки и проверки согласованности."""
+        rows = RevenueRollup._bounded(FeeRevenue.objects.all(), 'created_at__date', start_date, end_date).annotate(
+            day=TruncDate('created_at')
+        ).values('day', 'fee_type', 'fee_currency').annotate(count_sum=Count('id'), total_sum=Sum('fee_amount'))
+        return {(r['day'], r['fee_type'], r['fee_currency']): (r['count_sum'], r['total_sum']) for r in rows}
+
+    @staticmethod
+    def rebuild(start_date=None, end_date=None):
+        """
+        Пересобрать итоги за период из FeeRevenue. Таблица итогов блокируется от записи
+        (чтение не блокируется): незакоммиченные вставки комиссий дочитываются до пересчёта,
+        новые ждут конца пересборки — ни потерь, ни двойного счёта.
+        """
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {FeeRevenueDaily._meta.db_table} IN EXCLUSIVE MODE')
+            totals = RevenueRollup.raw_totals(start_date, end_date)
+            RevenueRollup._bounded(FeeRevenueDaily.objects.all(), 'date', start_date, end_date).delete()
+            FeeRevenueDaily.objects.bulk_create(
+                [
+                    FeeRevenueDaily(date=day, fee_type=fee_type, fee_currency=currency, shard=0, count=count, total=total)
+                    for (day, fee_type, currency), (count, total) in totals.items()
+                ],
+                batch_size=1000,
+            )
+        return len(totals)
+
+    @staticmethod
+    def summary(start_date=None, end_date=None):
+        """Ответ AdminRevenueSummaryView из итогов за любой период."""
+        totals = RevenueRollup.rollup_totals(start_date, end_date)
+        total_revenue = Decimal('0.00')
+        by_type, by_currency, by_category, by_currency_and_type, by_day = {}, {}, {}, {}, {}
+
+        def add(bucket, key, count, total):
+            item = bucket.setdefault(key, {"count": 0, "total": Decimal('0.00')})
+            item['count'] += count
+            item['total'] += total
+
+        for (day, fee_type, currency), (count, total) in totals.items():
+            total_revenue += total
+            add(by_type, fee_type, count, total)
+            add(by_currency, currency, count, total)
+            add(by_category, RevenueRollup.CATEGORY_MAP.get(fee_type, 'service'), count, total)
+            add(by_currency_and_type.setdefault(currency, {}), fee_type, count, total)
+            by_day[day] = by_day.get(day, Decimal('0.00')) + total
+
+        def as_str(bucket):
+            return {k: {"count": v['count'], "total": str(v['total'])} for k, v in bucket.items()}
+
+        return {
+            "total_revenue": str(total_revenue),
+            "by_type": as_str(by_type),
+            "by_currency": as_str(by_currency),
+            "by_category": as_str(by_category),
+            "by_currency_and_type": {cur: as_str(types) for cur, types in by_currency_and_type.items()},
+            "by_day": [{"date": day.isoformat(), "total": str(total)} for day, total in sorted(by_day.items(), reverse=True)],
+        }
+
+
+class PricingService:
+    """Матрица комиссий/курсов/лимитов и расчёт сумм по той же математике, что и execute_*."""
+
+    EXCHANGE_RATE_DEFAULTS = {
+        'usdt_to_aed_buy': Decimal('3.65'),
+        'usdt_to_aed_sell': Decimal('3.69'),
+    }
+    FEE_DEFAULTS = {
+        'card_to_card_percent': Decimal('1.0'),
+        'bank_transfer_percent': Decimal('2.0'),
+        'network_fee_percent': Decimal('1.0'),
+        'currency_conversion_percent': Decimal('1.0'),
+        'top_up_crypto_flat': Decimal('5.90'),
+    }
+    # type: (вид лимита, валюта списания, валюта зачисления)
+    TYPES = {
+        'card_to_card': ('transfer', 'AED', 'AED'),
+        'internal_transfer': ('transfer', 'AED', 'AED'),
+        'card_to_bank': ('transfer', 'AED', 'AED'),
+        'bank_to_card': ('transfer', 'AED', 'AED'),
+        'iban_to_card': ('transfer', 'AED', 'AED'),
+        'iban_to_iban': ('withdrawal', 'AED', 'AED'),
+        'card_to_crypto': ('transfer', 'AED', 'USDT'),
+        'bank_to_crypto': ('transfer', 'AED', 'USDT'),
+        'crypto_to_card': ('transfer', 'USDT', 'AED'),
+        'crypto_to_bank': ('transfer', 'USDT', 'AED'),
+        'crypto_to_iban': ('transfer', 'USDT', 'AED'),
+        'crypto_to_crypto': ('withdrawal', 'USDT', 'USDT'),
+        'crypto_withdrawal': ('withdrawal', 'USDT', 'USDT'),
+    }
+    # type: (ключ процента, поле процента в /info/, ключ фикс. комиссии, ключ курса) — как считают execute_*
+    FEE_RULES = {
+        'card_to_card': ('card_to_card_percent', 'service_fee_percent', None, None),
+        'internal_transfer': ('card_to_card_percent', 'service_fee_percent', None, None),
+        'card_to_bank': ('card_to_card_percent', 'service_fee_percent', None, None),
+        'bank_to_card': ('bank_transfer_percent', 'service_fee_percent', None, None),
+        'iban_to_card': ('bank_transfer_percent', 'service_fee_percent', None, None),
+        'card_to_crypto': ('currency_conversion_percent', 'service_fee_percent', None, 'usdt_to_aed_sell'),
+        'bank_to_crypto': ('currency_conversion_percent', 'service_fee_percent', None, 'usdt_to_aed_sell'),
+        'crypto_to_card': ('network_fee_percent', 'service_fee_percent', 'top_up_crypto_flat', 'usdt_to_aed_buy'),
+        'crypto_to_bank': ('network_fee_percent', 'service_fee_percent', 'top_up_crypto_flat', 'usdt_to_aed_buy'),
+        'crypto_to_iban': ('network_fee_percent', 'service_fee_percent', 'top_up_crypto_flat', 'usdt_to_aed_buy'),
+        'crypto_withdrawal': ('network_fee_percent', 'network_fee_percent', None, 'usdt_to_aed_sell'),
+        # iban_to_iban и crypto_to_crypto уходят провайдеру без нашей комиссии
+        'iban_to_iban': (None, None, None, None),
+        'crypto_to_crypto': (None, None, None, None),
+    }
+
+    @staticmethod
+    def get_pricing_table(user_id):
+        uid = str(user_id)
+        snap = SettingsManager._get_snapshot()
+        overrides = SettingsManager._get_user_overrides(snap, uid)
+        memo = snap.setdefault('pricing', {})
+        entry = memo.get(uid)
+        if entry is not None and entry[0] is overrides:
+            return entry[1]
+
+        table = {
+            'exchange_rates': {
+                key: SettingsManager.get_setting('exchange_rates', key, default, uid)
+                for key, default in PricingService.EXCHANGE_RATE_DEFAULTS.items()
+            },
+            'fees': {
+                key: SettingsManager.get_setting('fees', key, default, uid)
+                for key, default in PricingService.FEE_DEFAULTS.items()
+            },
+            'limits': {
+                operation_type: {
+                    'min': SettingsManager.get_setting('limits', f'{operation_type}_min', 0, uid),
+                    'max': SettingsManager.get_setting('limits', f'{operation_type}_max', 9999999, uid),
+                    'daily': SettingsManager.get_setting('limits', f'daily_{operation_type}_limit', 9999999, uid),
+                    'monthly': SettingsManager.get_setting('limits', f'monthly_{operation_type}_limit', 9999999, uid),
+                }
+                for operation_type in ('transfer', 'withdrawal')
+            },
+        }
+        # версия снимка цен: одинакова во всех воркерах при одинаковых значениях (основа ETag котировки)
+        table['version'] = hashlib.sha1(json.dumps(table, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        memo[uid] = (overrides, table)
+        return table
+
+    @staticmethod
+    def fee_rule(tx_type, table):
+        """(процент, поле процента в /info/, фикс. комиссия, курс) — одно правило для get_type_info и calculate."""
+        percent_key, percent_field, flat_key, rate_key = PricingService.FEE_RULES.get(tx_type, (None, None, None, None))
+        rates, fees = table['exchange_rates'], table['fees']
+        return (
+            fees[percent_key] if percent_key else Decimal('0'),
+            percent_field,
+            fees[flat_key] if flat_key else Decimal('0'),
+            rates[rate_key] if rate_key else None,
+        )
+
+    @staticmethod
+    def get_type_info(tx_type, table):
+        limit_kind, currency_from, currency_to = PricingService.TYPES.get(tx_type, ('transfer', 'AED', 'AED'))
+        limits = table['limits'][limit_kind]
+        fee_percent, percent_field, fee_flat, exchange_rate = PricingService.fee_rule(tx_type, table)
+        info = {
+            "currency_from": currency_from,
+            "currency_to": currency_to,
+            "exchange_rate": float(exchange_rate) if exchange_rate is not None else None,
+            "service_fee_percent": 0.0,
+            "service_fee_flat": 0.0,
+            "network_fee_percent": 0.0,
+            "network_fee_flat": float(fee_flat),
+            "min_amount": float(limits['min']),
+            "max_amount": float(limits['max']),
+        }
+        if percent_field:
+            info[percent_field] = float(fee_percent)
+        return info
+
+    @staticmethod
+    def calculate(tx_type, amount, table):
+        amount = Decimal(str(amount))
+        limit_kind, currency_from, currency_to = PricingService.TYPES[tx_type]
+        fee_percent, _, fee_flat, exchange_rate = PricingService.fee_rule(tx_type, table)
+        fee_currency = currency_from
+        debit_currency = currency_from
+
+        if tx_type == 'crypto_withdrawal':
+            # комиссия в USDT, списание с карты в AED по курсу продажи
+            fee = (amount * fee_percent / Decimal('100')).quantize(Decimal('0.000000'))
+            total_debit = ((amount + fee) * exchange_rate).quantize(Decimal('0.01'))
+            debit_currency = 'AED'
+            credit = amount
+        else:
+            fee = (amount * fee_percent / Decimal('100')).quantize(Decimal('0.01')) + fee_flat
+            total_debit = amount + fee
+            if currency_from == 'AED' and currency_to == 'USDT':
+                credit = (amount / exchange_rate).quantize(Decimal('0.000000'))
+            elif currency_from == 'USDT' and currency_to == 'AED':
+                credit = (amount * exchange_rate).quantize(Decimal('0.01'))
+            else:
+                credit = amount
+
+        return {
+            "type": tx_type,
+            "amount": float(amount),
+            "limit_kind": limit_kind,
+            "exchange_rate": float(exchange_rate) if exchange_rate is not None else None,
+            "fee_percent": float(fee_percent),
+            "fee_flat": float(fee_flat),
+            "fee": float(fee),
+            "fee_currency": fee_currency,
+            "total_debit": float(total_debit),
+            "debit_currency": debit_currency,
+            "credit_amount": float(credit),
+            "credit_currency": currency_to,
+        }
+
+    @staticmethod
+    def check_quote_limits(quote, table, usage):
+        limits = table['limits'][quote['limit_kind']]
+        used = usage[quote['limit_kind']]
+        amount = Decimal(str(quote['amount']))
+        if amount < limits['min']:
+            return f"Сумма ниже минимального лимита ({limits['min']})"
+        if amount > limits['max']:
+            return f"Сумма превышает максимальный лимит операции ({limits['max']})"
+        if used['day'] + amount > limits['daily']:
+            return f"Превышен дневной лимит ({limits['daily']}). Доступно: {limits['daily'] - used['day']}"
+        if used['month'] + amount > limits['monthly']:
+            return f"Превышен месячный лимит ({limits['monthly']}). Доступно: {limits['monthly'] - used['month']}"
+        return None
+
+
+class FundsHoldService:
+    """
+    Saga вывода через провайдера: reserve (короткая транзакция с блокировкой источника) ->
+    вызов провайдера без блокировок -> capture или release отдельной короткой транзакцией.
+    """
+    SOURCES = {
+        'bank_account': (BankDepositAccounts, "Недостаточно средств на банковском счете."),
+        'card': (Cards, "Недостаточно средств на карте."),
+        'crypto_wallet': (CryptoWallets, "Недостаточно средств на криптокошельке."),
+    }
+    OPEN_STATUSES = FundsHolds.OPEN_STATUSES
+    PROVIDER_FAILED_STATUSES = ('failed', 'rejected', 'cancelled', 'canceled')
+
+    @staticmethod
+    @transaction.atomic
+    def reserve(user_id, source_type, source_id, amount, currency, operation, external_reference, details=None):
+        model, error = FundsHoldService.SOURCES[source_type]
+        source = model.objects.select_for_update().filter(id=source_id, user_id=str(user_id)).first()
+        if not source or source.balance < amount:
+            raise ValueError(error)
+        source.balance -= amount
+        source.save()
+        return FundsHolds.objects.create(
+            user_id=str(user_id), operation=operation, source_type=source_type, source_id=source.id,
+            amount=amount, currency=currency, external_reference=external_reference, details=details or {},
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def release(hold_id, reason=None):
+        hold = FundsHolds.objects.select_for_update().get(id=hold_id)
+        if hold.status not in FundsHoldService.OPEN_STATUSES:
+            return hold
+        model, _ = FundsHoldService.SOURCES[hold.source_type]
+        source = model.objects.select_for_update().filter(id=hold.source_id).first()
+        if source:
+            source.balance += hold.amount
+            source.save()
+        hold.status = 'released'
+        hold.last_error = reason
+        hold.save(update_fields=['status', 'last_error', 'updated_at'])
+        metrics.inc('funds_holds_total', operation=hold.operation, result='released')
+        return hold
+
+    @staticmethod
+    def lock_for_capture(hold_id):
+        """Вызывается внутри transaction.atomic завершения вывода."""
+        hold = FundsHolds.objects.select_for_update().get(id=hold_id)
+        if hold.status not in FundsHoldService.OPEN_STATUSES:
+            raise ValueError("Резерв средств по выводу уже закрыт.")
+        return hold
+
+    @staticmethod
+    def capture(hold, txn):
+        """
+        Списание по резерву проводится в ленту при capture: открытый резерв — ещё не проводка
+        (statements прибавляют его к текущему балансу), released — не проводка вовсе.
+        """
+        hold.status = 'captured'
+        hold.transaction = txn
+        hold.save(update_fields=['status', 'transaction', 'updated_at'])
+        TransactionService._record_movement(
+            txn, hold.user_id, FundsHolds.ACCOUNT_TYPES[hold.source_type], hold.amount, 'debit'
+        )
+        metrics.inc('funds_holds_total', operation=hold.operation, result='captured')
+
+    @staticmethod
+    def is_definite_failure(exc):
+        """
+        Возврат резерва только при явном отказе (ProviderRejected: 400/422, circuit open до отправки).
+        409 «уже существует», неразбираемый 2xx, таймаут, 5xx — заявка могла пройти, решает recover_stuck_holds.
+        """
+        return isinstance(exc, ProviderRejected)
+
+    @staticmethod
+    def fail(hold, exc):
+        if FundsHoldService.is_definite_failure(exc):
+            FundsHoldService.release(hold.id, str(exc))
+            return
+        # таймаут/5xx: заявка могла дойти до провайдера, решение примет recover_stuck_holds
+        FundsHoldService.mark_in_doubt(hold, str(exc)[:2000])
+        metrics.inc('funds_holds_total', operation=hold.operation, result='in_doubt')
+        logger.warning(f"[holds] {hold.external_reference} in doubt after provider error: {exc}")
+
+    @staticmethod
+    def find_provider_record(hold):
+        """Заявка у провайдера по external_reference (details-эндпоинт); None — провайдер ответил 404."""
+        if hold.operation == 'crypto_withdrawal':
+            lookup = XerimeClient.get_crypto_withdrawal_details
+        else:
+            lookup = XerimeClient.get_transaction_details
+        try:
+            record = lookup(hold.external_reference)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+        if isinstance(record, dict) and isinstance(record.get('data'), dict):
+            record = record['data']
+        return record if isinstance(record, dict) else None
+
+    @staticmethod
+    def resolution(record):
+        """
+        capture — провайдер принял заявку; release — явный статус отказа;
+        in_doubt — заявки не видно: она могла ещё не дойти, деньги не возвращаем, ждём или разбираем вручную.
+        """
+        if record is None:
+            return 'in_doubt'
+        if str(record.get('status', '')).lower() in FundsHoldService.PROVIDER_FAILED_STATUSES:
+            return 'release'
+        return 'capture'
+
+    @staticmethod
+    def mark_in_doubt(hold, reason):
+        """reserved -> in_doubt без смены updated_at у уже спорных резервов: возраст нужен для ручного разбора."""
+        FundsHolds.objects.filter(id=hold.id, status='reserved').update(
+            status='in_doubt', last_error=reason, updated_at=timezone.now()
+        )
+
+
 class TransactionService:
 
     @staticmethod
     def _get_user_full_name(uid):
-        if not uid or str(uid) == 'EXTERNAL':
-            return "External"
-        profile = Profiles.objects.filter(user_id=str(uid)).first()
-        if profile and (profile.first_name or profile.last_name):
-            return f"{profile.first_name or ''} {profile.last_name or ''}".strip()
-        try:
-            u = User.objects.get(id=int(uid) if str(uid).isdigit() else uid)
-            name = f"{u.first_name or ''} {u.last_name or ''}".strip()
-            return name if name else u.username
-        except Exception:
-            return "Unknown User"
+        return identity.get(uid).name
+
+    @staticmethod
+    def _record_movement(txn, user_id, account_type, amount, movement_type, created_at=None):
+        """created_at — когда изменился баланс, если не в момент создания транзакции (возврат, зачисление по webhook)."""
+        BalanceMovements.objects.create(
+            transaction=txn, user_id=user_id, account_type=account_type, amount=amount, type=movement_type
+        )
+        feed, created = LedgerFeed.objects.get_or_create(
+            user_id=str(user_id),
+            transaction=txn,
+            account_type=LedgerFeed.feed_account_type(account_type),
+            direction=movement_type,
+            defaults={'amount': amount, 'created_at': created_at or txn.created_at},
+        )
+        if not created:
+            LedgerFeed.objects.filter(pk=feed.pk).update(amount=F('amount') + amount)
 
     @staticmethod
     def _mask_card(num):
@@ -259,8 +799,8 @@ class TransactionService:
             sender_card_id=sender_card.id, receiver_card_id=receiver_card.id, amount=amount, 
             fee_percent=fee_percent, fee_amount=fee_amount, total_amount=total_debit
         )
-        BalanceMovements.objects.create(transaction=txn, user_id=sender_id, account_type=sender_card.type, amount=total_debit, type='debit')
-        BalanceMovements.objects.create(transaction=txn, user_id=receiver_card.user_id, account_type=receiver_card.type, amount=amount, type='credit')
+        TransactionService._record_movement(txn, sender_id, sender_card.type, total_debit, 'debit')
+        TransactionService._record_movement(txn, receiver_card.user_id, receiver_card.type, amount, 'credit')
 
         if fee_amount > 0:
             FeeRevenue.objects.create(
@@ -296,55 +836,54 @@ class TransactionService:
         return transaction
 
     @staticmethod
-    @transaction.atomic
     def execute_fiat_withdrawal(sender_id, iban, amount, business_name, from_card_id=None, from_bank_account_id=None):
         user_id_str = str(sender_id)
         amount_decimal = Decimal(str(amount))
-        
-        source_model = None
-        source_id_str = None
 
-        # 1. Локальное списание с правильного источника
+        # 1. Резерв средств на источнике (короткая транзакция, блокировка снимается сразу)
         if from_bank_account_id:
-            account = BankDepositAccounts.objects.select_for_update().filter(id=from_bank_account_id, user_id=user_id_str).first()
-            if not account or account.balance < amount_decimal:
-                raise ValueError("Недостаточно средств на банковском счете.")
-            account.balance -= amount_decimal
-            account.save()
-            source_model = 'bank_account'
-            source_id_str = str(account.id)
-            
+            source_type, source_id = 'bank_account', from_bank_account_id
         elif from_card_id:
-            from apps.cards_apps.models import Cards # Убедись, что импорт правильный
-            card = Cards.objects.select_for_update().filter(id=from_card_id, user_id=user_id_str).first()
-            if not card or card.balance < amount_decimal:
-                raise ValueError("Недостаточно средств на карте.")
-            card.balance -= amount_decimal
-            card.save()
-            source_model = 'card'
-            source_id_str = str(card.id)
+            source_type, source_id = 'card', from_card_id
         else:
             raise ValueError("Не указан источник списания.")
 
-        # 2. Проверка: внутренний ли это перевод?
-        dest_account = BankDepositAccounts.objects.filter(iban=iban).first()
-        is_internal = dest_account is not None
+        external_ref = f"FW-{uuid.uuid4().hex[:12].upper()}"
+        hold = FundsHoldService.reserve(
+            user_id_str, source_type, source_id, amount_decimal, 'AED', 'fiat_withdrawal', external_ref,
+            details={"iban": iban, "business_name": business_name},
+        )
 
-        # 3. Интеграция Xerime
+        # 2. Интеграция Xerime — без блокировок строк
         try:
             XerimeClient.register_aed_recipient(merchant_id=user_id_str, business_name=business_name, iban=iban)
         except Exception as e:
+            FundsHoldService.release(hold.id, str(e))
             raise ValueError(f"Ошибка регистрации IBAN в Xerime: {str(e)}")
 
         try:
             withdrawal_data = XerimeClient.create_fiat_withdrawal(
-                merchant_id=user_id_str, amount=amount_decimal, iban=iban, currency="AED"
+                merchant_id=user_id_str, amount=amount_decimal, iban=iban, currency="AED", external_reference=external_ref
             )
         except Exception as e:
+            FundsHoldService.fail(hold, e)
             raise ValueError(f"Ошибка провайдера при выводе фиата: {str(e)}")
 
-        # 4. Сохранение получателя в БД (для Рината)
-        from .models import SavedFiatRecipients
+        # 3. Завершение резерва и запись транзакции
+        return TransactionService.complete_fiat_withdrawal(hold.id, withdrawal_data)
+
+    @staticmethod
+    @transaction.atomic
+    def complete_fiat_withdrawal(hold_id, withdrawal_data):
+        hold = FundsHoldService.lock_for_capture(hold_id)
+        user_id_str = hold.user_id
+        iban = hold.details.get('iban')
+        business_name = hold.details.get('business_name')
+
+        dest_account = BankDepositAccounts.objects.filter(iban=iban).first()
+        is_internal = dest_account is not None
+
+        # Сохранение получателя в БД (для Рината)
         SavedFiatRecipients.objects.get_or_create(
             user_id=user_id_str,
             iban=iban,
@@ -354,27 +893,28 @@ class TransactionService:
             }
         )
 
-        # 5. Запись красивой транзакции в историю
+        # Запись красивой транзакции в историю
         receiver_id = str(dest_account.user_id) if is_internal else "EXTERNAL_IBAN"
         receiver_name = TransactionService._get_user_full_name(dest_account.user_id) if is_internal else iban
 
-        transaction = Transactions.objects.create(
+        txn = Transactions.objects.create(
             sender_id=user_id_str,
             receiver_id=receiver_id,
             receiver_name=receiver_name,
             type="bank_withdrawal",
-            amount=amount_decimal,
+            amount=hold.amount,
             currency="AED",
             status="pending",
             reference_id=withdrawal_data.get("reference_id"),
             metadata={
-                "external_reference": withdrawal_data.get("external_reference"),
+                "external_reference": withdrawal_data.get("external_reference") or hold.external_reference,
                 "xerime_status": withdrawal_data.get("status"),
-                f"from_{source_model}_id": source_id_str,
+                f"from_{hold.source_type}_id": str(hold.source_id),
                 "is_internal": is_internal
             }
         )
-        return transaction
+        FundsHoldService.capture(hold, txn)
+        return txn
 
     @staticmethod
     def initiate_bank_topup(user_id, transfer_rail):
@@ -561,10 +1101,10 @@ class TransactionService:
             to_address=to_address, amount_crypto=amount_crypto, fee_amount=crypto_fee,
             fee_type='network', total_debit=total_crypto_debit
         )
-        BalanceMovements.objects.create(transaction=txn, user_id=user_id, account_type=card.type, amount=total_aed_debit, type='debit')
+        TransactionService._record_movement(txn, user_id, card.type, total_aed_debit, 'debit')
 
         if is_internal:
-            BalanceMovements.objects.create(transaction=txn, user_id=dest_wallet.user_id, account_type='crypto', amount=amount_crypto, type='credit')
+            TransactionService._record_movement(txn, dest_wallet.user_id, 'crypto', amount_crypto, 'credit')
 
         if crypto_fee > 0:
             fee_aed = (crypto_fee * rate).quantize(Decimal('0.01'))
@@ -633,13 +1173,13 @@ class TransactionService:
             beneficiary_bank_name=bank_name, from_card_id=card_id, from_bank_account_id=bank_account_id,
             amount_aed=amount_aed, fee_percent=fee_percent, fee_amount=fee_amount, total_debit=total_debit
         )
-        BalanceMovements.objects.create(transaction=txn, user_id=user_id, account_type=source_type, amount=total_debit, type='debit')
+        TransactionService._record_movement(txn, user_id, source_type, total_debit, 'debit')
 
         if is_internal:
             recipient_account = BankDepositAccounts.objects.select_for_update().get(id=internal_account.id)
             recipient_account.balance += amount_aed
             recipient_account.save()
-            BalanceMovements.objects.create(transaction=txn, user_id=recipient_account.user_id, account_type='bank', amount=amount_aed, type='credit')
+            TransactionService._record_movement(txn, recipient_account.user_id, 'bank', amount_aed, 'credit')
 
         if fee_amount > 0:
             FeeRevenue.objects.create(transaction=txn, user_id=str(user_id), fee_type='bank_withdrawal', fee_amount=fee_amount, fee_percent=fee_percent, base_amount=amount_aed, base_currency='AED', card_id=card_id)
@@ -698,8 +1238,8 @@ class TransactionService:
             type='card_to_crypto', status='completed', amount=amount_aed, currency='AED', fee=conv_fee_aed, 
             exchange_rate=sell_rate, card_id=source_card.id, metadata=metadata
         )
-        BalanceMovements.objects.create(transaction=txn, user_id=sender_id, account_type='card', amount=total_aed_debit, type='debit')
-        BalanceMovements.objects.create(transaction=txn, user_id=dest_wallet.user_id, account_type='crypto', amount=amount_usdt, type='credit')
+        TransactionService._record_movement(txn, sender_id, 'card', total_aed_debit, 'debit')
+        TransactionService._record_movement(txn, dest_wallet.user_id, 'crypto', amount_usdt, 'credit')
         if conv_fee_aed > 0:
             FeeRevenue.objects.create(
                 transaction=txn, user_id=str(sender_id), fee_type='card_to_crypto',
@@ -761,8 +1301,8 @@ class TransactionService:
             type='crypto_to_card', status='completed', amount=amount_usdt, currency='USDT', fee=crypto_fee, 
             exchange_rate=buy_rate, recipient_card=to_card_number, card_id=dest_card.id, metadata=metadata
         )
-        BalanceMovements.objects.create(transaction=txn, user_id=sender_id, account_type='crypto', amount=total_deduction, type='debit')
-        BalanceMovements.objects.create(transaction=txn, user_id=dest_card.user_id, account_type='card', amount=amount_aed, type='credit')
+        TransactionService._record_movement(txn, sender_id, 'crypto', total_deduction, 'debit')
+        TransactionService._record_movement(txn, dest_card.user_id, 'card', amount_aed, 'credit')
         if crypto_fee > 0:
             FeeRevenue.objects.create(
                 transaction=txn, user_id=str(sender_id), fee_type='crypto_to_card',
@@ -828,8 +1368,8 @@ class TransactionService:
             type='bank_to_crypto', status='completed', amount=amount_aed, currency='AED', fee=conv_fee_aed, 
             exchange_rate=sell_rate, metadata=metadata
         )
-        BalanceMovements.objects.create(transaction=txn, user_id=sender_id, account_type='bank', amount=total_aed_debit, type='debit')
-        BalanceMovements.objects.create(transaction=txn, user_id=dest_wallet.user_id, account_type='crypto', amount=amount_usdt, type='credit')
+        TransactionService._record_movement(txn, sender_id, 'bank', total_aed_debit, 'debit')
+        TransactionService._record_movement(txn, dest_wallet.user_id, 'crypto', amount_usdt, 'credit')
         if conv_fee_aed > 0:
             FeeRevenue.objects.create(
                 transaction=txn, user_id=str(sender_id), fee_type='bank_to_crypto',
@@ -893,8 +1433,8 @@ class TransactionService:
             type='crypto_to_iban', status='completed', amount=amount_usdt, currency='USDT', fee=crypto_fee, 
             exchange_rate=buy_rate, metadata=metadata
         )
-        BalanceMovements.objects.create(transaction=txn, user_id=sender_id, account_type='crypto', amount=total_deduction, type='debit')
-        BalanceMovements.objects.create(transaction=txn, user_id=dest_bank.user_id, account_type='bank', amount=amount_aed, type='credit')
+        TransactionService._record_movement(txn, sender_id, 'crypto', total_deduction, 'debit')
+        TransactionService._record_movement(txn, dest_bank.user_id, 'bank', amount_aed, 'credit')
 
         if crypto_fee > 0:
             FeeRevenue.objects.create(
@@ -947,8 +1487,8 @@ class TransactionService:
             type='bank_withdrawal', status='completed', amount=amount_aed, currency='AED',
             fee=fee_amount, metadata=metadata
         )
-        BalanceMovements.objects.create(transaction=txn, user_id=sender_id, account_type='card', amount=total_debit, type='debit')
-        BalanceMovements.objects.create(transaction=txn, user_id=dest_bank.user_id, account_type='bank', amount=amount_aed, type='credit')
+        TransactionService._record_movement(txn, sender_id, 'card', total_debit, 'debit')
+        TransactionService._record_movement(txn, dest_bank.user_id, 'bank', amount_aed, 'credit')
         if fee_amount > 0:
             FeeRevenue.objects.create(
                 transaction=txn, user_id=str(sender_id), fee_type='card_to_bank',
@@ -993,8 +1533,8 @@ class TransactionService:
             type='iban_to_card', status='completed', amount=amount, currency='AED', fee=fee_amount,
             recipient_card=receiver_card_number, metadata=metadata
         )
-        BalanceMovements.objects.create(transaction=txn, user_id=user_id, account_type='bank', amount=total_debit, type='debit')
-        BalanceMovements.objects.create(transaction=txn, user_id=receiver_card.user_id, account_type=receiver_card.type, amount=amount, type='credit')
+        TransactionService._record_movement(txn, user_id, 'bank', total_debit, 'debit')
+        TransactionService._record_movement(txn, receiver_card.user_id, receiver_card.type, amount, 'credit')
         if fee_amount > 0:
             FeeRevenue.objects.create(
                 transaction=txn, user_id=str(user_id), fee_type='iban_to_card',
@@ -1005,18 +1545,16 @@ class TransactionService:
         return txn, fee_amount, total_debit
 
     @staticmethod
-    @transaction.atomic
     def execute_crypto_wallet_withdrawal(sender_id, from_wallet_id, crypto_address, amount, token, network):
         user_id_str = str(sender_id)
-        from_wallet = CryptoWallets.objects.select_for_update().get(id=from_wallet_id, user_id=user_id_str)
         amount_decimal = Decimal(str(amount))
 
-        if from_wallet.balance < amount_decimal:
-            raise ValueError("Недостаточно средств на криптокошельке.")
-        dest_wallet = CryptoWallets.objects.filter(address=crypto_address).first()
-        is_internal = dest_wallet is not None
-
         external_ref = f"WD-{uuid.uuid4().hex[:12].upper()}"
+        hold = FundsHoldService.reserve(
+            user_id_str, 'crypto_wallet', from_wallet_id, amount_decimal, token, 'crypto_withdrawal', external_ref,
+            details={"crypto_address": crypto_address, "token": token, "network": network},
+        )
+
         xerime_network = 'tron' if network == 'TRC20' else network.lower()
         try:
             withdrawal_response = XerimeClient.create_crypto_withdrawal(
@@ -1027,37 +1565,84 @@ class TransactionService:
                 destination_address=crypto_address,
                 external_reference=external_ref
             )
-            xerime_reference_id = withdrawal_response.get("reference_id")
-            xerime_status = withdrawal_response.get("status", "pending")
         except Exception as e:
+            FundsHoldService.fail(hold, e)
             raise ValueError(f"Ошибка провайдера при выводе: {str(e)}")
-        from_wallet.balance -= amount_decimal
-        from_wallet.save()
+
+        return TransactionService.complete_crypto_wallet_withdrawal(hold.id, withdrawal_response)
+
+    @staticmethod
+    @transaction.atomic
+    def complete_crypto_wallet_withdrawal(hold_id, withdrawal_response):
+        hold = FundsHoldService.lock_for_capture(hold_id)
+        crypto_address = hold.details.get('crypto_address')
+        dest_wallet = CryptoWallets.objects.filter(address=crypto_address).first()
+        is_internal = dest_wallet is not None
+
         receiver_id = str(dest_wallet.user_id) if is_internal else "EXTERNAL_WALLET"
         receiver_name = TransactionService._get_user_full_name(dest_wallet.user_id) if is_internal else crypto_address
         transaction_record = Transactions.objects.create(
-            sender_id=user_id_str,
+            sender_id=hold.user_id,
             receiver_id=receiver_id,
             receiver_name=receiver_name,
             type="crypto_withdrawal",
-            amount=amount_decimal,
-            currency=token,
+            amount=hold.amount,
+            currency=hold.currency,
             status="pending",
-            reference_id=xerime_reference_id,
+            reference_id=withdrawal_response.get("reference_id"),
             metadata={
-                "network": network,
-                "external_reference": external_ref,
-                "xerime_status": xerime_status,
-                "from_wallet_id": str(from_wallet.id),
+                "network": hold.details.get('network'),
+                "external_reference": hold.external_reference,
+                "xerime_status": withdrawal_response.get("status", "pending"),
+                "from_wallet_id": str(hold.source_id),
                 "is_internal": is_internal
             }
         )
+        FundsHoldService.capture(hold, transaction_record)
         return transaction_record
 
+    @staticmethod
+    @transaction.atomic
+    def refund_crypto_withdrawal(transaction_id):
+        """Возврат на кошелёк по выводу, который провайдер отклонил; повторный вызов ничего не меняет."""
+        txn = Transactions.objects.select_for_update().get(id=transaction_id)
+        meta = txn.metadata or {}
+        if meta.get("refunded") is True:
+            return txn
+        wallet = CryptoWallets.objects.select_for_update().filter(id=meta.get("from_wallet_id")).first()
+        if wallet:
+            wallet.balance += txn.amount
+            wallet.save()
+            TransactionService._record_movement(txn, wallet.user_id, 'crypto', txn.amount, 'credit', created_at=timezone.now())
+            meta["refunded"] = True
+        txn.status = "failed"
+        txn.metadata = meta
+        txn.save()
+        return txn
+
+    @staticmethod
+    @transaction.atomic
+    def credit_rub_deposit(transaction_id, user_id, crypto_amount):
+        """Зачисление USDT по оплаченной RUB-заявке (подтверждено у провайдера); повторный webhook ничего не меняет."""
+        txn = Transactions.objects.select_for_update().get(id=transaction_id)
+        if txn.status == "success":
+            return txn
+        txn.status = "success"
+        if crypto_amount and user_id:
+            amount = Decimal(str(crypto_amount))
+            wallet = CryptoWallets.objects.select_for_update().filter(user_id=str(user_id), token="USDT").first()
+            if wallet:
+                wallet.balance += amount
+                wallet.save()
+                TransactionService._record_movement(txn, wallet.user_id, 'crypto', amount, 'credit', created_at=timezone.now())
+                txn.metadata = {**(txn.metadata or {}), "credited_crypto_amount": str(amount)}
+        txn.save()
+        return txn
+
     @staticmethod
     def get_transaction_receipt(transaction_id, user_id=None):
-        txn = Transactions.objects.get(id=transaction_id)
-        
+        txn = Transactions.objects.select_related('receipt').get(id=transaction_id)
+
         viewer_id = str(user_id) if user_id else str(txn.user_id)
         if txn.sender_id == viewer_id and txn.receiver_id == viewer_id:
             direction = 'internal'
@@ -1066,23 +1651,23 @@ class TransactionService:
         else:
             direction = 'outbound'
 
+        payload = ReceiptStore.get_or_build(txn)
+        # направление зависит от зрителя, поэтому накладывается при чтении
+        result = dict(payload)
+        result["direction"] = direction
+        result["receipt"] = dict(payload["receipt"])
+        result["receipt"]["transaction"] = dict(payload["receipt"]["transaction"], direction=direction)
+        return result
+
+    @staticmethod
+    def _build_receipt(txn):
+        """Квитанция без учёта зрителя (direction = None)."""
+        direction = None
+
         # Avatars
-        sender_avatar = None
-        receiver_avatar = None
-        try:
-            if txn.sender_id and txn.sender_id != 'EXTERNAL':
-                sp = Profiles.objects.filter(user_id=txn.sender_id).first()
-                if sp and sp.avatar_url:
-                    sender_avatar = sp.avatar_url
-        except Exception:
-            pass
-        try:
-            if txn.receiver_id and txn.receiver_id != 'EXTERNAL':
-                rp = Profiles.objects.filter(user_id=txn.receiver_id).first()
-                if rp and rp.avatar_url:
-                    receiver_avatar = rp.avatar_url
-        except Exception:
-            pass
+        parties = identity.get_many([txn.sender_id, txn.receiver_id])
+        sender_avatar = parties.get(txn.sender_id, identity.UNKNOWN_IDENTITY).avatar_url
+        receiver_avatar = parties.get(txn.receiver_id, identity.UNKNOWN_IDENTITY).avatar_url
 
         meta = txn.metadata or {}
 
@@ -1334,4 +1919,55 @@ class TransactionService:
 
         result = dict(flat)
         result["receipt"] = structured
-        return result
\ No newline at end of file
+        return result
+
+
+class ReceiptStore:
+    """Хранилище собранных квитанций: сборка один раз при финальном статусе, пересборка при смене статуса/metadata."""
+    FINAL_STATUSES = ('completed', 'success', 'failed', 'refunded', 'cancelled')
+
+    @staticmethod
+    def metadata_hash(txn):
+        raw = json.dumps(txn.metadata or {}, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    @staticmethod
+    def _stored(txn):
+        try:
+            stored = txn.receipt
+        except TransactionReceipts.DoesNotExist:
+            return None, 'miss'
+        if stored.status != txn.status or stored.metadata_hash != ReceiptStore.metadata_hash(txn):
+            return None, 'stale'
+        return stored.payload, 'hit'
+
+    @staticmethod
+    def _save(txn, payload):
+        try:
+            TransactionReceipts.objects.update_or_create(
+                transaction=txn,
+                defaults={'payload': payload, 'status': txn.status, 'metadata_hash': ReceiptStore.metadata_hash(txn)},
+            )
+        except IntegrityError:
+            # параллельная сборка уже записала квитанцию
+            pass
+
+    @staticmethod
+    def get_or_build(txn):
+        payload, result = ReceiptStore._stored(txn)
+        if payload is None:
+            payload = TransactionService._build_receipt(txn)
+            if txn.status in ReceiptStore.FINAL_STATUSES:
+                ReceiptStore._save(txn, payload)
+        metrics.inc('transaction_receipts_total', result=result)
+        return payload
+
+    @staticmethod
+    def materialize(transaction_id):
+        txn = Transactions.objects.select_related('receipt').filter(id=transaction_id).first()
+        if not txn or txn.status not in ReceiptStore.FINAL_STATUSES:
+            return
+        payload, _ = ReceiptStore._stored(txn)
+        if payload is None:
+            ReceiptStore._save(txn, TransactionService._build_receipt(txn))
+
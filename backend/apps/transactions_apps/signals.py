@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import FeeRevenue, Transactions
+from .services import LimitCounters, ReceiptStore, RevenueRollup
+
+
+@receiver(pre_save, sender=Transactions)
+def remember_limit_usage(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding:
+        instance._limit_entries = []
+        return
+    if update_fields is not None and not LimitCounters.COUNTED_FIELDS.intersection(update_fields):
+        # save(update_fields=...) без учитываемых полей: счётчики не меняются, лишний SELECT не нужен
+        instance._limit_entries = None
+        return
+    previous = Transactions.objects.filter(pk=instance.pk).first()
+    instance._limit_entries = LimitCounters.entries(previous) if previous else []
+
+
+@receiver(post_save, sender=Transactions)
+def update_limit_usage(sender, instance, **kwargs):
+    old_entries = getattr(instance, '_limit_entries', [])
+    if old_entries is None:
+        return
+    new_entries = LimitCounters.entries(instance)
+    if old_entries != new_entries:
+        LimitCounters.apply(old_entries, -1)
+        LimitCounters.apply(new_entries, 1)
+    instance._limit_entries = new_entries
+
+
+@receiver(post_save, sender=Transactions)
+def materialize_receipt(sender, instance, **kwargs):
+    if instance.status not in ReceiptStore.FINAL_STATUSES:
+        return
+    transaction_id = instance.pk
+    # movements и детали операции пишутся в той же транзакции после Transactions
+    transaction.on_commit(lambda: ReceiptStore.materialize(transaction_id))
+
+
+@receiver(post_delete, sender=Transactions)
+def release_limit_usage(sender, instance, **kwargs):
+    LimitCounters.apply(LimitCounters.entries(instance), -1)
+
+
+@receiver(pre_save, sender=FeeRevenue)
+def remember_fee_rollup(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance._rollup_entry = None
+        return
+    instance._rollup_entry = RevenueRollup.entry(FeeRevenue.objects.filter(pk=instance.pk).first())
+
+
+@receiver(post_save, sender=FeeRevenue)
+def update_fee_rollup(sender, instance, **kwargs):
+    # в той же транзакции БД, что и вставка комиссии: итог и сырые данные не расходятся
+    old_entry = getattr(instance, '_rollup_entry', None)
+    new_entry = RevenueRollup.entry(instance)
+    if old_entry != new_entry:
+        RevenueRollup.apply(old_entry, -1)
+        RevenueRollup.apply(new_entry, 1)
+    instance._rollup_entry = new_entry
+
+
+@receiver(post_delete, sender=FeeRevenue)
+def release_fee_rollup(sender, instance, **kwargs):
+    RevenueRollup.apply(RevenueRollup.entry(instance), -1)
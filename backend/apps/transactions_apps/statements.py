@@ -0,0 +1,313 @@
+import base64
+import csv
+import html
+import io
+import mmap
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Case, DecimalField, F, Q, Sum, When
+
+from core import metrics
+from .models import BankDepositAccounts, CryptoWallets, FundsHolds, LedgerFeed
+
+TZ_UTC_4 = timezone(timedelta(hours=4))
+
+# asset_filter фронтенда -> account_type ленты
+ASSET_ACCOUNT_TYPES = {'card': 'card', 'iban': 'bank', 'bank': 'bank', 'crypto': 'crypto'}
+ACCOUNT_CURRENCIES = {'card': 'AED', 'bank': 'AED', 'crypto': 'USDT'}
+
+FORMATS = {
+    'html': 'text/html',
+    'csv': 'text/csv',
+}
+
+LABELS = {
+    'en': {
+        'title': 'Account statement', 'period': 'Period', 'holder': 'Account holder', 'generated': 'Generated',
+        'account': 'Account', 'opening': 'Opening balance', 'closing': 'Closing balance',
+        'date': 'Date', 'type': 'Type', 'status': 'Status', 'counterparty': 'Counterparty',
+        'description': 'Description', 'amount': 'Amount', 'balance': 'Balance', 'tx_id': 'Transaction ID',
+        'card': 'Cards', 'bank': 'IBAN', 'crypto': 'USDT wallet', 'empty': 'No operations in this period',
+    },
+    'ru': {
+        'title': 'Выписка по счетам', 'period': 'Период', 'holder': 'Владелец', 'generated': 'Сформирована',
+        'account': 'Счёт', 'opening': 'Входящий остаток', 'closing': 'Исходящий остаток',
+        'date': 'Дата', 'type': 'Тип', 'status': 'Статус', 'counterparty': 'Контрагент',
+        'description': 'Описание', 'amount': 'Сумма', 'balance': 'Остаток', 'tx_id': 'ID транзакции',
+        'card': 'Карты', 'bank': 'IBAN', 'crypto': 'USDT кошелёк', 'empty': 'За период операций нет',
+    },
+}
+
+StatementRow = namedtuple('StatementRow', [
+    'created_at', 'account_type', 'direction', 'amount', 'transaction_id',
+    'type', 'status', 'counterparty', 'description',
+])
+
+
+def account_types_for(asset_filter):
+    types = {ASSET_ACCOUNT_TYPES[a] for a in asset_filter or () if a in ASSET_ACCOUNT_TYPES}
+    return sorted(types or set(ASSET_ACCOUNT_TYPES.values()))
+
+
+def period_bounds(start_date, end_date):
+    """Даты YYYY-MM-DD (UTC+4, как на фронтенде) -> [start, end); конец периода включительно."""
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=TZ_UTC_4)
+        end = datetime.strptime(end_date, '%Y-%m-%d').replace(tzinfo=TZ_UTC_4) + timedelta(days=1)
+    except (TypeError, ValueError):
+        raise ValueError("Даты периода ожидаются в формате YYYY-MM-DD")
+    if start >= end:
+        raise ValueError("Начало периода позже конца")
+    return start, end
+
+
+def _signed_amount():
+    return Case(
+        When(direction='debit', then=-F('amount')),
+        default=F('amount'),
+        output_field=DecimalField(max_digits=20, decimal_places=6),
+    )
+
+
+def open_holds(user_id, account_types):
+    """{account_type: сумма открытых резервов}: они уже вычтены из balance, но в ленту попадут только при capture."""
+    source_types = [s for s, t in FundsHolds.ACCOUNT_TYPES.items() if t in account_types]
+    rows = (
+        FundsHolds.objects.filter(user_id=str(user_id), source_type__in=source_types, status__in=FundsHolds.OPEN_STATUSES)
+        .values('source_type')
+        .annotate(total=Sum('amount'))
+    )
+    return {FundsHolds.ACCOUNT_TYPES[row['source_type']]: row['total'] for row in rows}
+
+
+def period_balances(user_id, account_types, start, end):
+    """
+    {account_type: (opening, closing)}: проведённый баланс (текущий + открытые резервы) минус движения
+    ленты после начала и после конца периода — один агрегирующий запрос вместо прохода по истории.
+    """
+    Cards = apps.get_model('cards_apps', 'Cards')
+    sources = {'card': Cards, 'bank': BankDepositAccounts, 'crypto': CryptoWallets}
+    held = open_holds(user_id, account_types)
+    current = {
+        t: (sources[t].objects.filter(user_id=user_id).aggregate(total=Sum('balance'))['total'] or Decimal('0'))
+        + held.get(t, Decimal('0'))
+        for t in account_types
+    }
+    after = {
+        row['account_type']: row
+        for row in LedgerFeed.objects.filter(user_id=user_id, account_type__in=account_types, created_at__gte=start)
+        .values('account_type')
+        .annotate(after_start=Sum(_signed_amount()), after_end=Sum(_signed_amount(), filter=Q(created_at__gte=end)))
+    }
+    balances = {}
+    for t in account_types:
+        row = after.get(t, {})
+        balances[t] = (
+            current[t] - (row.get('after_start') or 0),
+            current[t] - (row.get('after_end') or 0),
+        )
+    return balances
+
+
+def statement_rows(user_id, account_types, start, end):
+    """Строки выписки серверным курсором: память не зависит от длины периода."""
+    queryset = (
+        LedgerFeed.objects.filter(
+            user_id=user_id, account_type__in=account_types, created_at__gte=start, created_at__lt=end,
+        )
+        .order_by('created_at', 'id')
+        .values_list(
+            'created_at', 'account_type', 'direction', 'amount', 'transaction_id',
+            'transaction__type', 'transaction__status', 'transaction__sender_name',
+            'transaction__receiver_name', 'transaction__merchant_name', 'transaction__description',
+        )
+    )
+    chunk_size = getattr(settings, 'STATEMENT_CHUNK_SIZE', 2000)
+    for (created_at, account_type, direction, amount, transaction_id, type_, status,
+         sender_name, receiver_name, merchant_name, description) in queryset.iterator(chunk_size=chunk_size):
+        counterparty = merchant_name or (sender_name if direction == 'credit' else receiver_name) or ''
+        yield StatementRow(
+            created_at, account_type, direction, amount, str(transaction_id),
+            type_, status, counterparty, description or '',
+        )
+
+
+def _with_running_balance(rows, balances):
+    running = {t: opening for t, (opening, _) in balances.items()}
+    for row in rows:
+        running[row.account_type] += row.amount if row.direction == 'credit' else -row.amount
+        yield row, running[row.account_type]
+
+
+def _money(value, account_type):
+    places = 6 if account_type == 'crypto' else 2
+    return f"{value:,.{places}f} {ACCOUNT_CURRENCIES.get(account_type, '')}".strip()
+
+
+def render_html(out, meta, balances, rows, labels):
+    """HTML пишется в out по частям; строки таблицы сбрасываются пачками."""
+    esc = html.escape
+
+    def write(chunk):
+        out.write(chunk.encode())
+
+    write(
+        '<!DOCTYPE html><html><head><meta charset="utf-8">'
+        f'<title>{esc(labels["title"])}</title>'
+        '<style>body{font-family:Arial,sans-serif;color:#0f172a;margin:24px}'
+        'table{border-collapse:collapse;width:100%;font-size:12px;margin-bottom:20px}'
+        'th{background:#f1f5f9;color:#64748b;text-align:left}th,td{padding:6px 8px;border-bottom:1px solid #e2e8f0}'
+        '.credit{color:#16a34a}.debit{color:#dc2626}.num{text-align:right;white-space:nowrap}</style>'
+        '</head><body>'
+        f'<h2>uEasyCard — {esc(labels["title"])}</h2>'
+        f'<p><b>{esc(labels["holder"])}:</b> {esc(meta["user_name"])}<br>'
+        f'<b>{esc(labels["period"])}:</b> {esc(meta["period_label"])}<br>'
+        f'<b>{esc(labels["generated"])}:</b> {esc(meta["generated_at"])}</p>'
+        f'<table><thead><tr><th>{esc(labels["account"])}</th><th class="num">{esc(labels["opening"])}</th>'
+        f'<th class="num">{esc(labels["closing"])}</th></tr></thead><tbody>'
+    )
+    for t, (opening, closing) in balances.items():
+        write(
+            f'<tr><td>{esc(labels.get(t, t))}</td><td class="num">{_money(opening, t)}</td>'
+            f'<td class="num">{_money(closing, t)}</td></tr>'
+        )
+    write(
+        '</tbody></table><table><thead><tr>'
+        + ''.join(f'<th>{esc(labels[k])}</th>' for k in ('date', 'account', 'type', 'status', 'counterparty', 'description'))
+        + f'<th class="num">{esc(labels["amount"])}</th><th class="num">{esc(labels["balance"])}</th>'
+        f'<th>{esc(labels["tx_id"])}</th></tr></thead><tbody>'
+    )
+
+    count = 0
+    buffer = []
+    for row, balance in _with_running_balance(rows, balances):
+        sign = '+' if row.direction == 'credit' else '-'
+        buffer.append(
+            f'<tr><td>{row.created_at.astimezone(TZ_UTC_4).strftime("%d.%m.%Y %H:%M")}</td>'
+            f'<td>{esc(labels.get(row.account_type, row.account_type))}</td><td>{esc(row.type)}</td>'
+            f'<td>{esc(row.status)}</td><td>{esc(row.counterparty)}</td><td>{esc(row.description)}</td>'
+            f'<td class="num {row.direction}">{sign}{_money(row.amount, row.account_type)}</td>'
+            f'<td class="num">{_money(balance, row.account_type)}</td><td>{row.transaction_id}</td></tr>'
+        )
+        count += 1
+        if len(buffer) >= 500:
+            write(''.join(buffer))
+            buffer = []
+    if not count:
+        buffer.append(f'<tr><td colspan="9">{esc(labels["empty"])}</td></tr>')
+    write(''.join(buffer) + '</tbody></table></body></html>')
+    return count
+
+
+def render_csv(out, meta, balances, rows, labels):
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='', write_through=False)
+    writer = csv.writer(text)
+    writer.writerow([labels['holder'], meta['user_name']])
+    writer.writerow([labels['period'], meta['period_label']])
+    writer.writerow([labels['generated'], meta['generated_at']])
+    writer.writerow([labels['account'], labels['opening'], labels['closing'], 'currency'])
+    for t, (opening, closing) in balances.items():
+        writer.writerow([labels.get(t, t), opening, closing, ACCOUNT_CURRENCIES.get(t, '')])
+    writer.writerow([])
+    writer.writerow([
+        labels['date'], labels['account'], labels['type'], labels['status'], labels['counterparty'],
+        labels['description'], labels['amount'], labels['balance'], 'currency', labels['tx_id'],
+    ])
+    count = 0
+    for row, balance in _with_running_balance(rows, balances):
+        writer.writerow([
+            row.created_at.astimezone(TZ_UTC_4).isoformat(), row.account_type, row.type, row.status,
+            row.counterparty, row.description, row.amount if row.direction == 'credit' else -row.amount,
+            balance, ACCOUNT_CURRENCIES.get(row.account_type, ''), row.transaction_id,
+        ])
+        count += 1
+    text.flush()
+    text.detach()  # out остаётся открытым для доставки
+    return count
+
+
+RENDERERS = {
+    'html': render_html,
+    'csv': render_csv,
+}
+
+
+class StatementFile:
+    """Готовая выписка во временном файле; content() — mmap без копии в память, общий для всех каналов."""
+
+    def __init__(self, file, filename, mimetype, rows, period_label=''):
+        self.file = file
+        self.filename = filename
+        self.mimetype = mimetype
+        self.rows = rows
+        self.period_label = period_label
+        self.size = file.seek(0, io.SEEK_END)
+        self._content = None
+
+    def content(self):
+        if self._content is None:
+            self._content = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._content
+
+    def open(self):
+        self.file.seek(0)
+        return self.file
+
+    def close(self):
+        if self._content is not None:
+            self._content.close()
+            self._content = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def from_base64(data, filename=None, mimetype='text/html'):
+    """Готовый файл от клиента (base64) — декодируется один раз во временный файл."""
+    out = tempfile.TemporaryFile(prefix='statement-')
+    base64.decode(io.BytesIO(data.encode() if isinstance(data, str) else data), out)
+    filename = filename or f"uEasyCard_Statement_{datetime.now(TZ_UTC_4).strftime('%Y%m%d')}.html"
+    return StatementFile(out, filename, mimetype, None)
+
+
+def render(meta, balances, rows, fmt='html', lang='en', filename=None):
+    """Отрисовать выписку из итератора строк во временный файл (используется и бенчмарком)."""
+    if fmt not in RENDERERS:
+        raise ValueError(f"Неизвестный формат выписки: {fmt}")
+    labels = LABELS.get(lang, LABELS['en'])
+    started = time.monotonic()
+    out = tempfile.TemporaryFile(prefix='statement-')
+    try:
+        count = RENDERERS[fmt](out, meta, balances, rows, labels)
+        out.flush()
+    except Exception:
+        out.close()
+        raise
+    metrics.observe('statement_generate_seconds', time.monotonic() - started, format=fmt)
+    metrics.inc('statement_rows_total', count, format=fmt)
+    filename = filename or f"uEasyCard_Statement_{datetime.now(TZ_UTC_4).strftime('%Y%m%d')}.{fmt}"
+    return StatementFile(out, filename, FORMATS[fmt], count, meta['period_label'])
+
+
+def generate(user_id, start_date, end_date, asset_filter=None, fmt='html', lang='en', user_name='', filename=None):
+    """Выписка пользователя за период по выбранным активам с входящим и исходящим остатком."""
+    user_id = str(user_id)
+    start, end = period_bounds(start_date, end_date)
+    account_types = account_types_for(asset_filter)
+    meta = {
+        'user_name': user_name,
+        'period_label': f"{start.strftime('%d.%m.%Y')} — {(end - timedelta(days=1)).strftime('%d.%m.%Y')}",
+        'generated_at': datetime.now(TZ_UTC_4).strftime('%d.%m.%Y %H:%M'),
+    }
+    balances = period_balances(user_id, account_types, start, end)
+    return render(meta, balances, statement_rows(user_id, account_types, start, end), fmt, lang, filename)
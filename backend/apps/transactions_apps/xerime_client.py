@@ -1,56 +1,187 @@
+import asyncio
+import random
+import threading
+import time
+import httpx
 import requests
 import logging
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.core.cache import cache
+from datetime import timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from core import metrics
+from .models import ProviderTokens
 import uuid
 
 logger = logging.getLogger(__name__)
 
-class XerimeClient:    
+
+class ProviderRejected(ValueError):
+    """Провайдер точно не принял заявку: отклонил её (400/422) или запрос не отправлялся (circuit open)."""
+
+
+def _error_detail(response, default):
+    try:
+        return response.json().get('detail') or default
+    except ValueError:
+        return default
+
+
+class CircuitBreaker:
+    """closed -> open после N сбоев подряд; через reset_timeout пропускает пробный запрос (half-open)."""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+        metrics.set_gauge('xerime_circuit_open', 0)
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.error(f"XerimeAPI circuit opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+        if self.opened_at is not None:
+            metrics.set_gauge('xerime_circuit_open', 1)
+
+
+class XerimeClient:
+    RETRY_METHODS = ('GET',)
+    RETRY_STATUSES = (429, 502, 503, 504)
+    BACKOFF_BASE = 0.2
+    BACKOFF_MAX = 2.0
+
+    _session = None
+    _session_lock = threading.Lock()
+    _breaker = CircuitBreaker(
+        failure_threshold=getattr(settings, 'XERIME_CIRCUIT_FAILURES', 5),
+        reset_timeout=getattr(settings, 'XERIME_CIRCUIT_RESET', 30),
+    )
+
     @classmethod
     def get_base_url(cls):
         return getattr(settings, 'XERIME_API_URL', 'https://api.xerime.com/xerimeAPI/api/v2').rstrip('/')
 
     @classmethod
-    def login(cls):
-        url = f"{cls.get_base_url()}/login"
+    def get_session(cls):
+        """Общая keep-alive сессия процесса: соединения к провайдеру переиспользуются между вызовами."""
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    pool_size = getattr(settings, 'XERIME_POOL_SIZE', 10)
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    cls._session = session
+        return cls._session
+
+    @classmethod
+    def _request(cls, method, path, endpoint, auth=True, **kwargs):
+        """
+        Единая точка HTTP-вызовов: circuit breaker, повтор идемпотентных GET с jitter-backoff,
+        один повтор с новым токеном на 401, метрики по endpoint.
+        """
+        # токен до allow(): логин сам идёт через breaker и в half-open не должен упереться в наш пробный запрос
+        token = cls.get_token() if auth else None
+        if not cls._breaker.allow():
+            metrics.inc('xerime_errors_total', endpoint=endpoint, kind='circuit_open')
+            raise ProviderRejected("Провайдер временно недоступен, попробуйте позже.")
+
+        url = f"{cls.get_base_url()}{path}"
+        timeout = (getattr(settings, 'XERIME_CONNECT_TIMEOUT', 3), getattr(settings, 'XERIME_TIMEOUT', 15))
+        max_attempts = 1 + (getattr(settings, 'XERIME_MAX_RETRIES', 2) if method in cls.RETRY_METHODS else 0)
+        attempt = 0
+        token_refreshed = False
+
+        while True:
+            attempt += 1
+            headers = {"Authorization": f"Bearer {token}"} if auth else {}
+            started = time.monotonic()
+            try:
+                response = cls.get_session().request(method, url, headers=headers, timeout=timeout, **kwargs)
+            except requests.RequestException as e:
+                metrics.observe('xerime_request_seconds', time.monotonic() - started, endpoint=endpoint)
+                metrics.inc('xerime_errors_total', endpoint=endpoint, kind=type(e).__name__)
+                cls._breaker.record_failure()
+                if attempt < max_attempts and cls._breaker.allow():
+                    cls._sleep_backoff(attempt)
+                    continue
+                raise
+            metrics.observe('xerime_request_seconds', time.monotonic() - started, endpoint=endpoint)
+            metrics.inc('xerime_requests_total', endpoint=endpoint, status=response.status_code)
+
+            if response.status_code >= 500 or response.status_code == 429:
+                cls._breaker.record_failure()
+                if response.status_code in cls.RETRY_STATUSES and attempt < max_attempts and cls._breaker.allow():
+                    cls._sleep_backoff(attempt)
+                    continue
+                return response
+            cls._breaker.record_success()
+            if response.status_code == 401 and auth and not token_refreshed:
+                token_refreshed = True
+                attempt -= 1
+                token = XerimeTokenManager.refresh(stale_token=token)
+                continue
+            return response
+
+    @classmethod
+    def _sleep_backoff(cls, attempt):
+        time.sleep(random.uniform(0, min(cls.BACKOFF_MAX, cls.BACKOFF_BASE * (2 ** attempt))))
+
+    @classmethod
+    def fetch_token(cls):
+        """HTTP-логин у провайдера: (token, expires_in). Напрямую не вызывать — только через XerimeTokenManager."""
         username = getattr(settings, 'XERIME_USERNAME', '')
         password = getattr(settings, 'XERIME_PASSWORD', '')
         
         try:
-            response = requests.post(url, json={"username": username, "password": password}, timeout=10)
+            response = cls._request('POST', '/login', 'login', auth=False, json={"username": username, "password": password})
             response.raise_for_status()
             data = response.json()
-            
-            token = data.get('access_token')
-            expires_in = data.get('expires_in', 86400)
-            cache.set('xerime_jwt_token', token, timeout=expires_in - 300)
-            return token
+            return data.get('access_token'), data.get('expires_in', 86400)
         except requests.RequestException as e:
             logger.error(f"XerimeAPI Login Error: {e}")
             raise ValueError("Не удалось авторизоваться в провайдере криптокошельков.")
 
+    @classmethod
+    def login(cls):
+        """Принудительно обновить токен (один логин на все воркеры)."""
+        return XerimeTokenManager.refresh(stale_token=XerimeTokenManager._token)
+
     @classmethod
     def get_token(cls):
-        token = cache.get('xerime_jwt_token')
-        if not token:
-            token = cls.login()
-        return token
+        return XerimeTokenManager.get()
 
     @classmethod
     def get_merchant_wallets(cls, merchant_id, merchant_name):
-        token = cls.get_token()
-        url = f"{cls.get_base_url()}/merchant-wallets/{merchant_id}"
-        headers = {"Authorization": f"Bearer {token}"}
         params = {"merchant_name": merchant_name}
         
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=15)
-            if response.status_code == 401:
-                token = cls.login()
-                headers["Authorization"] = f"Bearer {token}"
-                response = requests.get(url, headers=headers, params=params, timeout=15)
-                
+            response = cls._request('GET', f"/merchant-wallets/{merchant_id}", 'merchant_wallets', params=params)
             response.raise_for_status()
             return response.json()
             
@@ -60,10 +191,6 @@ class XerimeClient:
 
     @classmethod
     def create_crypto_deposit(cls, merchant_id, merchant_name, email, network, token, amount, tx_hash, wallet_address):
-        token_jwt = cls.get_token()
-        url = f"{cls.get_base_url()}/crypto-deposit"
-        headers = {"Authorization": f"Bearer {token_jwt}"}
-        
         payload = {
             "crypto_amount": float(amount),
             "crypto_currency": token,
@@ -76,7 +203,7 @@ class XerimeClient:
             "review_id": f"R-{uuid.uuid4().hex[:8].upper()}"
         }
             
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
+        response = cls._request('POST', "/crypto-deposit", 'crypto_deposit', json=payload)
         if response.status_code == 409:
             raise ValueError(f"Транзакция с хэшем ({tx_hash}) уже зарегистрирована.")
             
@@ -85,36 +212,24 @@ class XerimeClient:
     
     @classmethod
     def get_transactions_history(cls, merchant_id=None, status=None):
-        token_jwt = cls.get_token()
-        url = f"{cls.get_base_url()}/transactions"
-        headers = {"Authorization": f"Bearer {token_jwt}"}
-        
         params = {}
         if merchant_id:
             params["merchant_id"] = str(merchant_id)
         if status:
             params["status"] = status
             
-        response = requests.get(url, headers=headers, params=params, timeout=15)
+        response = cls._request('GET', "/transactions", 'transactions', params=params)
         response.raise_for_status()
         return response.json()
     
     @classmethod
     def get_transaction_details(cls, reference_id):
-        token_jwt = cls.get_token()
-        url = f"{cls.get_base_url()}/transactions/{reference_id}"
-        headers = {"Authorization": f"Bearer {token_jwt}"}
-            
-        response = requests.get(url, headers=headers, timeout=15)
+        response = cls._request('GET', f"/transactions/{reference_id}", 'transaction_details')
         response.raise_for_status()
         return response.json()
 
     @classmethod
     def create_crypto_withdrawal(cls, merchant_id, network, token, amount, destination_address, external_reference):
-        token_jwt = cls.get_token()
-        url = f"{cls.get_base_url()}/crypto-withdrawal"
-        headers = {"Authorization": f"Bearer {token_jwt}"}
-        
         payload = {
             "merchant_id": str(merchant_id),
             "crypto_currency": token,
@@ -124,50 +239,38 @@ class XerimeClient:
             "external_reference": external_reference
         }
             
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
+        response = cls._request('POST', "/crypto-withdrawal", 'crypto_withdrawal', json=payload)
         if response.status_code == 422:
-            raise ValueError("Недостаточно средств для совершения вывода.")
+            raise ProviderRejected("Недостаточно средств для совершения вывода.")
         if response.status_code == 409:
+            # заявка у провайдера уже есть — это не отказ, резерв не возвращаем
             raise ValueError(f"Заявка на вывод с ID {external_reference} уже существует.")
         if response.status_code == 400:
-            err_data = response.json()
-            raise ValueError(f"Ошибка параметров вывода: {err_data.get('detail', 'Неверная сеть или токен')}")
+            raise ProviderRejected(f"Ошибка параметров вывода: {_error_detail(response, 'Неверная сеть или токен')}")
             
         response.raise_for_status()
         return response.json()
 
     @classmethod
     def get_crypto_withdrawals_history(cls, merchant_id=None, status=None):
-        token_jwt = cls.get_token()
-        url = f"{cls.get_base_url()}/crypto-withdrawals"
-        headers = {"Authorization": f"Bearer {token_jwt}"}
-        
         params = {}
         if merchant_id:
             params["merchant_id"] = str(merchant_id)
         if status:
             params["status"] = status
             
-        response = requests.get(url, headers=headers, params=params, timeout=15)
+        response = cls._request('GET', "/crypto-withdrawals", 'crypto_withdrawals', params=params)
         response.raise_for_status()
         return response.json()
 
     @classmethod
     def get_crypto_withdrawal_details(cls, reference_id):
-        token_jwt = cls.get_token()
-        url = f"{cls.get_base_url()}/crypto-withdrawals/{reference_id}"
-        headers = {"Authorization": f"Bearer {token_jwt}"}
-            
-        response = requests.get(url, headers=headers, timeout=15)
+        response = cls._request('GET', f"/crypto-withdrawals/{reference_id}", 'crypto_withdrawal_details')
         response.raise_for_status()
         return response.json()
 
     @classmethod
     def create_rub_to_crypto_deposit(cls, merchant_id, amount_rub, crypto_currency="USDT", webhook_url=None):
-        token_jwt = cls.get_token()
-        url = f"{cls.get_base_url()}/rub-to-crypto"
-        headers = {"Authorization": f"Bearer {token_jwt}"}
-        
         payload = {
             "rub_amount": float(amount_rub),
             "crypto_currency": crypto_currency,
@@ -177,75 +280,273 @@ class XerimeClient:
         if webhook_url:
             payload["webhook_url"] = webhook_url
             
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
+        response = cls._request('POST', "/rub-to-crypto", 'rub_to_crypto', json=payload)
         response.raise_for_status()
         return response.json()
 
     @classmethod
     def get_exchange_rate(cls, from_currency, to_currency):
-        token_jwt = cls.get_token()
-        url = f"{cls.get_base_url()}/rates/{from_currency}/{to_currency}"
-        headers = {"Authorization": f"Bearer {token_jwt}"}
-        response = requests.get(url, headers=headers, timeout=15)
+        response = cls._request('GET', f"/rates/{from_currency}/{to_currency}", 'rates')
         response.raise_for_status()
         return response.json()
 
     @classmethod
     def register_aed_recipient(cls, merchant_id, business_name, iban=None):
-        token_jwt = cls.get_token()
-        url = f"{cls.get_base_url()}/aed-recipients"
-        headers = {"Authorization": f"Bearer {token_jwt}"}
         payload = {
             "merchant_id": str(merchant_id),
             "business_name": business_name,
         }
         if iban:
             payload["iban"] = iban
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
+        response = cls._request('POST', "/aed-recipients", 'aed_recipients', json=payload)
         response.raise_for_status()
         return response.json()
 
     @classmethod
     def create_fiat_deposit(cls, merchant_id, amount, currency="AED"):
-        token_jwt = cls.get_token()
-        url = f"{cls.get_base_url()}/fiat-deposit"
-        headers = {"Authorization": f"Bearer {token_jwt}"}
         payload = {
             "merchant_id": str(merchant_id),
             "fiat_amount": float(amount),
             "fiat_currency": currency,
             "deposit_reference": f"EC-{uuid.uuid4().hex[:8].upper()}"
         }
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
+        response = cls._request('POST', "/fiat-deposit", 'fiat_deposit', json=payload)
         response.raise_for_status()
         return response.json()
 
     @classmethod
-    def create_fiat_withdrawal(cls, merchant_id, amount, iban, currency="AED"):
-        token_jwt = cls.get_token()
-        url = f"{cls.get_base_url()}/fiat-withdrawal"
-        headers = {"Authorization": f"Bearer {token_jwt}"}
+    def create_fiat_withdrawal(cls, merchant_id, amount, iban, currency="AED", external_reference=None):
         payload = {
             "merchant_id": str(merchant_id),
             "fiat_amount": float(amount),
             "fiat_currency": currency,
             "iban": iban,
-            "external_reference": f"FW-{uuid.uuid4().hex[:12].upper()}"
+            "external_reference": external_reference or f"FW-{uuid.uuid4().hex[:12].upper()}"
         }
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
+        response = cls._request('POST', "/fiat-withdrawal", 'fiat_withdrawal', json=payload)
         if response.status_code == 422:
-            raise ValueError("Недостаточно AED на балансе провайдера.")
+            raise ProviderRejected("Недостаточно AED на балансе провайдера.")
         if response.status_code == 400:
-            raise ValueError(response.json().get("detail", "Неверные параметры IBAN или перевода."))
+            raise ProviderRejected(_error_detail(response, "Неверные параметры IBAN или перевода."))
             
         response.raise_for_status()
         return response.json()
 
     @classmethod
     def get_merchant_balances(cls, merchant_id):
-        token_jwt = cls.get_token()
-        url = f"{cls.get_base_url()}/merchant-balances/{str(merchant_id)}"
-        headers = {"Authorization": f"Bearer {token_jwt}"}
-        response = requests.get(url, headers=headers, timeout=15)
+        response = cls._request('GET', f"/merchant-balances/{merchant_id}", 'merchant_balances')
         response.raise_for_status()
-        return response.json()
\ No newline at end of file
+        return response.json()
+
+
+class XerimeTokenManager:
+    """
+    Токен Xerime, общий для всех воркеров (таблица provider_tokens).
+    Обновление single-flight: внутри процесса — threading.Lock, между процессами — select_for_update строки.
+    За REFRESH_AHEAD секунд до истечения один вызывающий обновляет токен заранее, остальные продолжают со старым.
+    """
+    PROVIDER = 'xerime'
+
+    _lock = threading.Lock()
+    _token = None
+    _expires_at = None
+
+    @classmethod
+    def _refresh_ahead(cls):
+        return timedelta(seconds=getattr(settings, 'XERIME_TOKEN_REFRESH_AHEAD', 300))
+
+    @classmethod
+    def _fresh(cls, token, expires_at, now):
+        return bool(token) and expires_at is not None and expires_at - now > cls._refresh_ahead()
+
+    @classmethod
+    def _remember(cls, token, expires_at):
+        cls._token = token
+        cls._expires_at = expires_at
+
+    @classmethod
+    def get(cls):
+        if cls._fresh(cls._token, cls._expires_at, timezone.now()):
+            return cls._token
+        with cls._lock:
+            now = timezone.now()
+            if cls._fresh(cls._token, cls._expires_at, now):
+                return cls._token
+            row = ProviderTokens.objects.filter(provider=cls.PROVIDER).first()
+            if row and cls._fresh(row.token, row.expires_at, now):
+                cls._remember(row.token, row.expires_at)
+                return row.token
+            if row and row.token and row.expires_at > now:
+                # токен ещё действует: обновляет тот, кто первым взял строку, остальные не ждут
+                return cls._refresh_locked(stale_token=None, fallback=row)
+            return cls._refresh_locked(stale_token=None)
+
+    @classmethod
+    def refresh(cls, stale_token):
+        """Обновить после 401: логин только если в БД всё ещё тот же (отклонённый) токен."""
+        with cls._lock:
+            if cls._token and cls._token != stale_token and cls._expires_at > timezone.now():
+                return cls._token
+            return cls._refresh_locked(stale_token=stale_token)
+
+    @classmethod
+    def _refresh_locked(cls, stale_token, fallback=None):
+        if connection.in_atomic_block:
+            # внутри транзакции вызывающего select_for_update стал бы savepoint'ом: строка держалась бы
+            # до его commit, а откат потерял бы новый токен — обновляем на отдельном соединении
+            return cls._on_own_connection(cls._refresh_locked, stale_token, fallback)
+        with transaction.atomic():
+            ProviderTokens.objects.get_or_create(
+                provider=cls.PROVIDER, defaults={'token': '', 'expires_at': timezone.now()}
+            )
+            row = ProviderTokens.objects.select_for_update(skip_locked=fallback is not None).filter(
+                provider=cls.PROVIDER
+            ).first()
+            if row is None:
+                cls._remember(fallback.token, fallback.expires_at)
+                return fallback.token
+
+            now = timezone.now()
+            if fallback is not None:
+                already_refreshed = cls._fresh(row.token, row.expires_at, now)
+            else:
+                already_refreshed = bool(row.token) and row.token != stale_token and row.expires_at > now
+            if already_refreshed:
+                # пока ждали блокировку, токен обновил другой воркер
+                cls._remember(row.token, row.expires_at)
+                return row.token
+
+            token, expires_in = XerimeClient.fetch_token()
+            row.token = token
+            row.expires_at = now + timedelta(seconds=int(expires_in))
+            row.save(update_fields=['token', 'expires_at', 'updated_at'])
+            metrics.inc('xerime_token_refresh_total', reason='proactive' if fallback else ('unauthorized' if stale_token else 'expired'))
+            cls._remember(row.token, row.expires_at)
+            return token
+
+    @staticmethod
+    def _on_own_connection(func, *args):
+        """Выполнить func в отдельном потоке: у него своё соединение с БД и своя транзакция."""
+        result, errors = [], []
+
+        def run():
+            try:
+                result.append(func(*args))
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run, name='xerime-token-refresh')
+        thread.start()
+        thread.join()
+        if errors:
+            raise errors[0]
+        return result[0]
+
+
+class AsyncXerimeClient:
+    """
+    Неблокирующие read-only вызовы Xerime для async-представлений.
+    Circuit breaker и токен общие с XerimeClient; httpx.AsyncClient — один на event loop воркера.
+    """
+
+    _client = None
+    _client_loop = None
+
+    @classmethod
+    def get_client(cls):
+        loop = asyncio.get_running_loop()
+        if cls._client is None or cls._client_loop is not loop:
+            pool_size = getattr(settings, 'XERIME_POOL_SIZE', 10)
+            cls._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(getattr(settings, 'XERIME_TIMEOUT', 15), connect=getattr(settings, 'XERIME_CONNECT_TIMEOUT', 3)),
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+            cls._client_loop = loop
+        return cls._client
+
+    @classmethod
+    async def get_token(cls):
+        manager = XerimeTokenManager
+        if manager._fresh(manager._token, manager._expires_at, timezone.now()):
+            return manager._token
+        return await sync_to_async(manager.get)()
+
+    @classmethod
+    async def _request(cls, method, path, endpoint, **kwargs):
+        """Те же правила, что у XerimeClient._request: breaker, повтор GET с jitter-backoff, повтор на 401."""
+        breaker = XerimeClient._breaker
+        token = await cls.get_token()
+        if not breaker.allow():
+            metrics.inc('xerime_errors_total', endpoint=endpoint, kind='circuit_open')
+            raise ProviderRejected("Провайдер временно недоступен, попробуйте позже.")
+
+        url = f"{XerimeClient.get_base_url()}{path}"
+        max_attempts = 1 + (getattr(settings, 'XERIME_MAX_RETRIES', 2) if method in XerimeClient.RETRY_METHODS else 0)
+        attempt = 0
+        token_refreshed = False
+
+        while True:
+            attempt += 1
+            started = time.monotonic()
+            try:
+                response = await cls.get_client().request(method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+            except httpx.HTTPError as e:
+                metrics.observe('xerime_request_seconds', time.monotonic() - started, endpoint=endpoint)
+                metrics.inc('xerime_errors_total', endpoint=endpoint, kind=type(e).__name__)
+                breaker.record_failure()
+                if attempt < max_attempts and breaker.allow():
+                    await cls._sleep_backoff(attempt)
+                    continue
+                raise
+            metrics.observe('xerime_request_seconds', time.monotonic() - started, endpoint=endpoint)
+            metrics.inc('xerime_requests_total', endpoint=endpoint, status=response.status_code)
+
+            if response.status_code >= 500 or response.status_code == 429:
+                breaker.record_failure()
+                if response.status_code in XerimeClient.RETRY_STATUSES and attempt < max_attempts and breaker.allow():
+                    await cls._sleep_backoff(attempt)
+                    continue
+                return response
+            breaker.record_success()
+            if response.status_code == 401 and not token_refreshed:
+                token_refreshed = True
+                attempt -= 1
+                token = await sync_to_async(XerimeTokenManager.refresh)(stale_token=token)
+                continue
+            return response
+
+    @classmethod
+    async def _sleep_backoff(cls, attempt):
+        await asyncio.sleep(random.uniform(0, min(XerimeClient.BACKOFF_MAX, XerimeClient.BACKOFF_BASE * (2 ** attempt))))
+
+    @classmethod
+    async def get_transactions_history(cls, merchant_id=None, status=None):
+        params = {}
+        if merchant_id:
+            params["merchant_id"] = str(merchant_id)
+        if status:
+            params["status"] = status
+
+        response = await cls._request('GET', "/transactions", 'transactions', params=params)
+        response.raise_for_status()
+        return response.json()
+
+    @classmethod
+    async def get_transaction_details(cls, reference_id):
+        response = await cls._request('GET', f"/transactions/{reference_id}", 'transaction_details')
+        response.raise_for_status()
+        return response.json()
+
+    @classmethod
+    async def get_exchange_rate(cls, from_currency, to_currency):
+        response = await cls._request('GET', f"/rates/{from_currency}/{to_currency}", 'rates')
+        response.raise_for_status()
+        return response.json()
+
+    @classmethod
+    async def get_merchant_balances(cls, merchant_id):
+        response = await cls._request('GET', f"/merchant-balances/{merchant_id}", 'merchant_balances')
+        response.raise_for_status()
+        return response.json()
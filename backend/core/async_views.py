@@ -0,0 +1,61 @@
+import inspect
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView с async-обработчиками для прокси к внешним API под ASGI.
+    Аутентификация и permissions (синхронные, с БД) выполняются через sync_to_async,
+    ожидание ответа провайдера не занимает поток воркера.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+def stream_content(request, chunks):
+    """
+    Содержимое для StreamingHttpResponse. Под ASGI Django собирает синхронный итератор
+    в список целиком, поэтому там чанки вытягиваются по одному через sync_to_async
+    (в потоке запроса — с тем же соединением БД и серверным курсором).
+    """
+    if not hasattr(request, 'scope'):
+        return chunks
+    iterator = iter(chunks)
+
+    async def pull():
+        try:
+            while True:
+                chunk = await sync_to_async(next)(iterator, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                await sync_to_async(close)()
+
+    return pull()
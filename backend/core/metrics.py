@@ -0,0 +1,68 @@
+import hmac
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_summaries = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        count, total = _summaries.get(key, (0, 0.0))
+        _summaries[key] = (count + 1, total + value)
+
+
+def snapshot():
+    with _lock:
+        return dict(_counters), dict(_gauges), dict(_summaries)
+
+
+def _format(name, labels, value):
+    if labels:
+        label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+        return f"{name}{{{label_str}}} {value}"
+    return f"{name} {value}"
+
+
+def render():
+    counters, gauges, summaries = snapshot()
+    lines = []
+    for (name, labels), value in sorted(counters.items()):
+        lines.append(_format(name, labels, value))
+    for (name, labels), value in sorted(gauges.items()):
+        lines.append(_format(name, labels, value))
+    for (name, labels), (count, total) in sorted(summaries.items()):
+        lines.append(_format(f"{name}_count", labels, count))
+        lines.append(_format(f"{name}_sum", labels, round(total, 6)))
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """Счётчики процесса в текстовом формате Prometheus. Без METRICS_TOKEN эндпоинт выключен."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return HttpResponse(status=404)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return HttpResponse(status=403)
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4")
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 from datetime import timedelta
@@ -87,8 +88,20 @@ TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN', default='')
 WAHA_API_URL = config('WAHA_API_URL', default='http://localhost:3000')
 WAHA_SESSION_NAME = config('WAHA_SESSION_NAME', default='default')
 WHATSAPP_API_KEY = config('WHATSAPP_API_KEY', default='5f0ed637143a4fddac67e3108cfd80ed')
+WAHA_CONFIG_TTL = config('WAHA_CONFIG_TTL', default=60, cast=int)
+WAHA_POOL_SIZE = config('WAHA_POOL_SIZE', default=4, cast=int)
+WAHA_CONNECT_TIMEOUT = config('WAHA_CONNECT_TIMEOUT', default=3, cast=float)
+WAHA_TIMEOUT = config('WAHA_TIMEOUT', default=30, cast=float)
+WAHA_QUEUE_MAX = config('WAHA_QUEUE_MAX', default=100, cast=int)
+WAHA_RATE_PER_SECOND = config('WAHA_RATE_PER_SECOND', default=2.0, cast=float)
+WAHA_RECIPIENT_INTERVAL = config('WAHA_RECIPIENT_INTERVAL', default=1.0, cast=float)
+ADMIN_ROUTING_TTL = config('ADMIN_ROUTING_TTL', default=300, cast=int)
+ADMIN_NOTIFY_MUTED_ACTIONS = config(
+    'ADMIN_NOTIFY_MUTED_ACTIONS', default='LOGIN,ADMIN_PANEL_LOGIN,VIEW_TRANSACTION_HISTORY',
+    cast=lambda v: {a.strip() for a in v.split(',') if a.strip()},
+)
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
 EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
@@ -102,6 +115,11 @@ TRANSACTION_EMAIL_USE_TLS = config('TRANSACTION_EMAIL_USE_TLS', default=EMAIL_US
 TRANSACTION_EMAIL_HOST_USER = config('TRANSACTION_EMAIL_HOST_USER', default=EMAIL_HOST_USER)
 TRANSACTION_EMAIL_HOST_PASSWORD = config('TRANSACTION_EMAIL_HOST_PASSWORD', default=EMAIL_HOST_PASSWORD)
 
+# пул SMTP: одно соединение на аккаунт, общий темп отправки
+EMAIL_RATE_PER_SECOND = config('EMAIL_RATE_PER_SECOND', default=5.0, cast=float)
+EMAIL_RATE_BURST = config('EMAIL_RATE_BURST', default=10, cast=int)
+EMAIL_IDLE_TIMEOUT = config('EMAIL_IDLE_TIMEOUT', default=60, cast=int)
+
 AI_SERVICE_TOKEN = config('AI_SERVICE_TOKEN', default='SuperSecretAiBotToken_2026_EasyCard_XYZD_DFMC_GH4J_45JFO_3468_DJO')
 
 SIMPLE_JWT = {
@@ -151,11 +169,88 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
 
 # --- XERIME API CONFIG ---
 XERIME_API_URL = config('XERIME_API_URL', default='https://api.xerime.com/xerimeAPI/api/v2')
 XERIME_USERNAME = config('XERIME_USERNAME', default='your_username')
 XERIME_PASSWORD = config('XERIME_PASSWORD', default='your_password')
+XERIME_CONNECT_TIMEOUT = config('XERIME_CONNECT_TIMEOUT', default=3, cast=float)
+XERIME_TIMEOUT = config('XERIME_TIMEOUT', default=15, cast=float)
+XERIME_MAX_RETRIES = config('XERIME_MAX_RETRIES', default=2, cast=int)
+XERIME_POOL_SIZE = config('XERIME_POOL_SIZE', default=10, cast=int)
+XERIME_CIRCUIT_FAILURES = config('XERIME_CIRCUIT_FAILURES', default=5, cast=int)
+XERIME_CIRCUIT_RESET = config('XERIME_CIRCUIT_RESET', default=30, cast=int)
+XERIME_TOKEN_REFRESH_AHEAD = config('XERIME_TOKEN_REFRESH_AHEAD', default=300, cast=int)
+
+# --- CACHE ---
+# кэш общий для всех воркеров gunicorn: отзыв токена (auth_cache), версии настроек и identity видны сразу везде.
+# без CACHE_REDIS_URL — LocMem в каждом процессе (dev/тесты): logout дойдёт только до одного воркера,
+# поэтому проверенный токен там кэшируется на считанные секунды
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': 'easycard',
+        },
+    }
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# --- SETTINGS SNAPSHOT / METRICS ---
+SETTINGS_CACHE_TTL = config('SETTINGS_CACHE_TTL', default=60, cast=int)
+SETTINGS_CACHE_MAX_USERS = config('SETTINGS_CACHE_MAX_USERS', default=10000, cast=int)
+# /metrics/ отдаётся только с Authorization: Bearer <METRICS_TOKEN>; пустой токен — эндпоинт выключен
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+IDENTITY_CACHE_TTL = config('IDENTITY_CACHE_TTL', default=300, cast=int)
+IDENTITY_CACHE_MAX_USERS = config('IDENTITY_CACHE_MAX_USERS', default=10000, cast=int)
+AUTH_TOKEN_CACHE_TTL = config('AUTH_TOKEN_CACHE_TTL', default=300 if CACHE_REDIS_URL else 5, cast=int)
+AUTH_NEGATIVE_CACHE_TTL = config('AUTH_NEGATIVE_CACHE_TTL', default=60, cast=int)
+APOFIZ_SYNC_TTL = config('APOFIZ_SYNC_TTL', default=300, cast=int)
+APOFIZ_POOL_SIZE = config('APOFIZ_POOL_SIZE', default=100, cast=int)
+APOFIZ_CONNECT_TIMEOUT = config('APOFIZ_CONNECT_TIMEOUT', default=3, cast=float)
+STATEMENT_CHUNK_SIZE = config('STATEMENT_CHUNK_SIZE', default=2000, cast=int)
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+FEE_ROLLUP_SHARDS = config('FEE_ROLLUP_SHARDS', default=8, cast=int)
+
+# --- REALTIME BROADCAST ---
+REALTIME_WEBHOOK_SECRET = config('REALTIME_WEBHOOK_SECRET', default='')
+REALTIME_QUEUE_MAX = config('REALTIME_QUEUE_MAX', default=5000, cast=int)
+REALTIME_BATCH_SIZE = config('REALTIME_BATCH_SIZE', default=100, cast=int)
+REALTIME_FLUSH_INTERVAL = config('REALTIME_FLUSH_INTERVAL', default=0.25, cast=float)
+REALTIME_SEND_TIMEOUT = config('REALTIME_SEND_TIMEOUT', default=15, cast=float)
+
+# --- OUTBOX ---
+# выполненные события храним столько дней, дальше run_outbox_worker их удаляет (dead не трогаем)
+OUTBOX_DONE_RETENTION_DAYS = config('OUTBOX_DONE_RETENTION_DAYS', default=7, cast=int)
+
+# --- CHANNELS (WebSocket ledger push) ---
+# без CHANNEL_REDIS_URL — in-memory слой (один процесс, тесты); для нескольких воркеров/нод нужен Redis.
+# WEB_CONCURRENCY — число воркеров gunicorn (entrypoint.sh): с in-memory слоем событие из одного воркера
+# не дошло бы до сокетов в других, поэтому такая конфигурация не запускается
+CHANNEL_REDIS_URL = config('CHANNEL_REDIS_URL', default='')
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+if CHANNEL_REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [CHANNEL_REDIS_URL],
+                'capacity': config('CHANNEL_LAYER_CAPACITY', default=100, cast=int),
+                'expiry': 10,
+            },
+        },
+    }
+elif WEB_CONCURRENCY > 1:
+    raise ImproperlyConfigured("CHANNEL_REDIS_URL обязателен при WEB_CONCURRENCY > 1: in-memory channel layer не общий для воркеров")
+else:
+    CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+# --- TRANSACTION LISTS ---
+TRANSACTIONS_PAGE_SIZE = config('TRANSACTIONS_PAGE_SIZE', default=50, cast=int)
+TRANSACTIONS_MAX_PAGE_SIZE = config('TRANSACTIONS_MAX_PAGE_SIZE', default=200, cast=int)
 
 
 # Database
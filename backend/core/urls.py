@@ -6,6 +6,7 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 from core import settings
+from core.metrics import metrics_view
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -25,6 +26,7 @@ schema_view = get_schema_view(
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', include('api.urls')),
+    path('metrics/', metrics_view, name='metrics'),
     path(
       "swagger(?P<format>\.json|\.yaml)",
       schema_view.without_ui(cache_timeout=0),
@@ -1,11 +1,14 @@
 #!/bin/bash
 set -e
 
+# число воркеров gunicorn; settings проверяют, что при нескольких воркерах задан CHANNEL_REDIS_URL
+export WEB_CONCURRENCY="${WEB_CONCURRENCY:-3}"
+
 echo "Applying database migrations..."
 python manage.py migrate --noinput
 
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
-echo "Starting Gunicorn server..."
-exec gunicorn core.wsgi:application --bind 0.0.0.0:8000 --workers 3 --log-level info
\ No newline at end of file
+echo "Starting Gunicorn server (ASGI)..."
+exec gunicorn core.asgi:application --bind 0.0.0.0:8000 --workers "$WEB_CONCURRENCY" --worker-class uvicorn_worker.UvicornWorker --log-level info
\ No newline at end of file
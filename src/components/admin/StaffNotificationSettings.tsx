@@ -23,6 +23,7 @@ interface NotifApiResponse {
   whatsapp_enabled: boolean;
   email_address: string | null;
   email_enabled: boolean;
+  subscribed_actions?: string[];
   push_enabled?: boolean;
   push_token?: string | null;
 }
@@ -1,5 +1,6 @@
+import { useEffect, useRef } from "react";
 import { useNavigate } from "react-router-dom";
-import { Plus, Ban, ArrowUpRight, Clock, CheckCircle, Send, Landmark, CreditCard } from "lucide-react";
+import { Plus, Ban, ArrowUpRight, Clock, CheckCircle, Send, Landmark, CreditCard, Loader2 } from "lucide-react";
 import { UsdtIcon } from "@/components/icons/CryptoIcons";
 import { useTranslation } from "react-i18next";
 import { Transaction, TransactionGroup } from "@/types/transaction";
@@ -9,6 +10,10 @@ interface CardTransactionsListProps {
   onTransactionClick?: (transaction: Transaction) => void;
   walletView?: boolean;
   viewAsUserId?: string;
+  // Cursor pagination: more pages are loaded on scroll or via the "load more" button
+  hasMore?: boolean;
+  isLoadingMore?: boolean;
+  onLoadMore?: () => void;
 }
 
 const getInitial = (name: string) => name.charAt(0).toUpperCase();
@@ -83,9 +88,42 @@ export const CardTransactionsList = ({
   onTransactionClick,
   walletView = false,
   viewAsUserId,
+  hasMore = false,
+  isLoadingMore = false,
+  onLoadMore,
 }: CardTransactionsListProps) => {
   const navigate = useNavigate();
   const { t } = useTranslation();
+  const bottomRef = useRef<HTMLDivElement>(null);
+
+  // Infinite scroll: fetch the next page when the end of the list becomes visible
+  useEffect(() => {
+    if (!hasMore || isLoadingMore || !onLoadMore || !bottomRef.current) return;
+    const observer = new IntersectionObserver(
+      (entries) => {
+        if (entries[0].isIntersecting) onLoadMore();
+      },
+      { threshold: 0.1 }
+    );
+    observer.observe(bottomRef.current);
+    return () => observer.disconnect();
+  }, [hasMore, isLoadingMore, onLoadMore]);
+
+  const loadMore = hasMore && onLoadMore ? (
+    <div ref={bottomRef}>
+      <button
+        onClick={onLoadMore}
+        disabled={isLoadingMore}
+        className="w-full flex items-center justify-center gap-2 py-3 text-primary font-medium"
+      >
+        {isLoadingMore ? (
+          <Loader2 className="w-4 h-4 animate-spin" />
+        ) : (
+          t("transactions.loadMore", "Load more")
+        )}
+      </button>
+    </div>
+  ) : null;
 
 const handleClick = (transaction: Transaction) => {
     if (onTransactionClick) {
@@ -107,6 +145,7 @@ const handleClick = (transaction: Transaction) => {
         <p className="text-muted-foreground text-center text-sm">
           {t("transactions.noTransactions")}
         </p>
+        {loadMore}
       </div>
     );
   }
@@ -550,6 +589,7 @@ const handleClick = (transaction: Transaction) => {
           </div>
         </div>
       ))}
+      {loadMore}
     </div>
   );
 };
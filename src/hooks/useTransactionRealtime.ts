@@ -3,6 +3,10 @@ import { useQueryClient } from "@tanstack/react-query";
 import { supabase } from "@/integrations/supabase/client";
 import { toast } from "sonner";
 import { useTranslation } from "react-i18next";
+import { getAuthToken } from "@/services/api/apiClient";
+
+// Direct backend WebSocket (Django Channels); the Supabase broadcast stays as a fallback
+const LEDGER_WS_URL = import.meta.env.VITE_LEDGER_WS_URL as string | undefined;
 
 /**
  * Subscribes to realtime broadcast channel for transaction updates.
@@ -14,39 +18,81 @@ export const useTransactionRealtime = () => {
   const { t } = useTranslation();
 
   useEffect(() => {
+    // Transactions already delivered over the WebSocket are skipped on the Supabase channel
+    const seen = new Set<string>();
+
+    const handleTransaction = (
+      data: { event?: string; transaction_id?: string; amount?: number | string; currency?: string } | undefined,
+      fromSocket = false,
+    ) => {
+      const alreadySeen = !!data?.transaction_id && seen.has(data.transaction_id);
+      if (alreadySeen && !fromSocket) return;
+      if (fromSocket && data?.transaction_id) seen.add(data.transaction_id);
+
+      // Invalidate all financial data caches
+      queryClient.invalidateQueries({ queryKey: ["cards"] });
+      queryClient.invalidateQueries({ queryKey: ["balance"] });
+      queryClient.invalidateQueries({ queryKey: ["transactions"] });
+      queryClient.invalidateQueries({ queryKey: ["crypto-wallets"] });
+      queryClient.invalidateQueries({ queryKey: ["bankAccounts"] });
+      queryClient.invalidateQueries({ queryKey: ["wallet-summary"] });
+
+      // Show toast notification (once per transaction; later status updates only refresh data)
+      if (alreadySeen) return;
+      if (data?.amount && data?.currency) {
+        const sign = data.event === "transaction_incoming" ? "+" : "";
+        toast.info(
+          t("notifications.newTransaction", "Новая транзакция"),
+          {
+            description: `${sign}${data.amount} ${data.currency}`,
+            duration: 4000,
+          }
+        );
+      } else {
+        toast.info(t("notifications.dataUpdated", "Данные обновлены"), {
+          duration: 3000,
+        });
+      }
+    };
+
     const channel = supabase
       .channel("transaction-updates")
       .on("broadcast", { event: "new_transaction" }, (payload) => {
         console.log("[realtime] New transaction broadcast:", payload);
-
-        // Invalidate all financial data caches
-        queryClient.invalidateQueries({ queryKey: ["cards"] });
-        queryClient.invalidateQueries({ queryKey: ["balance"] });
-        queryClient.invalidateQueries({ queryKey: ["transactions"] });
-        queryClient.invalidateQueries({ queryKey: ["crypto-wallets"] });
-        queryClient.invalidateQueries({ queryKey: ["bankAccounts"] });
-        queryClient.invalidateQueries({ queryKey: ["wallet-summary"] });
-
-        // Show toast notification
-        const data = payload.payload;
-        if (data?.amount && data?.currency) {
-          const sign = data.event === "transaction_incoming" ? "+" : "";
-          toast.info(
-            t("notifications.newTransaction", "Новая транзакция"),
-            {
-              description: `${sign}${data.amount} ${data.currency}`,
-              duration: 4000,
-            }
-          );
-        } else {
-          toast.info(t("notifications.dataUpdated", "Данные обновлены"), {
-            duration: 3000,
-          });
-        }
+        handleTransaction(payload.payload);
       })
       .subscribe();
 
+    let socket: WebSocket | null = null;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+    let retryDelay = 1000;
+    let closed = false;
+
+    const connect = () => {
+      const token = getAuthToken();
+      if (!LEDGER_WS_URL || !token || closed) return;
+      // token goes in Sec-WebSocket-Protocol, not the URL: query strings end up in proxy access logs
+      socket = new WebSocket(LEDGER_WS_URL, ["token", token]);
+      socket.onopen = () => {
+        retryDelay = 1000;
+      };
+      socket.onmessage = (message) => {
+        const data = JSON.parse(message.data);
+        if (data.type === "ledger") handleTransaction(data, true);
+      };
+      socket.onclose = (event) => {
+        // 4401 — token rejected, reconnecting will not help
+        if (closed || event.code === 4401) return;
+        retryTimer = setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      };
+    };
+    connect();
+
     return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      socket?.close();
       supabase.removeChannel(channel);
     };
   }, [queryClient, t]);
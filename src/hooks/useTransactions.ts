@@ -1,14 +1,16 @@
-import { useQuery } from '@tanstack/react-query';
+import { useInfiniteQuery, useQuery } from '@tanstack/react-query';
 import { useMemo } from 'react';
 import { 
   fetchTransactions, 
   fetchTransactionGroups, 
   fetchTransactionById,
   fetchTransactionReceipt,
-  fetchApiTransactionGroups,
-  fetchIbanTransactionGroups,
-  fetchCardTransactionGroups,
-  fetchCryptoTransactionGroups
+  fetchApiTransactionPage,
+  fetchIbanTransactionPage,
+  fetchCardTransactionPage,
+  fetchCryptoTransactionPage,
+  groupTransactionsByDate,
+  TransactionPage
 } from '@/services/api/transactions';
 import { FetchTransactionsParams, TransactionGroup } from '@/types/transaction';
 import { getAuthToken } from '@/services/api/apiClient';
@@ -42,46 +44,70 @@ export const useTransactions = (params?: FetchTransactionsParams) => {
 };
 
 /**
- * Hook to fetch real transactions from API, returns groups
+ * Cursor-paginated API transactions: the first page is fetched on mount,
+ * further pages only on fetchNextPage() (scroll / "load more").
+ * data holds the groups of every page loaded so far.
  */
-export const useApiTransactionGroups = () => {
+const useTransactionPages = (
+  queryKey: readonly unknown[],
+  fetchPage: (cursor?: string | null) => Promise<TransactionPage>
+) => {
   const token = getAuthToken();
-  return useQuery({
-    queryKey: transactionKeys.apiGroups(),
-    queryFn: fetchApiTransactionGroups,
+  const query = useInfiniteQuery({
+    queryKey,
+    queryFn: ({ pageParam }) => fetchPage(pageParam),
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage: TransactionPage) => lastPage.nextCursor,
     enabled: !!token,
     staleTime: 1000 * 60 * 5,
     retry: 1,
   });
+
+  const data = useMemo(
+    () => query.data ? groupTransactionsByDate(query.data.pages.flatMap(page => page.transactions)) : undefined,
+    [query.data]
+  );
+
+  return {
+    ...query,
+    data,
+  };
 };
 
+type PagedQuery = Pick<ReturnType<typeof useTransactionPages>, 'hasNextPage' | 'isFetchingNextPage' | 'fetchNextPage'>;
+
+/**
+ * "Load more" props for CardTransactionsList over one or more paged queries:
+ * the next page is fetched for every query that still has one.
+ */
+export const loadMoreProps = (...queries: PagedQuery[]) => ({
+  hasMore: queries.some(q => q.hasNextPage),
+  isLoadingMore: queries.some(q => q.isFetchingNextPage),
+  onLoadMore: () => {
+    queries.forEach(q => {
+      if (q.hasNextPage && !q.isFetchingNextPage) q.fetchNextPage();
+    });
+  },
+});
+
+/**
+ * Hook to fetch real transactions from API, returns groups
+ */
+export const useApiTransactionGroups = () =>
+  useTransactionPages(transactionKeys.apiGroups(), fetchApiTransactionPage);
+
 /**
  * Hook to fetch crypto-only transactions from API
  */
-export const useCryptoTransactionGroups = () => {
-  const token = getAuthToken();
-  return useQuery({
-    queryKey: transactionKeys.cryptoGroups(),
-    queryFn: fetchCryptoTransactionGroups,
-    enabled: !!token,
-    staleTime: 1000 * 60 * 5,
-    retry: 1,
-  });
-};
+export const useCryptoTransactionGroups = () =>
+  useTransactionPages(transactionKeys.cryptoGroups(), fetchCryptoTransactionPage);
 
 /**
  * Hook to fetch card-related transactions from API
- * Fetches ALL card transactions, then filters client-side by full card number.
+ * Loads card transactions page by page, then filters client-side by full card number.
  */
 export const useCardTransactionGroups = (cardNumber?: string) => {
-  const token = getAuthToken();
-  const query = useQuery<TransactionGroup[]>({
-    queryKey: transactionKeys.cardGroups(),
-    queryFn: () => fetchCardTransactionGroups(),
-    enabled: !!token,
-    staleTime: 1000 * 60 * 5,
-    retry: 1,
-  });
+  const query = useTransactionPages(transactionKeys.cardGroups(), fetchCardTransactionPage);
 
   // Filter client-side by full card number
   const filteredData = useMemo(() => {
@@ -130,16 +156,8 @@ export const useCardTransactionGroups = (cardNumber?: string) => {
 /**
  * Hook to fetch IBAN-only transactions from API
  */
-export const useIbanTransactionGroups = () => {
-  const token = getAuthToken();
-  return useQuery({
-    queryKey: transactionKeys.ibanGroups(),
-    queryFn: fetchIbanTransactionGroups,
-    enabled: !!token,
-    staleTime: 1000 * 60 * 5,
-    retry: 1,
-  });
-};
+export const useIbanTransactionGroups = () =>
+  useTransactionPages(transactionKeys.ibanGroups(), fetchIbanTransactionPage);
 
 /**
  * Hook to fetch transactions grouped by date (mock data)
@@ -12,7 +12,7 @@ import { MobileLayout } from "@/components/layout/MobileLayout";
 import { useWalletSummary, useBankAccounts } from "@/hooks/useCards";
 import { CardTransactionsList } from "@/components/card/CardTransactionsList";
 import { apiRequest } from "@/services/api/apiClient";
-import { useIbanTransactionGroups, useTransactionGroups, useApiTransactionGroups } from "@/hooks/useTransactions";
+import { useIbanTransactionGroups, useTransactionGroups, useApiTransactionGroups, loadMoreProps } from "@/hooks/useTransactions";
 import { Skeleton } from "@/components/ui/skeleton";
 import {
   Drawer,
@@ -72,8 +72,10 @@ const AccountPage = () => {
 
   const [qrOpen, setQrOpen] = useState(false);
   const [sendOpen, setSendOpen] = useState(false);
-  const { data: ibanTxData, isLoading: ibanLoading } = useIbanTransactionGroups();
-  const { data: apiTxData, isLoading: apiLoading } = useApiTransactionGroups();
+  const ibanTxQuery = useIbanTransactionGroups();
+  const apiTxQuery = useApiTransactionGroups();
+  const { data: ibanTxData, isLoading: ibanLoading } = ibanTxQuery;
+  const { data: apiTxData, isLoading: apiLoading } = apiTxQuery;
   const { data: mockData, isLoading: mockLoading } = useTransactionGroups();
   const transactionsLoading = ibanLoading || apiLoading || mockLoading;
 
@@ -509,7 +511,7 @@ const AccountPage = () => {
                   <Skeleton className="h-32 w-full rounded-xl" />
                 </div>
               ) : (
-                <CardTransactionsList groups={transactionGroups} />
+                <CardTransactionsList groups={transactionGroups} {...loadMoreProps(ibanTxQuery, apiTxQuery)} />
               )}
             </motion.div>
           </>
@@ -14,7 +14,7 @@ import { CardTransactionsList } from "@/components/card/CardTransactionsList";
 import { CardMiniature } from "@/components/dashboard/CardMiniature";
 import { AddToWalletDrawer } from "@/components/card/AddToWalletDrawer";
 import { useWalletSummary } from "@/hooks/useCards";
-import { useCardTransactionGroups } from "@/hooks/useTransactions";
+import { useCardTransactionGroups, loadMoreProps } from "@/hooks/useTransactions";
 import { Skeleton } from "@/components/ui/skeleton";
 import { detectPlatform } from "@/lib/walletDeepLinks";
 import {
@@ -168,7 +168,8 @@ const CardPage = () => {
   const currentCardType = cardTypes[activeIndex];
   const apiCard = apiCards.find(c => c.type === currentCardType);
   const currentCardNumber = apiCard?.card_number;
-  const { data: cardTxGroups, isLoading: txLoading } = useCardTransactionGroups(currentCardNumber);
+  const cardTxQuery = useCardTransactionGroups(currentCardNumber);
+  const { data: cardTxGroups, isLoading: txLoading } = cardTxQuery;
 
   // Merge API transactions with mock data for current card
   const mockGroups = cardsData[currentCardType].transactions;
@@ -692,7 +693,7 @@ const CardPage = () => {
                 {[1, 2, 3].map(i => <Skeleton key={i} className="h-16 w-full rounded-xl" />)}
               </div>
             ) : (
-              <CardTransactionsList groups={mergedTransactions} />
+              <CardTransactionsList groups={mergedTransactions} {...loadMoreProps(cardTxQuery)} />
             )}
           </motion.div>
 
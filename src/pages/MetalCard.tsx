@@ -19,7 +19,7 @@ import {
   CollapsibleTrigger,
 } from "@/components/ui/collapsible";
 import { useCards, useWalletSummary } from "@/hooks/useCards";
-import { useCardTransactionGroups } from "@/hooks/useTransactions";
+import { useCardTransactionGroups, loadMoreProps } from "@/hooks/useTransactions";
 import { Skeleton } from "@/components/ui/skeleton";
 
 // Mock transactions for metal card
@@ -120,7 +120,8 @@ const MetalCard = () => {
   const cardNumber = metalCardInfo?.card_number;
 
   // Fetch card transactions filtered by full card number (client-side)
-  const { data: cardTxGroups, isLoading: txLoading } = useCardTransactionGroups(cardNumber);
+  const cardTxQuery = useCardTransactionGroups(cardNumber);
+  const { data: cardTxGroups, isLoading: txLoading } = cardTxQuery;
   
   // Merge API transactions with mock data
   const mergedGroups = [...(cardTxGroups || []), ...metalMockGroups];
@@ -492,7 +493,7 @@ const MetalCard = () => {
               {[1, 2, 3].map(i => <Skeleton key={i} className="h-16 w-full rounded-xl" />)}
             </div>
           ) : mergedGroups.length > 0 ? (
-            <CardTransactionsList groups={mergedGroups} />
+            <CardTransactionsList groups={mergedGroups} {...loadMoreProps(cardTxQuery)} />
           ) : (
             <p className="text-sm text-muted-foreground text-center py-6">{t("card.noTransactions", "No transactions yet")}</p>
           )}
@@ -23,7 +23,7 @@ import { TransactionGroup, Transaction } from "@/types/transaction";
 import { StatementDownloadDrawer } from "@/components/history/StatementDownloadDrawer";
 import { useApiTransactionGroups, useIbanTransactionGroups, useCryptoTransactionGroups, useCardTransactionGroups } from "@/hooks/useTransactions";
 import { useQueryClient } from "@tanstack/react-query";
-import { transactionKeys } from "@/hooks/useTransactions";
+import { loadMoreProps, transactionKeys } from "@/hooks/useTransactions";
 type FilterType = "all" | "income" | "expenses" | "transfers";
 type AssetType = "all" | "virtual" | "metal" | "iban" | "crypto";
 type PeriodPreset = "allTime" | "today" | "thisWeek" | "month" | "threeMonths" | "nineMonths" | "custom";
@@ -35,10 +35,14 @@ const TransactionHistory = () => {
   const queryClient = useQueryClient();
   
   // Fetch real API data
-  const { data: apiGroups, isLoading: apiLoading } = useApiTransactionGroups();
-  const { data: ibanGroups, isLoading: ibanLoading } = useIbanTransactionGroups();
-  const { data: cryptoGroups, isLoading: cryptoLoading } = useCryptoTransactionGroups();
-  const { data: cardGroups, isLoading: cardLoading } = useCardTransactionGroups();
+  const apiQuery = useApiTransactionGroups();
+  const ibanQuery = useIbanTransactionGroups();
+  const cryptoQuery = useCryptoTransactionGroups();
+  const cardQuery = useCardTransactionGroups();
+  const { data: apiGroups, isLoading: apiLoading } = apiQuery;
+  const { data: ibanGroups, isLoading: ibanLoading } = ibanQuery;
+  const { data: cryptoGroups, isLoading: cryptoLoading } = cryptoQuery;
+  const { data: cardGroups, isLoading: cardLoading } = cardQuery;
   
   const isLoading = apiLoading || ibanLoading || cryptoLoading || cardLoading;
   
@@ -245,6 +249,15 @@ const TransactionHistory = () => {
     }).filter(group => group.transactions.length > 0);
   }, [activeAsset, activeFilter, dateFrom, dateTo, apiGroups, ibanGroups, cryptoGroups, cardGroups]);
 
+  // Sources behind the current asset tab; "load more" fetches the next page of each that has one
+  const pagedSources = activeAsset === "all"
+    ? [apiQuery, ibanQuery, cryptoQuery, cardQuery]
+    : activeAsset === "iban"
+      ? [ibanQuery]
+      : activeAsset === "crypto"
+        ? [cryptoQuery]
+        : [cardQuery];
+
   const filterOptions: { key: FilterType; label: string }[] = [
     { key: "all", label: t("history.all") },
     { key: "income", label: t("history.income") },
@@ -459,7 +472,7 @@ const TransactionHistory = () => {
                   exit={{ opacity: 0, y: -10 }}
                   transition={{ duration: 0.2 }}
                 >
-                  <CardTransactionsList groups={filteredGroups} />
+                  <CardTransactionsList groups={filteredGroups} {...loadMoreProps(...pagedSources)} />
                 </motion.div>
               </AnimatePresence>
 
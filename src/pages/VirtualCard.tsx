@@ -19,7 +19,7 @@ import {
 } from "@/components/ui/collapsible";
 import { CardMiniature } from "@/components/dashboard/CardMiniature";
 import { useCards, useWalletSummary } from "@/hooks/useCards";
-import { useCardTransactionGroups } from "@/hooks/useTransactions";
+import { useCardTransactionGroups, loadMoreProps } from "@/hooks/useTransactions";
 import { Skeleton } from "@/components/ui/skeleton";
 
 // Animated number component for balance
@@ -116,7 +116,8 @@ const VirtualCard = () => {
   const cardNumber = virtualCardInfo?.card_number;
 
   // Fetch card transactions filtered by full card number (client-side)
-  const { data: cardTxGroups, isLoading: txLoading } = useCardTransactionGroups(cardNumber);
+  const cardTxQuery = useCardTransactionGroups(cardNumber);
+  const { data: cardTxGroups, isLoading: txLoading } = cardTxQuery;
   
   // Merge API transactions with mock data
   const mergedGroups = [...(cardTxGroups || []), ...virtualMockGroups];
@@ -445,7 +446,7 @@ const VirtualCard = () => {
               {[1, 2, 3].map(i => <Skeleton key={i} className="h-16 w-full rounded-xl" />)}
             </div>
           ) : mergedGroups.length > 0 ? (
-            <CardTransactionsList groups={mergedGroups} />
+            <CardTransactionsList groups={mergedGroups} {...loadMoreProps(cardTxQuery)} />
           ) : (
             <p className="text-sm text-muted-foreground text-center py-6">{t("card.noTransactions", "No transactions yet")}</p>
           )}
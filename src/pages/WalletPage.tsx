@@ -10,7 +10,7 @@ import { QRCodeSVG } from "qrcode.react";
 import { MobileLayout } from "@/components/layout/MobileLayout";
 import { UsdtIcon, TronIcon, getCryptoIcon } from "@/components/icons/CryptoIcons";
 import { CardTransactionsList } from "@/components/card/CardTransactionsList";
-import { useMergedTransactionGroups, useCryptoTransactionGroups } from "@/hooks/useTransactions";
+import { useMergedTransactionGroups, useCryptoTransactionGroups, loadMoreProps } from "@/hooks/useTransactions";
 import { useCryptoWallets } from "@/hooks/useCards";
 import { Skeleton } from "@/components/ui/skeleton";
 import { registerCryptoWallets } from "@/services/api/transactions";
@@ -48,7 +48,8 @@ const WalletPage = () => {
   const [createError, setCreateError] = useState<string | null>(null);
   const [selectedWalletId, setSelectedWalletId] = useState<string | null>(null);
   const { data: transactionsData, isLoading: transactionsLoading } = useMergedTransactionGroups();
-  const { data: cryptoApiGroups, isLoading: cryptoApiLoading } = useCryptoTransactionGroups();
+  const cryptoApiQuery = useCryptoTransactionGroups();
+  const { data: cryptoApiGroups, isLoading: cryptoApiLoading } = cryptoApiQuery;
   const { data: cryptoWalletsData, isLoading: cryptoWalletsLoading } = useCryptoWallets();
 
   const cryptoWallets = useMemo(() => {
@@ -385,7 +386,7 @@ const WalletPage = () => {
               <Skeleton className="h-32 w-full rounded-xl" />
             </div>
           ) : (
-            <CardTransactionsList groups={transactionGroups} walletView />
+            <CardTransactionsList groups={transactionGroups} walletView {...loadMoreProps(cryptoApiQuery)} />
           )}
         </motion.div>
       </div>
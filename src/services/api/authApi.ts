@@ -69,6 +69,7 @@ export interface UserProfile {
   role: string | null;
   is_verified?: boolean;
   verification_status?: string;
+  synced_at?: string | null;
 }
 
 export interface LoginResponse {
@@ -284,6 +285,7 @@ export async function getCurrentUser() {
       role: raw.role || null,
       is_verified: raw.is_verified,
       verification_status: raw.verification_status,
+      synced_at: raw.synced_at ?? null,
     };
 
     // Fallback phone from cached login data
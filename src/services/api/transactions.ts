@@ -307,38 +307,62 @@ export interface ApiTransaction {
   [key: string]: unknown;
 }
 
+export const TRANSACTIONS_PAGE_SIZE = 50;
+
+/**
+ * One page of a transactions list, already mapped to the local format.
+ * nextCursor is null on the last page.
+ */
+export interface TransactionPage {
+  transactions: Transaction[];
+  nextCursor: string | null;
+}
+
 /**
- * Fetch real transactions list from backend
- * GET /api/v1/transactions/
+ * Fetch one page of a cursor-paginated transactions list.
+ * Backend returns { results, next_cursor, has_more }; plain arrays are accepted too.
  */
-export const fetchApiTransactions = async (): Promise<{
+const fetchTransactionPage = async (endpoint: string, cursor?: string | null): Promise<{
   data: ApiTransaction[] | null;
+  nextCursor: string | null;
   error: string | null;
 }> => {
   try {
-    const result = await apiRequest<ApiTransaction[] | { results: ApiTransaction[] }>(
-      `/transactions/all/`,
+    const query = cursor
+      ? `?page_size=${TRANSACTIONS_PAGE_SIZE}&cursor=${encodeURIComponent(cursor)}`
+      : `?page_size=${TRANSACTIONS_PAGE_SIZE}`;
+    const result = await apiRequest<ApiTransaction[] | { results: ApiTransaction[]; next_cursor?: string | null }>(
+      `${endpoint}${query}`,
       { method: 'GET' },
       true
     );
-    
+
     if (result.error) {
-      console.warn('[Transactions API] List error:', result.error);
-      return { data: null, error: result.error.detail || result.error.message || 'Failed to fetch' };
+      console.warn(`[Transactions API] ${endpoint} error:`, result.error);
+      return { data: null, nextCursor: null, error: result.error.detail || result.error.message || 'Failed to fetch' };
     }
-    
-    // Handle both array and paginated response formats
-    const transactions = Array.isArray(result.data)
-      ? result.data
-      : (result.data as any)?.results || [];
-    
-    return { data: transactions, error: null };
+    if (Array.isArray(result.data)) {
+      return { data: result.data, nextCursor: null, error: null };
+    }
+
+    return {
+      data: (result.data as any)?.results || [],
+      nextCursor: (result.data as any)?.next_cursor || null,
+      error: null,
+    };
   } catch (error) {
-    console.error('[Transactions API] List fetch failed:', error);
-    return { data: null, error: error instanceof Error ? error.message : 'Network error' };
+    console.error(`[Transactions API] ${endpoint} fetch failed:`, error);
+    return { data: null, nextCursor: null, error: error instanceof Error ? error.message : 'Network error' };
   }
 };
 
+/**
+ * Fetch real transactions list from backend (one page)
+ * GET /api/v1/transactions/all/
+ */
+export const fetchApiTransactions = (cursor?: string | null) =>
+  fetchTransactionPage(`/transactions/all/`, cursor);
+
 /**
  * Convert API transaction to local Transaction format
  */
@@ -684,167 +708,89 @@ export const mapApiTransactionToLocal = (tx: ApiTransaction): Transaction => {
 };
 
 /**
- * Fetch real transactions and group by date
+ * Fetch a page of real transactions, mapped and enriched
  */
-export const fetchApiTransactionGroups = async (): Promise<TransactionGroup[]> => {
-  const { data, error } = await fetchApiTransactions();
-  if (error || !data || data.length === 0) return [];
-  
-  return await groupApiTransactions(data);
+export const fetchApiTransactionPage = async (cursor?: string | null): Promise<TransactionPage> => {
+  const { data, nextCursor, error } = await fetchApiTransactions(cursor);
+  if (error || !data) return { transactions: [], nextCursor: null };
+  return { transactions: mapApiTransactions(data), nextCursor };
 };
 
 /**
- * Fetch IBAN-only transactions from backend
+ * Fetch IBAN-only transactions from backend (one page)
  * GET /api/v1/transactions/iban/
  */
-export const fetchIbanTransactions = async (): Promise<{
-  data: ApiTransaction[] | null;
-  error: string | null;
-}> => {
-  try {
-    const result = await apiRequest<ApiTransaction[] | { results: ApiTransaction[] }>(
-      `/transactions/iban/`,
-      { method: 'GET' },
-      true
-    );
-    
-    if (result.error) {
-      console.warn('[Transactions API] IBAN list error:', result.error);
-      return { data: null, error: result.error.detail || result.error.message || 'Failed to fetch' };
-    }
-    
-    const transactions = Array.isArray(result.data)
-      ? result.data
-      : (result.data as any)?.results || [];
-    
-    return { data: transactions, error: null };
-  } catch (error) {
-    console.error('[Transactions API] IBAN fetch failed:', error);
-    return { data: null, error: error instanceof Error ? error.message : 'Network error' };
-  }
-};
+export const fetchIbanTransactions = (cursor?: string | null) =>
+  fetchTransactionPage(`/transactions/iban/`, cursor);
 
 /**
- * Fetch IBAN transactions and group by date
+ * Fetch a page of IBAN transactions, mapped and enriched
  */
-export const fetchIbanTransactionGroups = async (): Promise<TransactionGroup[]> => {
-  const { data, error } = await fetchIbanTransactions();
-  if (error || !data || data.length === 0) return [];
-  
-  return await groupApiTransactions(data);
+export const fetchIbanTransactionPage = async (cursor?: string | null): Promise<TransactionPage> => {
+  const { data, nextCursor, error } = await fetchIbanTransactions(cursor);
+  if (error || !data) return { transactions: [], nextCursor: null };
+  return { transactions: mapApiTransactions(data), nextCursor };
 };
 
 /**
- * Fetch crypto transactions from backend
+ * Fetch crypto transactions from backend (one page)
  * GET /api/v1/transactions/crypto/
  */
-export const fetchCryptoTransactions = async (): Promise<{
-  data: ApiTransaction[] | null;
-  error: string | null;
-}> => {
-  try {
-    const result = await apiRequest<ApiTransaction[] | { results: ApiTransaction[] }>(
-      `/transactions/crypto/`,
-      { method: 'GET' },
-      true
-    );
-    
-    if (result.error) {
-      console.warn('[Transactions API] Crypto transactions error:', result.error);
-      return { data: null, error: result.error.detail || result.error.message || 'Failed to fetch' };
-    }
-    
-    const transactions = Array.isArray(result.data)
-      ? result.data
-      : (result.data as any)?.results || [];
-    
-    return { data: transactions, error: null };
-  } catch (error) {
-    console.error('[Transactions API] Crypto transactions fetch failed:', error);
-    return { data: null, error: error instanceof Error ? error.message : 'Network error' };
-  }
-};
+export const fetchCryptoTransactions = (cursor?: string | null) =>
+  fetchTransactionPage(`/transactions/crypto/`, cursor);
 
 /**
- * Fetch crypto transactions and group by date
+ * Fetch a page of crypto transactions, mapped and enriched
  */
-export const fetchCryptoTransactionGroups = async (): Promise<TransactionGroup[]> => {
-  const { data, error } = await fetchCryptoTransactions();
-  if (error || !data || data.length === 0) return [];
-  return await groupApiTransactions(data);
+export const fetchCryptoTransactionPage = async (cursor?: string | null): Promise<TransactionPage> => {
+  const { data, nextCursor, error } = await fetchCryptoTransactions(cursor);
+  if (error || !data) return { transactions: [], nextCursor: null };
+  return { transactions: mapApiTransactions(data), nextCursor };
 };
 
 /**
- * Fetch card-only transactions from backend
+ * Fetch card-only transactions from backend (one page)
  * GET /api/v1/transactions/card-transactions/
- * Returns ALL card transactions; filtering by specific card is done client-side by full card number.
+ * Filtering by specific card is done client-side by full card number.
  */
-export const fetchCardTransactions = async (): Promise<{
-  data: ApiTransaction[] | null;
-  error: string | null;
-}> => {
-  try {
-    const result = await apiRequest<ApiTransaction[] | { results: ApiTransaction[] }>(
-      `/transactions/card-transactions/`,
-      { method: 'GET' },
-      true
-    );
-    
-    if (result.error) {
-      console.warn('[Transactions API] Card transactions error:', result.error);
-      return { data: null, error: result.error.detail || result.error.message || 'Failed to fetch' };
-    }
-    
-    const transactions = Array.isArray(result.data)
-      ? result.data
-      : (result.data as any)?.results || [];
-    
-    return { data: transactions, error: null };
-  } catch (error) {
-    console.error('[Transactions API] Card transactions fetch failed:', error);
-    return { data: null, error: error instanceof Error ? error.message : 'Network error' };
-  }
-};
+export const fetchCardTransactions = (cursor?: string | null) =>
+  fetchTransactionPage(`/transactions/card-transactions/`, cursor);
 
 /**
- * Fetch card transactions and group by date
- * Uses /card-transactions/ endpoint, no server-side card filter
+ * Fetch a page of card transactions, mapped and enriched
  */
-export const fetchCardTransactionGroups = async (): Promise<TransactionGroup[]> => {
-  const { data, error } = await fetchCardTransactions();
-  if (error || !data || data.length === 0) return [];
-  return await groupApiTransactions(data);
+export const fetchCardTransactionPage = async (cursor?: string | null): Promise<TransactionPage> => {
+  const { data, nextCursor, error } = await fetchCardTransactions(cursor);
+  if (error || !data) return { transactions: [], nextCursor: null };
+  return { transactions: mapApiTransactions(data), nextCursor };
 };
 
 /**
- * Helper: group API transactions by date
+ * Helper: map API transactions to the local format.
+ * Receipt fields (beneficiary IBAN/name, sender wallet) come from the row's metadata —
+ * the same source the receipt is built from, so no per-row receipt request is needed.
  */
-const groupApiTransactions = async (data: ApiTransaction[]): Promise<TransactionGroup[]> => {
-  const mapped = data.map(mapApiTransactionToLocal);
-  
-  // Enrich crypto_to_bank and bank_withdrawal transactions with receipt data
-  const enrichPromises = mapped.map(async (tx) => {
+const mapApiTransactions = (data: ApiTransaction[]): Transaction[] => {
+  return data.map((raw) => {
+    const tx = mapApiTransactionToLocal(raw);
     const originalType = (tx.metadata as any)?.originalApiType;
     if (originalType === 'crypto_to_bank' || originalType === 'bank_withdrawal') {
-      try {
-        const rawId = tx.id.replace(/^api_/, '');
-        const { data: receipt } = await fetchTransactionReceipt(rawId);
-        if (receipt) {
-          (tx.metadata as any).beneficiary_iban = (receipt as any).iban_mask || (receipt as any).beneficiary_iban || undefined;
-          (tx.metadata as any).beneficiary_name = (receipt as any).beneficiary_name || undefined;
-          (tx.metadata as any).sender_name = (receipt as any).sender_name || undefined;
-          (tx.metadata as any).from_address_mask = (receipt as any).from_address_mask || undefined;
-        }
-      } catch (e) {
-        // silently skip enrichment
-      }
+      const meta = (raw.metadata || {}) as Record<string, any>;
+      (tx.metadata as any).beneficiary_iban = meta.iban_mask || meta.beneficiary_iban || undefined;
+      (tx.metadata as any).beneficiary_name = meta.beneficiary_name || undefined;
+      (tx.metadata as any).sender_name = raw.sender_name || undefined;
+      (tx.metadata as any).from_address_mask = meta.from_address_mask || undefined;
     }
     return tx;
   });
-  const enriched = await Promise.all(enrichPromises);
-  
+};
+
+/**
+ * Group transactions by date (pages are concatenated first, so a day split across pages stays one group)
+ */
+export const groupTransactionsByDate = (items: Transaction[]): TransactionGroup[] => {
   const groupMap = new Map<string, Transaction[]>();
-  for (const tx of enriched) {
+  for (const tx of items) {
     const dateStr = (tx.metadata as any)?.apiDate || 'Unknown';
     if (!groupMap.has(dateStr)) groupMap.set(dateStr, []);
     groupMap.get(dateStr)!.push(tx);
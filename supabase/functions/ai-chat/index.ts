@@ -177,26 +177,41 @@ async function fetchAllBalances(userToken?: string): Promise<string> {
   return result.length > 0 ? result.join('\n') : 'Балансы не найдены.';
 }
 
-async function fetchTransactionsFromApi(userToken?: string): Promise<string> {
-  if (!userToken) return "Данные о транзакциях недоступны (нет токена).";
-
-  try {
-    const BACKEND_BASE = "https://ueasycard.com/api/v1";
-    const response = await fetch(`${BACKEND_BASE}/transactions/all/`, {
+// /transactions/all/ отдаёт страницы по курсору: идём по next_cursor, пока не наберём maxRows
+async function fetchTransactionPages(userToken: string, maxRows = 1000): Promise<{ transactions: any[]; hasMore: boolean } | null> {
+  const BACKEND_BASE = "https://ueasycard.com/api/v1";
+  const transactions: any[] = [];
+  let cursor: string | null = null;
+  do {
+    const query = new URLSearchParams({ page_size: "200" });
+    if (cursor) query.set("cursor", cursor);
+    const response = await fetch(`${BACKEND_BASE}/transactions/all/?${query}`, {
       method: "GET",
       headers: {
         "Content-Type": "application/json",
         "Authorization": `Token ${userToken}`,
       },
     });
-
     if (!response.ok) {
       console.error("Transactions API error:", response.status);
-      return "Данные о транзакциях временно недоступны.";
+      return null;
     }
-
     const rawData = await response.json();
-    const transactions = Array.isArray(rawData) ? rawData : (rawData?.results || rawData?.data || []);
+    transactions.push(...(Array.isArray(rawData) ? rawData : (rawData?.results || rawData?.data || [])));
+    cursor = Array.isArray(rawData) ? null : (rawData?.next_cursor || null);
+  } while (cursor && transactions.length < maxRows);
+  return { transactions, hasMore: Boolean(cursor) };
+}
+
+async function fetchTransactionsFromApi(userToken?: string): Promise<string> {
+  if (!userToken) return "Данные о транзакциях недоступны (нет токена).";
+
+  try {
+    const history = await fetchTransactionPages(userToken);
+    if (!history) {
+      return "Данные о транзакциях временно недоступны.";
+    }
+    const { transactions, hasMore } = history;
 
     if (!transactions.length) {
       return "Транзакций пока нет.";
@@ -230,7 +245,7 @@ async function fetchTransactionsFromApi(userToken?: string): Promise<string> {
       return `- [#${num}] ${date} | ${type} | ${amount} | ${status}${merchant ? ` | ${merchant}` : ''}${participants ? ` | ${participants}` : ''}`;
     }).join('\n');
 
-    return `${formatted}\n\nВсего транзакций в истории: ${transactions.length}`;
+    return `${formatted}\n\nВсего транзакций в истории: ${hasMore ? `более ${transactions.length}` : transactions.length}`;
   } catch (err) {
     console.error("Error fetching transactions from API:", err);
     return "Ошибка при получении транзакций.";
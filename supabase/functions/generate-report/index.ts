@@ -416,6 +416,32 @@ const deliveryI18n: Record<Lang, Record<string, string>> = {
   es: { card: 'Tarjetas', iban: 'Cuentas IBAN', crypto: 'Billeteras Cripto' },
 };
 
+// /transactions/all/ отдаёт страницы по курсору: идём по next_cursor до конца (не больше maxPages страниц)
+async function fetchAllTransactions(
+  backendBase: string,
+  headers: Record<string, string>,
+  params: Record<string, string>,
+  maxPages = 100,
+): Promise<any[] | null> {
+  const all: any[] = [];
+  let cursor: string | null = null;
+  for (let page = 0; page < maxPages; page++) {
+    const query = new URLSearchParams({ ...params, page_size: "200" });
+    if (cursor) query.set("cursor", cursor);
+    const res = await fetch(`${backendBase}/transactions/all/?${query}`, { method: "GET", headers });
+    if (!res.ok) {
+      console.error("Transactions API error:", res.status);
+      return null;
+    }
+    const raw = await res.json();
+    all.push(...(Array.isArray(raw) ? raw : (raw?.results || raw?.data || [])));
+    cursor = Array.isArray(raw) ? null : (raw?.next_cursor || null);
+    if (!cursor) return all;
+  }
+  console.warn(`Transactions truncated at ${all.length} rows`);
+  return all;
+}
+
 serve(async (req) => {
   if (req.method === "OPTIONS") {
     return new Response(null, { headers: corsHeaders });
@@ -443,17 +469,20 @@ serve(async (req) => {
       "Authorization": `Token ${backend_token}`,
     };
 
+    const txParams: Record<string, string> = {};
+    if (start_date) txParams.start_date = start_date;
+    if (end_date) txParams.end_date = end_date;
+
     // Fetch transactions, balances, and user profile in parallel
-    const [response, walletRes, bankRes, cryptoRes, profileRes] = await Promise.all([
-      fetch(`${BACKEND_BASE}/transactions/all/`, { method: "GET", headers }),
+    const [allTransactions, walletRes, bankRes, cryptoRes, profileRes] = await Promise.all([
+      fetchAllTransactions(BACKEND_BASE, headers, txParams),
       fetch(`${BACKEND_BASE}/cards/wallet/summary/`, { method: "GET", headers }).catch(() => null),
       fetch(`${BACKEND_BASE}/transactions/bank-accounts/`, { method: "GET", headers }).catch(() => null),
       fetch(`${BACKEND_BASE}/transactions/crypto-wallets/`, { method: "GET", headers }).catch(() => null),
       fetch(`${BACKEND_BASE}/accounts/users/me/`, { method: "GET", headers }).catch(() => null),
     ]);
 
-    if (!response.ok) {
-      console.error("Transactions API error:", response.status);
+    if (!allTransactions) {
       return new Response(
         JSON.stringify({ error: t(lang, 'fetchError') }),
         { status: 500, headers: { ...corsHeaders, "Content-Type": "application/json" } }
@@ -514,9 +543,6 @@ serve(async (req) => {
       }
     } catch (e) { console.error("Crypto parse error:", e); }
 
-    const rawData = await response.json();
-    const allTransactions = Array.isArray(rawData) ? rawData : (rawData?.results || rawData?.data || []);
-
     let filtered = allTransactions;
     if (start_date || end_date) {
       const startMs = start_date ? new Date(start_date).getTime() : 0;
@@ -630,15 +656,18 @@ serve(async (req) => {
         }
       }
 
-      // Encode as base64 to match current backend deployment
-      const htmlBase64 = btoa(unescape(encodeURIComponent(htmlContent)));
+      // With a full period the backend builds the statement itself from the ledger;
+      // otherwise fall back to uploading the rendered HTML
+      const statementSource = start_date && end_date
+        ? { start_date, end_date, asset_filter: filterAssets || [] }
+        : { html_base64: btoa(unescape(encodeURIComponent(htmlContent))) };
 
       try {
         const sendRes = await fetch(`${BACKEND_BASE}/accounts/statement/send/`, {
           method: 'POST',
           headers,
           body: JSON.stringify({
-            html_base64: htmlBase64,
+            ...statementSource,
             file_name: fileName,
             channels: channelsToSend,
             period_label: periodLabel,
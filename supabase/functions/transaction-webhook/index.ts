@@ -25,34 +25,34 @@ serve(async (req) => {
     const body = await req.json();
     console.log("[transaction-webhook] Received:", JSON.stringify(body));
 
-    const { event, user_id, transaction_id, type, amount, currency } = body;
+    // Backend batches events as { events: [...] }; a single event object is still accepted
+    const events = Array.isArray(body.events) ? body.events : [body];
 
     const supabaseUrl = Deno.env.get("SUPABASE_URL")!;
     const supabaseKey = Deno.env.get("SUPABASE_SERVICE_ROLE_KEY")!;
 
     // Use Realtime REST API directly to broadcast — no subscribe/unsubscribe race
     const realtimeUrl = `${supabaseUrl}/realtime/v1/api/broadcast`;
-    
+    const timestamp = new Date().toISOString();
+
     const broadcastPayload = {
-      messages: [
-        {
-          topic: "realtime:transaction-updates",
-          event: "broadcast",
+      messages: events.map(({ event, user_id, transaction_id, type, amount, currency }) => ({
+        topic: "realtime:transaction-updates",
+        event: "broadcast",
+        payload: {
+          type: "broadcast",
+          event: "new_transaction",
           payload: {
-            type: "broadcast",
-            event: "new_transaction",
-            payload: {
-              event: event || "transaction_created",
-              user_id,
-              transaction_id,
-              type,
-              amount,
-              currency,
-              timestamp: new Date().toISOString(),
-            },
+            event: event || "transaction_created",
+            user_id,
+            transaction_id,
+            type,
+            amount,
+            currency,
+            timestamp,
           },
         },
-      ],
+      })),
     };
 
     const broadcastRes = await fetch(realtimeUrl, {
@@ -80,7 +80,7 @@ serve(async (req) => {
       );
     }
 
-    console.log("[transaction-webhook] Broadcast sent for user:", user_id);
+    console.log(`[transaction-webhook] Broadcast sent: ${events.length} event(s)`);
 
     return new Response(
       JSON.stringify({ success: true, message: "Broadcast sent" }),
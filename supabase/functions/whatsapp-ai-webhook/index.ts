@@ -77,14 +77,29 @@ async function fetchAllBalances(token: string): Promise<string> {
   return result.length > 0 ? result.join("\n") : "Балансы не найдены.";
 }
 
-async function fetchTransactions(token: string): Promise<string> {
-  try {
-    const res = await fetch(`${BACKEND_BASE}/transactions/all/`, {
+// /transactions/all/ отдаёт страницы по курсору: идём по next_cursor, пока не наберём maxRows
+async function fetchTransactionPages(token: string, maxRows = 1000): Promise<{ txs: any[]; hasMore: boolean } | null> {
+  const txs: any[] = [];
+  let cursor: string | null = null;
+  do {
+    const query = new URLSearchParams({ page_size: "200" });
+    if (cursor) query.set("cursor", cursor);
+    const res = await fetch(`${BACKEND_BASE}/transactions/all/?${query}`, {
       headers: { "Content-Type": "application/json", Authorization: `Token ${token}` },
     });
-    if (!res.ok) return "Транзакции недоступны.";
+    if (!res.ok) return null;
     const raw = await res.json();
-    const txs = Array.isArray(raw) ? raw : raw?.results || raw?.data || [];
+    txs.push(...(Array.isArray(raw) ? raw : raw?.results || raw?.data || []));
+    cursor = Array.isArray(raw) ? null : raw?.next_cursor || null;
+  } while (cursor && txs.length < maxRows);
+  return { txs, hasMore: Boolean(cursor) };
+}
+
+async function fetchTransactions(token: string): Promise<string> {
+  try {
+    const history = await fetchTransactionPages(token);
+    if (!history) return "Транзакции недоступны.";
+    const { txs, hasMore } = history;
     if (!txs.length) return "Транзакций пока нет.";
     const formatted = txs.slice(0, 20).map((tx: any, i: number) => {
       const date = tx.created_at ? formatDate(tx.created_at) : "";
@@ -103,7 +118,7 @@ async function fetchTransactions(token: string): Promise<string> {
       const merchant = tx.merchant_name || "";
       return `- [#${i + 1}] ${date} | ${type} | ${amount} | ${status}${merchant ? ` | ${merchant}` : ""}`;
     }).join("\n");
-    return `${formatted}\n\nВсего транзакций в истории: ${txs.length}`;
+    return `${formatted}\n\nВсего транзакций в истории: ${hasMore ? `более ${txs.length}` : txs.length}`;
   } catch { return "Ошибка загрузки транзакций."; }
 }
 